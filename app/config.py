@@ -8,5 +8,122 @@ class Settings:
     SUPABASE_KEY: str = os.getenv("SUPABASE_KEY")
     GITHUB_TOKEN: str = os.getenv("GITHUB_TOKEN")
     ELEVENLABS_API_KEY: str = os.getenv("ELEVENLABS_API_KEY")
+
+    # Provider base URLs, pointed at benchmarks/stub_server.py for offline load tests
+    GITHUB_MODELS_ENDPOINT: str = os.getenv("GITHUB_MODELS_ENDPOINT", "https://models.github.ai/inference")
+    ELEVENLABS_API_URL: str = os.getenv("ELEVENLABS_API_URL", "https://api.elevenlabs.io")
+    # Subtitle URL template with a {video_id} placeholder; when set, yt_dlp's track lookup is skipped
+    YOUTUBE_SUBTITLE_URL: str = os.getenv("YOUTUBE_SUBTITLE_URL", "")
+
+    # Shared outbound HTTP client (pool limits and timeouts in seconds)
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+    HTTP_CONNECT_TIMEOUT: float = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+    HTTP_TIMEOUT: float = float(os.getenv("HTTP_TIMEOUT", "60"))
+    HTTP2_ENABLED: bool = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+
+    # Chat model and prompt token budgets (per-request input cap, context window, map chunk target)
+    LLM_MODEL: str = os.getenv("LLM_MODEL", "openai/gpt-4.1-mini")
+    # Model tiers used by the per-stage routing table; MODEL_ROUTES (JSON) overrides individual stages
+    LLM_SMALL_MODEL: str = os.getenv("LLM_SMALL_MODEL", "openai/gpt-4.1-nano")
+    LLM_LARGE_MODEL: str = os.getenv("LLM_LARGE_MODEL", "openai/gpt-4.1")
+    OCR_MODEL: str = os.getenv("OCR_MODEL", "openai/gpt-4.1")
+    MODEL_ROUTES: str = os.getenv("MODEL_ROUTES", "")
+    LLM_MAX_INPUT_TOKENS: int = int(os.getenv("LLM_MAX_INPUT_TOKENS", "8000"))
+    LLM_CONTEXT_TOKENS: int = int(os.getenv("LLM_CONTEXT_TOKENS", "128000"))
+    LLM_CHUNK_TARGET_TOKENS: int = int(os.getenv("LLM_CHUNK_TARGET_TOKENS", "4000"))
+    # Tokens from the end of one chunk repeated at the start of the next (at most half a chunk)
+    LLM_CHUNK_OVERLAP_TOKENS: int = int(os.getenv("LLM_CHUNK_OVERLAP_TOKENS", "0"))
+
+    # Extractive pre-compression of long documents and transcripts before the map step. Inputs over
+    # EXTRACTIVE_TARGET_TOKENS are cut to that size, but never below EXTRACTIVE_MIN_KEEP of their own
+    # tokens: a fixed target would cap every long document at a handful of map chunks and drop most of
+    # what the tree-reduce is meant to cover. Lower it for cheaper, lossier runs (0 restores the fixed
+    # target); 1 turns compression off
+    EXTRACTIVE_ENABLED: bool = os.getenv("EXTRACTIVE_ENABLED", "true").lower() == "true"
+    EXTRACTIVE_TARGET_TOKENS: int = int(os.getenv("EXTRACTIVE_TARGET_TOKENS", "24000"))
+    EXTRACTIVE_MIN_KEEP: float = float(os.getenv("EXTRACTIVE_MIN_KEEP", "0.5"))
+
+    # Uploads are streamed to disk in UPLOAD_CHUNK_KB blocks; larger files get a 413
+    UPLOAD_MAX_MB: int = int(os.getenv("UPLOAD_MAX_MB", "50"))
+    UPLOAD_CHUNK_KB: int = int(os.getenv("UPLOAD_CHUNK_KB", "1024"))
+    # Whole request bodies (past-paper analysis sends two files) are refused before being read
+    UPLOAD_MAX_REQUEST_MB: int = int(os.getenv("UPLOAD_MAX_REQUEST_MB", "105"))
+
+    # Per-request and per-job scratch directories; leftovers older than the max age are removed at startup
+    WORKSPACE_ROOT: str = os.getenv("WORKSPACE_ROOT", "app/temp_uploads/workspaces")
+    WORKSPACE_MAX_AGE_HOURS: float = float(os.getenv("WORKSPACE_MAX_AGE_HOURS", "6"))
+
+    # PDF page and PPTX slide extraction on a process pool (0 workers = one per CPU, smaller files are read in-thread;
+    # PDFs always go to the pool where PDF_PAGE_TIMEOUT can be enforced)
+    EXTRACTION_WORKERS: int = int(os.getenv("EXTRACTION_WORKERS", "0"))
+    EXTRACTION_PARALLEL_MIN_PAGES: int = int(os.getenv("EXTRACTION_PARALLEL_MIN_PAGES", "16"))
+    EXTRACTION_MIN_PAGES_PER_TASK: int = int(os.getenv("EXTRACTION_MIN_PAGES_PER_TASK", "8"))
+    PDF_PAGE_TIMEOUT: float = float(os.getenv("PDF_PAGE_TIMEOUT", "20"))
+    # Images are downscaled to what the vision model sees (fit in the long side, then the short side) and re-encoded
+    OCR_PREPROCESS_ENABLED: bool = os.getenv("OCR_PREPROCESS_ENABLED", "true").lower() == "true"
+    OCR_PREPROCESS_MIN_KB: int = int(os.getenv("OCR_PREPROCESS_MIN_KB", "512"))
+    OCR_MAX_LONG_SIDE: int = int(os.getenv("OCR_MAX_LONG_SIDE", "2048"))
+    OCR_MAX_SHORT_SIDE: int = int(os.getenv("OCR_MAX_SHORT_SIDE", "768"))
+    OCR_JPEG_QUALITY: int = int(os.getenv("OCR_JPEG_QUALITY", "85"))
+    OCR_GRAYSCALE_MAX_SATURATION: int = int(os.getenv("OCR_GRAYSCALE_MAX_SATURATION", "24"))
+    # Pages longer than OCR_TILE_MAX_ASPECT times their width (or wider) are OCRed as overlapping tiles of OCR_TILE_ASPECT
+    OCR_TILE_MAX_ASPECT: float = float(os.getenv("OCR_TILE_MAX_ASPECT", "2.5"))
+    OCR_TILE_ASPECT: float = float(os.getenv("OCR_TILE_ASPECT", "1.4"))
+    OCR_TILE_OVERLAP: float = float(os.getenv("OCR_TILE_OVERLAP", "0.15"))
+    OCR_TILE_MAX_TILES: int = int(os.getenv("OCR_TILE_MAX_TILES", "12"))
+    # Vision requests in flight for one batch of pages and tiles (the provider rate limiter still applies)
+    OCR_BATCH_CONCURRENCY: int = int(os.getenv("OCR_BATCH_CONCURRENCY", "4"))
+    OCR_TIMEOUT: float = float(os.getenv("OCR_TIMEOUT", "120"))
+    # Scanned PDF pages (less than PDF_OCR_MIN_CHARS of text) are sent to the OCR model
+    PDF_OCR_ENABLED: bool = os.getenv("PDF_OCR_ENABLED", "true").lower() == "true"
+    PDF_OCR_MIN_CHARS: int = int(os.getenv("PDF_OCR_MIN_CHARS", "25"))
+    PDF_OCR_MAX_PAGES: int = int(os.getenv("PDF_OCR_MAX_PAGES", "60"))
+    PDF_OCR_CONCURRENCY: int = int(os.getenv("PDF_OCR_CONCURRENCY", "4"))
+    PDF_OCR_DPI: int = int(os.getenv("PDF_OCR_DPI", "150"))
+    # Parsed uploads kept in memory by content hash, so the same file is never parsed twice
+    EXTRACTION_CACHE_MB: int = int(os.getenv("EXTRACTION_CACHE_MB", "64"))
+
+    # Chunked LLM pipelines (map step concurrency and per-chunk retries on top of the request-level ones)
+    LLM_MAP_CONCURRENCY: int = int(os.getenv("LLM_MAP_CONCURRENCY", "4"))
+    LLM_MAP_RETRIES: int = int(os.getenv("LLM_MAP_RETRIES", "0"))
+    # Largest input a single reduce (combine) prompt may carry before summaries are merged in a tree
+    REDUCE_INPUT_TOKENS: int = int(os.getenv("REDUCE_INPUT_TOKENS", "6000"))
+
+    # Inference resilience: jittered retries, circuit breaker and optional hedged requests
+    LLM_RETRIES: int = int(os.getenv("LLM_RETRIES", "2"))
+    LLM_RETRY_BASE_DELAY: float = float(os.getenv("LLM_RETRY_BASE_DELAY", "1"))
+    LLM_RETRY_MAX_DELAY: float = float(os.getenv("LLM_RETRY_MAX_DELAY", "10"))
+    LLM_BREAKER_FAILURES: int = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+    LLM_BREAKER_RESET_SECONDS: float = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+    LLM_HEDGE_ENABLED: bool = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+    LLM_HEDGE_PERCENTILE: float = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+    LLM_HEDGE_MIN_SAMPLES: int = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
     
-settings = Settings()
\ No newline at end of file
+    # Provider rate limits (0 disables a bucket; response headers re-tune them at runtime)
+    GITHUB_MODELS_RPM: float = float(os.getenv("GITHUB_MODELS_RPM", "15"))
+    GITHUB_MODELS_TPM: float = float(os.getenv("GITHUB_MODELS_TPM", "0"))
+    GITHUB_MODELS_MAX_CONCURRENCY: int = int(os.getenv("GITHUB_MODELS_MAX_CONCURRENCY", "5"))
+    ELEVENLABS_RPM: float = float(os.getenv("ELEVENLABS_RPM", "0"))
+    ELEVENLABS_MAX_CONCURRENCY: int = int(os.getenv("ELEVENLABS_MAX_CONCURRENCY", "2"))
+
+    # LLM response cache (in-memory LRU in front of a SQLite file)
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_PATH: str = os.getenv("LLM_CACHE_PATH", "app/cache/llm_cache.sqlite3")
+    LLM_CACHE_MEMORY_MB: int = int(os.getenv("LLM_CACHE_MEMORY_MB", "64"))
+    LLM_CACHE_TTL_SECONDS: float = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+    # OCR results reused for images with the same bytes. OCR_CACHE_PERCEPTUAL also matches re-encoded or
+    # resized copies: a perceptual hash finds candidates within OCR_CACHE_MAX_DISTANCE bits (of 255), each
+    # 16x16 block of a 256px thumbnail must then differ by at most OCR_CACHE_MAX_BLOCK_DIFFERENCE (mean, 0-255).
+    # Re-encodes stay around 10; changing a few digits can stay under that too, so a page that differs only
+    # in numbers may get another page's text. Least recently used entries go past OCR_CACHE_MAX_MB
+    OCR_CACHE_ENABLED: bool = os.getenv("OCR_CACHE_ENABLED", "true").lower() == "true"
+    OCR_CACHE_PERCEPTUAL: bool = os.getenv("OCR_CACHE_PERCEPTUAL", "false").lower() == "true"
+    OCR_CACHE_PATH: str = os.getenv("OCR_CACHE_PATH", "app/cache/ocr_cache.sqlite3")
+    OCR_CACHE_MAX_MB: int = int(os.getenv("OCR_CACHE_MAX_MB", "256"))
+    OCR_CACHE_MAX_DISTANCE: int = int(os.getenv("OCR_CACHE_MAX_DISTANCE", "12"))
+    OCR_CACHE_MAX_BLOCK_DIFFERENCE: float = float(os.getenv("OCR_CACHE_MAX_BLOCK_DIFFERENCE", "12"))
+
+settings = Settings()
@@ -83,10 +83,35 @@
 #     }
 
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from app.config import settings
+from app.services.http_client import http_client
+from app.services.rate_limiter import rate_limiters
+from app.services.llm_cache import llm_cache
+from app.services.ocr_cache import ocr_cache
+from app.services.resilience import github_models_resilience
+from app.services.model_router import model_router
+from app.services.extraction_pool import extraction_pool
+from app.services.workspace import workspaces
+from app.services.metrics import stats_collector, render_metrics, CONTENT_TYPE_LATEST
+from app.utils.single_flight import pipeline_flights
+
+# Existing stats() are exported next to the provider metrics, the cumulative fields as counters
+stats_collector.add("llm_cache", llm_cache.stats,
+                    counters=("memory_hits", "disk_hits", "misses", "writes", "evictions", "bytes_served"))
+stats_collector.add("ocr_cache", ocr_cache.stats,
+                    counters=("hits", "exact_hits", "misses", "rejected", "writes", "evictions"))
+stats_collector.add("coalescing", pipeline_flights.stats,
+                    counters=("executions", "coalesced", "saved_seconds"))
+stats_collector.add("upstream", github_models_resilience.stats,
+                    counters=("calls", "successes", "failures", "retries", "rejected_open",
+                              "hedges_sent", "hedges_won", "hedge_saved_seconds", "circuit_opened"))
+stats_collector.add("workspaces", workspaces.stats, counters=("created", "swept"))
+for name, limiter in rate_limiters.items():
+    stats_collector.add(f"rate_limiter_{name}", limiter.stats, counters=("throttled_responses",))
 
 # Import routers
 from app.routes.auth import router as auth_router
@@ -98,12 +123,24 @@ from app.routes.questions import router as questions_router
 from app.routes.youtube import router as youtube_router
 from app.routes.dubbing import router as dubbing_router
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open shared resources on startup and release them on shutdown"""
+    await http_client.start()
+    workspaces.sweep()
+    yield
+    await http_client.close()
+    llm_cache.close()
+    ocr_cache.close()
+    extraction_pool.shutdown()
+
 app = FastAPI(
     title="FYP Backend API (Temporary - No Auth)",
     description="AI-Powered Document Processing System for FYP (Temporary)",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -127,6 +164,18 @@ app.include_router(youtube_router, prefix="/youtube", tags=["YouTube"])
 # app.include_router(dubbing_router, prefix="/dubbing", tags=["Dubbing"])
 
 
+@app.middleware("http")
+async def upload_size_limit_middleware(request: Request, call_next):
+    """Refuse oversized uploads from Content-Length, before the multipart body is spooled"""
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > settings.UPLOAD_MAX_REQUEST_MB * 1024 * 1024:
+        return JSONResponse(
+            status_code=413,
+            content={"detail": f"Request too large. The limit is {settings.UPLOAD_MAX_REQUEST_MB} MB."}
+        )
+    return await call_next(request)
+
+
 # --- Temporary override to ignore auth ---
 @app.middleware("http")
 async def bypass_auth_middleware(request: Request, call_next):
@@ -159,6 +208,41 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint"""
+    return Response(render_metrics(), headers={"Content-Type": CONTENT_TYPE_LATEST})
+
+@app.get("/rate-limits")
+async def rate_limit_status():
+    """Current adaptive window and bucket rates for each provider"""
+    return {name: limiter.stats() for name, limiter in rate_limiters.items()}
+
+@app.get("/cache-stats")
+async def cache_stats():
+    """LLM response cache hit/miss counters and memory usage"""
+    return llm_cache.stats()
+
+@app.get("/ocr-cache-stats")
+async def ocr_cache_stats():
+    """Perceptual OCR cache hit/miss counters and disk usage"""
+    return ocr_cache.stats()
+
+@app.get("/upstream-stats")
+async def upstream_stats():
+    """Circuit state, retries, hedging and tail latency for the inference endpoint"""
+    return {github_models_resilience.name: github_models_resilience.stats()}
+
+@app.get("/model-routes")
+async def model_routes():
+    """Routing table per pipeline stage with call counts and latency, for tuning MODEL_ROUTES"""
+    return model_router.stats()
+
+@app.get("/coalescing-stats")
+async def coalescing_stats():
+    """Pipeline runs started, duplicate requests that joined one, and the time they saved"""
+    return pipeline_flights.stats()
+
 @app.get("/api-info")
 async def api_info():
     return {
@@ -1,14 +1,18 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
 from fastapi.security import HTTPBearer
 from typing import Optional
+import asyncio
 import os
 
-from app.services.document_service import DocumentService
+from app.services.document_service import DocumentService, ExtractionResult
 from app.services.ocr_service import OCRService
 from app.services.chatgpt_service import ChatGPTService
 from app.services.auth_service import AuthService
 from app.services.summary_service import SummaryService
-from app.utils.file_handling import save_upload_file, cleanup_file, validate_file_type
+from app.services.metrics import stage_timer
+from app.utils.file_handling import SavedUpload, ingest_upload, cleanup_file
+from app.utils.single_flight import pipeline_flights
+from app.utils.sse import event_stream_response, no_events, stream_tokens, chunk_progress, shared_events
 
 router = APIRouter()
 document_service = DocumentService()
@@ -29,64 +33,26 @@ async def get_current_user(token: str = Depends(security)):
 @router.post("/upload")
 async def upload_document(
     file: UploadFile = File(...),
+    stream: bool = False,
     user = Depends(get_current_user)
 ):
-    """Upload and process document with chunked processing for large files"""
+    """Upload and process document with chunked processing for large files
+
+    With ?stream=true the response is a text/event-stream of stage events (ocr_page, extracted, chunked,
+    chunk_summarized, token) followed by a final result event. Concurrent streams of the same file
+    share one run and all receive its events.
+    """
     try:
         user_id = user["user"]["id"]
         
         print(f"Processing document for user: {user_id}")
         
-        # Validate file type
-        if not validate_file_type(file, ['text/', 'application/pdf', 'image/']):
-            raise HTTPException(status_code=400, detail="Invalid file type. Only PDF, DOCX, TXT, and images are supported.")
-        
-        # Save uploaded file
-        file_path = save_upload_file(file)
+        # Stream the upload to disk, validating its type and hashing it on the way
+        upload = await ingest_upload(file, ['text/', 'application/pdf', 'image/'])
         
-        try:
-            # Extract text based on file type
-            if file.content_type.startswith('image/'):
-                print("Processing image file...")
-                extracted_text = ocr_service.extract_text_from_image(file_path)
-                print(f"Extracted text length: {len(extracted_text)}")
-                
-                # Generate summary
-                summary = chatgpt_service.get_summary(extracted_text)
-                
-            else:
-                print("Processing document file...")
-                # Extract text with chunking for large documents
-                full_text = document_service.extract_text(file_path)
-                print(f"Extracted text length: {len(full_text)}")
-                
-                # Check if document is large and needs chunking
-                if len(full_text) > 3000:
-                    print("Large document detected, using chunked processing...")
-                    text_chunks = document_service.extract_text_chunked(file_path)
-                    print(f"Split into {len(text_chunks)} chunks")
-                    summary = chatgpt_service.get_chunked_summary(text_chunks)
-                else:
-                    print("Small document, using direct processing...")
-                    summary = chatgpt_service.get_summary(full_text)
-            
-            # Parse summary into structured format
-            parsed_summary = parse_summary_response(summary)
-            
-            return {
-                "success": True,
-                "filename": file.filename,
-                "summary": parsed_summary,
-                "text_preview": (extracted_text if 'extracted_text' in locals() else full_text)[:500] + "..." if len(extracted_text if 'extracted_text' in locals() else full_text) > 500 else (extracted_text if 'extracted_text' in locals() else full_text),
-                "full_text_length": len(extracted_text if 'extracted_text' in locals() else full_text)
-            }
-            
-        except Exception as e:
-            print(f"Error processing file: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"Processing error: {str(e)}")
-            
-        finally:
-            cleanup_file(file_path)
+        if stream:
+            return event_stream_response(lambda emit: summarize_upload(upload, emit))
+        return await summarize_upload(upload)
             
     except HTTPException:
         raise
@@ -94,57 +60,103 @@ async def upload_document(
         print(f"Upload error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def summarize_upload(upload: SavedUpload, emit=no_events) -> dict:
+    """Summarize a saved upload, sharing the work with concurrent uploads of the same file"""
+    key = ""
+    try:
+        chunk_tokens = chatgpt_service.map_chunk_tokens()
+        key = f"summary:{upload.sha256}:{chunk_tokens}"
+        full_text, summary = await pipeline_flights.do(
+            key,
+            lambda events=no_events: summarize_file(upload.content_type, upload.path, upload.sha256, chunk_tokens, events),
+            shared_events(emit)
+        )
+        
+        # Parse summary into structured format
+        parsed_summary = parse_summary_response(summary)
+        
+        return {
+            "success": True,
+            "filename": upload.filename,
+            "summary": parsed_summary,
+            "text_preview": full_text[:500] + "..." if len(full_text) > 500 else full_text,
+            "full_text_length": len(full_text)
+        }
+        
+    except Exception as e:
+        print(f"Error processing file: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Processing error: {str(e)}")
+        
+    finally:
+        # A coalesced computation may still be reading the file
+        pipeline_flights.when_idle(key, lambda: cleanup_file(upload.path))
+
+async def summarize_file(content_type: str, file_path: str, digest: str, chunk_tokens: int, emit=no_events):
+    """Extract, chunk and summarize a saved file, returning (full_text, summary)"""
+    # Extract text based on file type
+    if content_type.startswith('image/'):
+        print("Processing image file...")
+        with stage_timer("documents_upload", "ocr"):
+            full_text = await ocr_service.extract_text_from_image(file_path, on_page=chunk_progress(emit, "ocr_page"))
+        print(f"Extracted text length: {len(full_text)}")
+        emit("extracted", {"text_length": len(full_text)})
+        
+        # Generate summary
+        with stage_timer("documents_upload", "summarize"):
+            summary = await chatgpt_service.get_summary(full_text, on_token=stream_tokens(emit))
+        return full_text, summary
+    
+    print("Processing document file...")
+    with stage_timer("documents_upload", "extract"):
+        extraction = await document_service.extract_async(file_path, digest)
+    full_text = extraction.text
+    print(f"Extracted text length: {len(full_text)}")
+    emit("extracted", {"text_length": len(full_text)})
+    
+    # Chunk only when the document does not fit in one full map-sized request
+    if chatgpt_service.budget.count(full_text) > chunk_tokens:
+        print("Large document detected, using chunked processing...")
+        # Keep the most informative sentences so the map step sees fewer tokens
+        with stage_timer("documents_upload", "chunk"):
+            text_chunks = await asyncio.to_thread(extraction.chunks, chunk_tokens, True)
+        print(f"Split into {len(text_chunks)} chunks")
+        emit("chunked", {"chunks": len(text_chunks)})
+        with stage_timer("documents_upload", "summarize"):
+            summary = await chatgpt_service.get_chunked_summary(
+                text_chunks,
+                on_progress=chunk_progress(emit, "chunk_summarized"),
+                on_token=stream_tokens(emit)
+            )
+    else:
+        print("Small document, using direct processing...")
+        with stage_timer("documents_upload", "summarize"):
+            summary = await chatgpt_service.get_summary(full_text, on_token=stream_tokens(emit))
+    
+    return full_text, summary
+
 @router.post("/generate-questions")
 async def generate_questions_from_document(
     file: UploadFile = File(...),
     num_questions: int = 10,
+    stream: bool = False,
     user = Depends(get_current_user)
 ):
-    """Generate practice questions from document with chunked processing"""
+    """Generate practice questions from document with chunked processing
+
+    With ?stream=true the response is a text/event-stream of stage events followed by a final
+    result event. Concurrent streams of the same file share one run and all receive its events.
+    """
     try:
         user_id = user["user"]["id"]
         
         print(f"Generating questions for user: {user_id}")
         
-        # Validate file type
-        if not validate_file_type(file, ['text/', 'application/pdf', 'image/']):
-            raise HTTPException(status_code=400, detail="Invalid file type")
-        
-        file_path = save_upload_file(file)
+        # Stream the upload to disk, validating its type and hashing it on the way
+        upload = await ingest_upload(file, ['text/', 'application/pdf', 'image/'])
         
-        try:
-            # Extract text
-            if file.content_type.startswith('image/'):
-                extracted_text = ocr_service.extract_text_from_image(file_path)
-            else:
-                extracted_text = document_service.extract_text(file_path)
-            
-            print(f"Extracted text length for questions: {len(extracted_text)}")
-            
-            # Generate questions with chunking for large documents
-            if len(extracted_text) > 4000:
-                print("Large document detected, using chunked question generation...")
-                text_chunks = document_service.extract_text_chunked(file_path)
-                questions = chatgpt_service.generate_chunked_questions(text_chunks, num_questions)
-            else:
-                questions = chatgpt_service.generate_questions(extracted_text, num_questions)
-            
-            # Parse questions into structured format
-            parsed_questions = parse_questions_response(questions)
-            
-            return {
-                "success": True,
-                "filename": file.filename,
-                "questions": parsed_questions,
-                "total_questions": len(parsed_questions.get("questions", []))
-            }
-            
-        except Exception as e:
-            print(f"Error generating questions: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"Question generation error: {str(e)}")
-            
-        finally:
-            cleanup_file(file_path)
+        if stream:
+            return event_stream_response(lambda emit: questions_for_upload(upload, num_questions, emit))
+        return await questions_for_upload(upload, num_questions)
             
     except HTTPException:
         raise
@@ -152,6 +164,67 @@ async def generate_questions_from_document(
         print(f"Question generation endpoint error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def questions_for_upload(upload: SavedUpload, num_questions: int, emit=no_events) -> dict:
+    """Generate practice questions for a saved upload, sharing the work with concurrent duplicates"""
+    key = ""
+    try:
+        chunk_tokens = chatgpt_service.map_chunk_tokens()
+        key = f"questions:{upload.sha256}:{num_questions}:{chunk_tokens}"
+        questions = await pipeline_flights.do(
+            key,
+            lambda events=no_events: questions_for_file(upload.content_type, upload.path, upload.sha256, num_questions, chunk_tokens, events),
+            shared_events(emit)
+        )
+        
+        # Parse questions into structured format
+        parsed_questions = parse_questions_response(questions)
+        
+        return {
+            "success": True,
+            "filename": upload.filename,
+            "questions": parsed_questions,
+            "total_questions": len(parsed_questions.get("questions", []))
+        }
+        
+    except Exception as e:
+        print(f"Error generating questions: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Question generation error: {str(e)}")
+        
+    finally:
+        # A coalesced computation may still be reading the file
+        pipeline_flights.when_idle(key, lambda: cleanup_file(upload.path))
+
+async def questions_for_file(content_type: str, file_path: str, digest: str, num_questions: int, chunk_tokens: int, emit=no_events) -> str:
+    """Extract a saved file and generate practice questions from it"""
+    # Extract text
+    with stage_timer("documents_questions", "extract"):
+        if content_type.startswith('image/'):
+            extraction = ExtractionResult([
+                await ocr_service.extract_text_from_image(file_path, on_page=chunk_progress(emit, "ocr_page"))
+            ])
+        else:
+            extraction = await document_service.extract_async(file_path, digest)
+    extracted_text = extraction.text
+    
+    print(f"Extracted text length for questions: {len(extracted_text)}")
+    emit("extracted", {"text_length": len(extracted_text)})
+    
+    # Generate questions with chunking for large documents
+    if chatgpt_service.budget.count(extracted_text) > chunk_tokens:
+        print("Large document detected, using chunked question generation...")
+        with stage_timer("documents_questions", "chunk"):
+            text_chunks = await asyncio.to_thread(extraction.chunks, chunk_tokens, True)
+        emit("chunked", {"chunks": len(text_chunks)})
+        with stage_timer("documents_questions", "generate"):
+            return await chatgpt_service.generate_chunked_questions(
+                text_chunks,
+                num_questions,
+                on_progress=chunk_progress(emit, "chunk_questions_generated"),
+                on_token=stream_tokens(emit)
+            )
+    with stage_timer("documents_questions", "generate"):
+        return await chatgpt_service.generate_questions(extracted_text, num_questions, on_token=stream_tokens(emit))
+
 def parse_summary_response(summary_text: str) -> dict:
     """Parse the summary response into structured format"""
     try:
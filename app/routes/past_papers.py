@@ -7,7 +7,9 @@ from app.services.document_service import DocumentService
 from app.services.ocr_service import OCRService
 from app.services.chatgpt_service import ChatGPTService
 from app.services.auth_service import AuthService
-from app.utils.file_handling import save_upload_file, cleanup_file, validate_file_type
+from app.utils.file_handling import ingest_upload, cleanup_file
+from app.utils.single_flight import pipeline_flights
+from app.services.metrics import stage_timer
 
 router = APIRouter()
 document_service = DocumentService()
@@ -37,49 +39,25 @@ async def analyze_past_papers(
         
         print(f"Past paper analysis for user: {user_id}")
         
-        # Validate files
-        if not validate_file_type(study_material_file, ['text/', 'application/pdf', 'image/']):
-            raise HTTPException(status_code=400, detail="Invalid study material file type")
-        if not validate_file_type(past_paper_file, ['text/', 'application/pdf', 'image/']):
-            raise HTTPException(status_code=400, detail="Invalid past paper file type")
-        
-        # Save files
-        study_material_path = save_upload_file(study_material_file)
-        past_paper_path = save_upload_file(past_paper_file)
+        # Stream both files to disk, validating their types and hashing them on the way
+        study_material = await upload_or_error(study_material_file, "study material")
+        try:
+            past_paper = await upload_or_error(past_paper_file, "past paper")
+        except HTTPException:
+            cleanup_file(study_material.path)
+            raise
         
+        key = ""
         try:
-            # Extract text from study material (with chunking for large files)
-            print("Extracting text from study material...")
-            if study_material_file.content_type.startswith('image/'):
-                study_material_text = ocr_service.extract_text_from_image(study_material_path)
-            else:
-                study_material_text = document_service.extract_text(study_material_path)
-            
-            print(f"Study material text length: {len(study_material_text)}")
-            
-            # Extract text from past paper (usually smaller)
-            print("Extracting text from past paper...")
-            if past_paper_file.content_type.startswith('image/'):
-                past_paper_text = ocr_service.extract_text_from_image(past_paper_path)
-            else:
-                past_paper_text = document_service.extract_text(past_paper_path)
-            
-            print(f"Past paper text length: {len(past_paper_text)}")
-            
-            # Handle large study materials with chunking
-            if len(study_material_text) > 8000:
-                print("Large study material detected, using chunked processing...")
-                study_chunks = document_service.extract_text_chunked(study_material_path)
-                # Use first few chunks for analysis (most important content)
-                study_material_text = " ".join(study_chunks[:5])
-                print(f"Using first {len(study_chunks[:5])} chunks of study material")
-            
-            # Analyze with ChatGPT
-            print("Analyzing with ChatGPT...")
-            analysis_result = chatgpt_service.analyze_past_papers(
-                study_material_text, 
-                past_paper_text, 
-                num_questions
+            # Identical uploads of the same pair share one analysis
+            key = f"past-paper:{study_material.sha256}:{past_paper.sha256}:{num_questions}"
+            study_material_length, past_paper_length, analysis_result = await pipeline_flights.do(
+                key,
+                lambda: analyze_files(
+                    study_material.content_type, study_material.path, study_material.sha256,
+                    past_paper.content_type, past_paper.path, past_paper.sha256,
+                    num_questions
+                )
             )
             
             # Parse the response
@@ -90,8 +68,8 @@ async def analyze_past_papers(
                 "study_material_filename": study_material_file.filename,
                 "past_paper_filename": past_paper_file.filename,
                 "analysis": parsed_result,
-                "study_material_length": len(study_material_text),
-                "past_paper_length": len(past_paper_text)
+                "study_material_length": study_material_length,
+                "past_paper_length": past_paper_length
             }
             
         except Exception as e:
@@ -99,8 +77,12 @@ async def analyze_past_papers(
             raise HTTPException(status_code=500, detail=f"Analysis error: {str(e)}")
             
         finally:
-            cleanup_file(study_material_path)
-            cleanup_file(past_paper_path)
+            def cleanup():
+                cleanup_file(study_material.path)
+                cleanup_file(past_paper.path)
+            
+            # A coalesced computation may still be reading the files
+            pipeline_flights.when_idle(key, cleanup)
             
     except HTTPException:
         raise
@@ -108,6 +90,50 @@ async def analyze_past_papers(
         print(f"Past paper analysis endpoint error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def upload_or_error(file: UploadFile, label: str):
+    """ingest_upload, naming which of the two files was rejected"""
+    try:
+        return await ingest_upload(file, ['text/', 'application/pdf', 'image/'])
+    except HTTPException as e:
+        if e.status_code == 400:
+            raise HTTPException(status_code=400, detail=f"Invalid {label} file type")
+        raise
+
+async def analyze_files(study_material_type: str, study_material_path: str, study_digest: str,
+                        past_paper_type: str, past_paper_path: str, past_digest: str, num_questions: int):
+    """Extract both files and analyze them, returning (study_material_length, past_paper_length, analysis)"""
+    # Extract text from study material
+    print("Extracting text from study material...")
+    with stage_timer("past_papers_analyze", "extract"):
+        if study_material_type.startswith('image/'):
+            study_material_text = await ocr_service.extract_text_from_image(study_material_path)
+        else:
+            extraction = await document_service.extract_async(study_material_path, study_digest)
+            study_material_text = extraction.text
+        
+        print(f"Study material text length: {len(study_material_text)}")
+        
+        # Extract text from past paper (usually smaller)
+        print("Extracting text from past paper...")
+        if past_paper_type.startswith('image/'):
+            past_paper_text = await ocr_service.extract_text_from_image(past_paper_path)
+        else:
+            extraction = await document_service.extract_async(past_paper_path, past_digest)
+            past_paper_text = extraction.text
+        
+        print(f"Past paper text length: {len(past_paper_text)}")
+    
+    # Analyze with ChatGPT (both texts are fitted to the prompt token budget)
+    print("Analyzing with ChatGPT...")
+    with stage_timer("past_papers_analyze", "analyze"):
+        analysis_result = await chatgpt_service.analyze_past_papers(
+            study_material_text, 
+            past_paper_text, 
+            num_questions
+        )
+    
+    return len(study_material_text), len(past_paper_text), analysis_result
+
 def parse_past_paper_analysis(analysis_text: str) -> dict:
     """Parse the past paper analysis response into structured format"""
     try:
@@ -3,7 +3,7 @@ from fastapi.security import HTTPBearer
 from app.services.ocr_service import OCRService
 from app.services.chatgpt_service import ChatGPTService
 from app.services.auth_service import AuthService
-from app.utils.file_handling import save_upload_file, cleanup_file, validate_file_type
+from app.utils.file_handling import ingest_upload, cleanup_file
 
 router = APIRouter()
 ocr_service = OCRService()
@@ -27,25 +27,22 @@ async def generate_questions(
         extracted_text = ""
         
         if file:
-            # Validate file type
-            if not validate_file_type(file, ['text/', 'application/pdf', 'image/']):
-                raise HTTPException(status_code=400, detail="Invalid file type")
-            
-            file_path = save_upload_file(file)
+            # Stream the upload to disk, validating its type on the way
+            upload = await ingest_upload(file, ['text/', 'application/pdf', 'image/'])
             
             try:
-                if file.content_type.startswith('image/'):
-                    extracted_text = ocr_service.extract_text_from_image(file_path)
+                if upload.content_type.startswith('image/'):
+                    extracted_text = await ocr_service.extract_text_from_image(upload.path)
                 else:
-                    with open(file_path, 'r', encoding='utf-8') as f:
+                    with open(upload.path, 'r', encoding='utf-8') as f:
                         extracted_text = f.read()
             finally:
-                cleanup_file(file_path)
+                cleanup_file(upload.path)
         else:
             extracted_text = text
         
         # Generate questions using ChatGPT
-        questions = chatgpt_service.generate_questions(extracted_text)
+        questions = await chatgpt_service.generate_questions(extracted_text)
         
         return {
             "success": True,
@@ -1,11 +1,16 @@
 from fastapi import APIRouter, HTTPException, Depends, Header
 from pydantic import BaseModel
 from typing import Optional
+import asyncio
 import time
 from app.services.youtube_service import YouTubeService
 from app.services.chatgpt_service import ChatGPTService
 from app.services.auth_service import AuthService
 from app.services.summary_service import SummaryService
+from app.services.extractive_compressor import extractive_compressor
+from app.services.metrics import stage_timer
+from app.utils.sse import event_stream_response, no_events, stream_tokens, chunk_progress, shared_events
+from app.utils.single_flight import pipeline_flights
 
 router = APIRouter()
 youtube_service = YouTubeService()
@@ -15,8 +20,9 @@ summary_service = SummaryService()
 
 class YouTubeSummaryRequest(BaseModel):
     video_url: str
-    chunk_minutes: Optional[int] = 5  # Reduced to 5 minutes for better handling
+    chunk_minutes: Optional[int] = 5  # Kept for client compatibility, chunking is token-budget based
     target_language: Optional[str] = "Urdu"
+    stream: Optional[bool] = False  # Server-sent events with stage progress and summary tokens
 
 @router.post("/summarize")
 async def summarize_youtube_video(request: YouTubeSummaryRequest, authorization: str = Header(None)):
@@ -27,43 +33,31 @@ async def summarize_youtube_video(request: YouTubeSummaryRequest, authorization:
         
         token = authorization.replace("Bearer ", "")
         user_data = auth_service.get_current_user(token)
+        
+        if request.stream:
+            return event_stream_response(lambda emit: summarize_video(request, user_data, emit))
+        return await summarize_video(request, user_data)
+            
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"YouTube summarization error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to process video: {str(e)}")
+
+async def summarize_video(request: YouTubeSummaryRequest, user_data: dict, emit=no_events) -> dict:
+    """Summarize a video and save it for the user, sharing the work with concurrent requests for the same video"""
+    try:
         start_time = time.time()
         
         print(f"Processing YouTube video: {request.video_url}")
         
-        # Get transcript with timestamps
-        transcript = youtube_service.get_transcript_with_timestamps(request.video_url)
-        if not transcript:
-            raise HTTPException(status_code=400, detail="No transcript available for this video")
-        
-        print(f"Found {len(transcript)} transcript segments")
-        
-        # Get clean text only
-        clean_text = youtube_service.get_transcript_text_only(transcript)
-        
-        print(f"Clean text length: {len(clean_text)} characters")
-        
-        # For long videos, use size-based chunking instead of time-based
-        chunks = []
-        if len(clean_text) > 8000:
-            # Use size-based chunking for API limits
-            chunks = youtube_service.chunk_transcript_by_size(clean_text, 6000)
-            print(f"Using size-based chunking: {len(chunks)} chunks")
-        elif len(clean_text) > 3000:
-            # Use time-based chunking for medium videos
-            chunks = youtube_service.chunk_transcript_by_time(transcript, request.chunk_minutes)
-            print(f"Using time-based chunking: {len(chunks)} chunks")
-        else:
-            chunks = [clean_text]
-            print("Using single chunk processing")
-        
-        # Generate summary
-        if len(chunks) > 1:
-            print("Using chunked summary approach...")
-            summary = chatgpt_service.get_chunked_summary(chunks)
-        else:
-            print("Using single summary approach...")
-            summary = chatgpt_service.get_summary(clean_text)
+        chunk_tokens = chatgpt_service.map_chunk_tokens()
+        video_id = youtube_service.extract_video_id(request.video_url) or request.video_url.strip()
+        transcript_segments, clean_text, chunk_count, summary = await pipeline_flights.do(
+            f"youtube-summary:{video_id}:{chunk_tokens}",
+            lambda events=no_events: summarize_transcript(request.video_url, chunk_tokens, events),
+            shared_events(emit)
+        )
         
         processing_time = time.time() - start_time
         
@@ -83,17 +77,61 @@ async def summarize_youtube_video(request: YouTubeSummaryRequest, authorization:
         return {
             "success": True,
             "video_url": request.video_url,
-            "transcript_segments": len(transcript),
-            "chunks_processed": len(chunks),
+            "transcript_segments": transcript_segments,
+            "chunks_processed": chunk_count,
             "summary": summary,
             "full_transcript": clean_text[:800] + "..." if len(clean_text) > 800 else clean_text,
             "processing_time": round(processing_time, 2),
             "saved_summary_id": saved_summary["id"] if saved_summary else None,
-            "message": f"Processed {len(transcript)} segments in {len(chunks)} chunk(s)"
+            "message": f"Processed {transcript_segments} segments in {chunk_count} chunk(s)"
         }
             
     except HTTPException:
         raise
     except Exception as e:
         print(f"YouTube summarization error: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Failed to process video: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to process video: {str(e)}")
+
+async def summarize_transcript(video_url: str, chunk_tokens: int, emit=no_events):
+    """Fetch, chunk and summarize a video transcript, returning (segments, clean_text, chunks, summary)"""
+    # Get transcript with timestamps
+    with stage_timer("youtube_summarize", "transcript"):
+        transcript = await youtube_service.get_transcript_with_timestamps(video_url)
+    if not transcript:
+        raise HTTPException(status_code=400, detail="No transcript available for this video")
+    
+    print(f"Found {len(transcript)} transcript segments")
+    
+    # Get clean text only
+    clean_text = youtube_service.get_transcript_text_only(transcript)
+    
+    print(f"Clean text length: {len(clean_text)} characters")
+    emit("extracted", {"transcript_segments": len(transcript), "text_length": len(clean_text)})
+    
+    # Chunk only when the transcript does not fit in one full map-sized request
+    if chatgpt_service.budget.count(clean_text) > chunk_tokens:
+        # Keep the most informative sentences so the map step sees fewer tokens
+        with stage_timer("youtube_summarize", "chunk"):
+            compressed = await asyncio.to_thread(extractive_compressor.compress, clean_text)
+            chunks = await asyncio.to_thread(youtube_service.chunk_transcript_by_size, compressed, chunk_tokens)
+        print(f"Using token-budget chunking: {len(chunks)} chunks")
+    else:
+        chunks = [clean_text]
+        print("Using single chunk processing")
+    emit("chunked", {"chunks": len(chunks)})
+    
+    # Generate summary
+    if len(chunks) > 1:
+        print("Using chunked summary approach...")
+        with stage_timer("youtube_summarize", "summarize"):
+            summary = await chatgpt_service.get_chunked_summary(
+                chunks,
+                on_progress=chunk_progress(emit, "chunk_summarized"),
+                on_token=stream_tokens(emit)
+            )
+    else:
+        print("Using single summary approach...")
+        with stage_timer("youtube_summarize", "summarize"):
+            summary = await chatgpt_service.get_summary(clean_text, on_token=stream_tokens(emit))
+    
+    return len(transcript), clean_text, len(chunks), summary
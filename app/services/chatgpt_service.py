@@ -1,18 +1,53 @@
-import requests
+import httpx
 import json
 import time
 from app.config import settings
-import aiohttp
-import json
+from app.services.http_client import http_client
+from app.services.rate_limiter import github_models_limiter, estimate_tokens
+from app.services.llm_cache import LLMCache, llm_cache
+from app.services.resilience import UpstreamError, github_models_resilience
+from app.services.token_budget import get_token_budget
+from app.services.model_router import model_router
+from app.services.metrics import track_call, record_usage, record_tokens
+from app.utils.map_reduce import MapReduceExecutor
+from app.utils.question_merge import parse_qa_pairs, merge_questions, format_questions
+
+# System prompt for the per-chunk (map) step of chunked summaries
+CHUNK_SUMMARY_PROMPT = """
+           You are creating a final, comprehensive summary by combining summaries of multiple video segments.
+
+🧠 Objective:
+Produce a cohesive and well-structured final summary that reads naturally, as if summarizing the entire video in one flow.
+
+📋 Guidelines:
+- Capture **all key ideas, insights, facts, and topics** discussed throughout the video.
+- **Eliminate filler words**, repetition, and personal speech patterns.
+- **Do not mention speakers** (e.g., “the host said”, “she explains”).
+- **Exclude promotional or sponsored content** — focus only on educational, informational, or main thematic material.
+- Write from a **neutral, third-person perspective**.
+- Maintain a **professional and informative tone**.
+- Use **short paragraphs or clear bullet points** for readability.
+- Ensure the summary feels **complete and cohesive**, not like separated parts.
+- Do **not** add new information or assumptions not present in the provided summaries.
+
+📘 Output Format:
+A well-written paragraph (or short set of paragraphs) that reads like a complete, natural summary of the entire video that is concise.
+           """
 
 class ChatGPTService:
     def __init__(self):
         self.token = settings.GITHUB_TOKEN
-        self.endpoint = "https://models.github.ai/inference"
-        self.model = "openai/gpt-4.1-mini"
+        self.endpoint = settings.GITHUB_MODELS_ENDPOINT
+        self.model = settings.LLM_MODEL
+        self.budget = get_token_budget(self.model)
+    
+    def map_chunk_tokens(self) -> int:
+        """Token size for map-step chunks: the target budget, capped by what fits beside the prompt"""
+        route = model_router.route("map")
+        return get_token_budget(route.model).chunk_tokens(CHUNK_SUMMARY_PROMPT, route.max_tokens)
     
-    def get_summary(self, text: str):
-        """Get summary for text"""
+    async def get_summary(self, text: str, on_token=None):
+        """Get summary for text, streaming tokens to on_token(text) when given"""
         system_prompt = f"""
        You are summarizing a segment of a YouTube video.
 
@@ -34,60 +69,43 @@ Create a clear and well-structured summary of this specific segment.
 A single well-written paragraph (or short set of paragraphs) summarizing this segment clearly and professionally.
         """
         
-        return self._make_request(system_prompt, text)
+        return await self._make_request("summary", system_prompt, text, on_token=on_token)
     
-    def get_chunked_summary(self, text_chunks: list):
-        """Get summary for chunked text - improved for long documents"""
+    async def get_chunked_summary(self, text_chunks: list, on_progress=None, on_token=None):
+        """Get summary for chunked text - improved for long documents
+
+        Chunks are summarized concurrently; on_progress(completed, total, index, summary)
+        is called as each chunk finishes and on_token(text) receives the final combine as it streams.
+        """
         if not text_chunks:
             return "No content to summarize"
         
         print(f"Processing {len(text_chunks)} chunks...")
         
-        # For very long documents, process in batches
-        if len(text_chunks) > 10:
-            return self._process_large_document(text_chunks)
-        
-        chunk_summaries = []
-        
-        for i, chunk in enumerate(text_chunks):
+        async def summarize_chunk(i, chunk):
             print(f"Processing chunk {i+1}/{len(text_chunks)}...")
-            
-            system_prompt = f"""
-           You are creating a final, comprehensive summary by combining summaries of multiple video segments.
-
-🧠 Objective:
-Produce a cohesive and well-structured final summary that reads naturally, as if summarizing the entire video in one flow.
-
-📋 Guidelines:
-- Capture **all key ideas, insights, facts, and topics** discussed throughout the video.
-- **Eliminate filler words**, repetition, and personal speech patterns.
-- **Do not mention speakers** (e.g., “the host said”, “she explains”).
-- **Exclude promotional or sponsored content** — focus only on educational, informational, or main thematic material.
-- Write from a **neutral, third-person perspective**.
-- Maintain a **professional and informative tone**.
-- Use **short paragraphs or clear bullet points** for readability.
-- Ensure the summary feels **complete and cohesive**, not like separated parts.
-- Do **not** add new information or assumptions not present in the provided summaries.
-
-📘 Output Format:
-A well-written paragraph (or short set of paragraphs) that reads like a complete, natural summary of the entire video that is concise.
-           """
-            
-            try:
-                chunk_summary = self._make_request(system_prompt, chunk[:5000])  # Limit chunk size
-                chunk_summaries.append(chunk_summary)
-                time.sleep(1)  # Rate limiting
-            except Exception as e:
-                print(f"Error processing chunk {i+1}: {e}")
-                chunk_summaries.append(f"Segment {i+1}: [Summary unavailable]")
-        
-        return self._combine_chunk_summaries(chunk_summaries)
+            return await self._make_request("map", CHUNK_SUMMARY_PROMPT, chunk)
+        
+        def unavailable(i, chunk, error):
+            print(f"Error processing chunk {i+1}: {error}")
+            return f"Segment {i+1}: [Summary unavailable]"
+        
+        async def reduce(chunk_summaries):
+            return await self._reduce_summaries(chunk_summaries, on_token=on_token)
+        
+        return await MapReduceExecutor().run(
+            text_chunks,
+            summarize_chunk,
+            reduce,
+            on_progress=on_progress,
+            fallback=unavailable
+        )
     
 
 
 
 
-    def generate_questions(self, text: str, num_questions: int = 5):
+    async def generate_questions(self, text: str, num_questions: int = 5, on_token=None):
         """Generate practice questions from text"""
         system_prompt = f"""
         You are an educational question generator. Create {num_questions} practice questions based on the provided text.
@@ -110,77 +128,128 @@ A well-written paragraph (or short set of paragraphs) that reads like a complete
         Make questions diverse: multiple choice, short answer, and conceptual questions.
         """
         
-        return self._make_request(system_prompt, text)
+        # Regenerating should give a fresh set of practice questions
+        return await self._make_request("questions", system_prompt, text, use_cache=False, on_token=on_token)
     
-    def generate_chunked_questions(self, text_chunks: list, num_questions: int = 10):
-        """Generate questions from chunked text for long documents"""
+    async def generate_chunked_questions(self, text_chunks: list, num_questions: int = 10, on_progress=None, on_token=None):
+        """Generate questions from chunked text for long documents
+
+        Per-chunk questions are merged locally (near-duplicates collapsed, chunks covered in turn);
+        the LLM combine step only runs when the chunk answers cannot be parsed.
+        """
         if not text_chunks:
             return "No content to generate questions from"
         
         print(f"Generating questions from {len(text_chunks)} chunks...")
         
-        # For very long documents, sample key segments
-        if len(text_chunks) > 8:
-            text_chunks = self._sample_document_chunks(text_chunks)
+        # Ask for a little more than an even share so duplicates can be dropped
+        per_chunk = max(2, -(-num_questions // len(text_chunks)) + 1)
         
-        all_questions = []
-        
-        for i, chunk in enumerate(text_chunks):
+        async def questions_for_chunk(i, chunk):
             print(f"Generating questions from chunk {i+1}/{len(text_chunks)}...")
             
             system_prompt = f"""
             You are generating practice questions from part {i+1} of {len(text_chunks)} of a document.
-            Create 2-3 high-quality questions from this segment.
-            Include answers for each question.
+            Create {per_chunk} high-quality questions from this segment.
+            
+            Format your response as:
+            QUESTIONS:
+            1. [Question 1]
+            2. [Question 2]
+            
+            ANSWERS:
+            1. [Answer 1]
+            2. [Answer 2]
             """
             
-            try:
-                chunk_questions = self._make_request(system_prompt, chunk[:4000])
-                all_questions.append(chunk_questions)
-                time.sleep(1)  # Rate limiting
-            except Exception as e:
-                print(f"Error generating questions from chunk {i+1}: {e}")
-                all_questions.append(f"Questions from segment {i+1}: [Unavailable]")
-        
-        return self._combine_questions(all_questions, num_questions)
+            return await self._make_request("chunk_questions", system_prompt, chunk, use_cache=False)
+        
+        def unavailable(i, chunk, error):
+            print(f"Error generating questions from chunk {i+1}: {error}")
+            return f"Questions from segment {i+1}: [Unavailable]"
+        
+        async def combine(all_questions):
+            parsed = [parse_qa_pairs(questions) for questions in all_questions]
+            if not any(parsed):
+                print("Could not parse chunk questions, combining with the model...")
+                return await self._combine_questions(all_questions, num_questions, on_token)
+            
+            selected = merge_questions(parsed, num_questions)
+            print(f"Merged {sum(len(pairs) for pairs in parsed)} chunk questions into {len(selected)}")
+            result = format_questions(selected)
+            if on_token:
+                on_token(result)
+            return result
+        
+        return await MapReduceExecutor().run(
+            text_chunks,
+            questions_for_chunk,
+            combine,
+            on_progress=on_progress,
+            fallback=unavailable
+        )
     
-    def _process_large_document(self, text_chunks: list):
-        """Process very long documents by sampling key segments"""
-        print("Large document detected, using sampling strategy...")
+    async def _reduce_summaries(self, summaries: list, level: int = 1, on_token=None):
+        """Tree-reduce chunk summaries until they fit in a single final combine prompt
+
+        Summaries are packed into batches that fit the reduce token budget, each batch is merged
+        in parallel, and the merged summaries are reduced again. Every batch holds at least two
+        summaries, so the depth is O(log n) and every chunk contributes to the result.
+        """
+        if len(summaries) == 1 or self._combined_tokens(summaries) <= settings.REDUCE_INPUT_TOKENS:
+            return await self._combine_chunk_summaries(summaries, on_token)
         
-        sampled_chunks = self._sample_document_chunks(text_chunks)
-        print(f"Sampled {len(sampled_chunks)} key segments from {len(text_chunks)} total chunks")
+        batches = self._batch_by_token_budget(summaries, settings.REDUCE_INPUT_TOKENS)
+        print(f"Reduce level {level}: merging {len(summaries)} summaries in {len(batches)} batches...")
         
-        return self.get_chunked_summary(sampled_chunks)
+        async def merge_batch(i, batch):
+            return await self._merge_partial_summaries(batch)
+        
+        def keep_unmerged(i, batch, error):
+            print(f"Error merging batch {i+1} at level {level}: {error}")
+            return "\n\n".join(batch)
+        
+        merged = await MapReduceExecutor().map(batches, merge_batch, fallback=keep_unmerged)
+        return await self._reduce_summaries(merged, level + 1, on_token)
+    
+    def _combined_tokens(self, summaries: list) -> int:
+        return sum(self.budget.count(summary) for summary in summaries)
     
-    def _sample_document_chunks(self, text_chunks: list) -> list:
-        """Sample representative chunks from document"""
-        total_chunks = len(text_chunks)
-        sample_indices = []
-        
-        # Always include first and last chunks
-        sample_indices.append(0)
-        if total_chunks > 1:
-            sample_indices.append(total_chunks - 1)
-        
-        # Include middle chunks 
-        if total_chunks > 3:
-            middle = total_chunks // 2
-            sample_indices.append(middle)
-            if total_chunks > 5:
-                sample_indices.append(middle - 1)
-                sample_indices.append(middle + 1)
-        
-        # Include some random chunks for diversity
-        if total_chunks > 8:
-            import random
-            extra_samples = min(3, total_chunks - len(sample_indices))
-            available_indices = [i for i in range(total_chunks) if i not in sample_indices]
-            sample_indices.extend(random.sample(available_indices, extra_samples))
-        
-        return [text_chunks[i] for i in sorted(set(sample_indices))]
+    def _batch_by_token_budget(self, summaries: list, budget: int) -> list:
+        """Group consecutive summaries into batches of at most `budget` tokens (minimum two per batch)"""
+        batches = []
+        current, current_tokens = [], 0
+        for summary in summaries:
+            tokens = self.budget.count(summary)
+            if len(current) >= 2 and current_tokens + tokens > budget:
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(summary)
+            current_tokens += tokens
+        
+        if len(current) == 1 and batches:
+            batches[-1].append(current[0])
+        elif current:
+            batches.append(current)
+        return batches
+    
+    async def _merge_partial_summaries(self, summaries: list):
+        """Merge summaries of consecutive parts into one summary of that section"""
+        combined_text = "\n\n".join([
+            f"PART {i+1} SUMMARY:\n{summary}" 
+            for i, summary in enumerate(summaries)
+        ])
+        
+        system_prompt = """
+        You are merging summaries of consecutive parts of a long document into one summary of that section.
+        Keep every key idea, fact, definition and topic from the parts, in their original order.
+        Remove repetition between parts and do not add information that is not in the summaries.
+        Write in a neutral, third-person, informative tone using short paragraphs or bullet points.
+        """
+        
+        return await self._make_request("merge", system_prompt, combined_text)
     
-    def _combine_chunk_summaries(self, chunk_summaries: list):
+    async def _combine_chunk_summaries(self, chunk_summaries: list, on_token=None):
         """Combine individual chunk summaries into final summary"""
         combined_text = "\n\n".join([
             f"PART {i+1} SUMMARY:\n{summary}" 
@@ -209,10 +278,10 @@ A well-written paragraph (or short set of paragraphs) that reads like a complete
         
         """
         
-        return self._make_request(system_prompt, combined_text)
+        return await self._make_request("combine", system_prompt, combined_text, on_token=on_token)
     
     # Add this method to your existing ChatGPTService class
-    def analyze_past_papers(self, study_material: str, past_paper: str, num_questions: int = 10):
+    async def analyze_past_papers(self, study_material: str, past_paper: str, num_questions: int = 10):
         """Analyze past papers and generate questions based on patterns"""
         system_prompt = f"""
         You are an expert exam question predictor. Analyze the study material and past paper patterns to generate {num_questions} likely exam questions.
@@ -252,16 +321,25 @@ A well-written paragraph (or short set of paragraphs) that reads like a complete
         Make the questions realistic and similar to what would appear in an actual exam.
         """
         
+        # Share the input budget: the past paper gets up to 40%, study material the rest
+        route = model_router.route("past_paper")
+        budget = get_token_budget(route.model)
+        available = budget.input_budget(system_prompt, route.max_tokens) - 50
+        past_paper, _ = budget.truncate(past_paper, int(available * 0.4), "past paper")
+        study_material, _ = budget.truncate(
+            study_material, available - budget.count(past_paper), "study material"
+        )
+        
         content = f"""STUDY MATERIAL CONTENT:
-    {study_material[:8000]}
+    {study_material}
 
     PAST PAPER CONTENT:
-    {past_paper[:6000]}
+    {past_paper}
     """
         
-        return self._make_request(system_prompt, content)
+        return await self._make_request("past_paper", system_prompt, content)
     
-    def _combine_questions(self, all_questions: list, num_questions: int):
+    async def _combine_questions(self, all_questions: list, num_questions: int, on_token=None):
         """Combine questions from chunks and select best ones"""
         combined_text = "\n\n".join([
             f"QUESTIONS FROM PART {i+1}:\n{questions}" 
@@ -291,38 +369,135 @@ A well-written paragraph (or short set of paragraphs) that reads like a complete
         Remove duplicates and select the most important questions.
         """
         
-        return self._make_request(system_prompt, combined_text)
+        return await self._make_request("combine_questions", system_prompt, combined_text, use_cache=False, on_token=on_token)
     
-    def _make_request(self, system_prompt: str, user_content: str):
+    async def _make_request(self, stage: str, system_prompt: str, user_content: str, timeout: float = 60, use_cache: bool = True, on_token=None):
+        """Send one chat completion for a pipeline stage
+
+        The model and max_tokens come from the stage's route for this input size. Pass
+        use_cache=False where a fresh answer is wanted every time. When on_token is given the
+        completion is requested with stream=true and each content delta is passed to on_token(text).
+        """
+        temperature = 0.7
+        input_tokens = self.budget.count(user_content)
+        route = model_router.route(stage, input_tokens)
+        model, max_tokens = route.model, route.max_tokens
+        budget = get_token_budget(model)
+        user_content, _ = budget.truncate(
+            user_content, budget.input_budget(system_prompt, max_tokens), "request content"
+        )
+        cache_key = LLMCache.make_key(model, system_prompt, user_content, temperature, max_tokens)
+        if use_cache:
+            cached = await llm_cache.get(cache_key)
+            if cached is not None:
+                model_router.record(stage, model, input_tokens, 0.0, cached=True)
+                if on_token:
+                    on_token(cached)
+                return cached
+        
         headers = {
             "Authorization": f"Bearer {self.token}",
             "Content-Type": "application/json"
         }
         
         data = {
-            "model": self.model,
+            "model": model,
             "messages": [
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_content}
             ],
-            "temperature": 0.7,
-            "max_tokens": 2000
+            "temperature": temperature,
+            "max_tokens": max_tokens
         }
         
+        reserved_tokens = estimate_tokens(system_prompt, user_content) + max_tokens
+        streamed = []
+        
+        def forward(delta: str):
+            streamed.append(delta)
+            on_token(delta)
+        
+        async def attempt():
+            async with github_models_limiter.slot(reserved_tokens) as slot, track_call("github-models", stage):
+                if not on_token:
+                    return await self._post(headers, data, timeout, slot)
+                try:
+                    return await self._post_streaming(headers, data, timeout, slot, forward)
+                except httpx.HTTPError as e:
+                    if streamed:
+                        # Deltas already reached the client, a retry would repeat them
+                        raise UpstreamError(f"ChatGPT API stream was interrupted: {str(e)}")
+                    raise
+        
+        start = time.perf_counter()
         try:
-            response = requests.post(
-                f"{self.endpoint}/chat/completions", 
-                headers=headers, 
-                data=json.dumps(data),
-                timeout=60
-            )
-            response.raise_for_status()
-            result = response.json()
-            return result['choices'][0]['message']['content']
-        except requests.exceptions.Timeout:
-            raise Exception("ChatGPT API request timed out")
+            # A streamed answer cannot be hedged, the client would see both copies
+            content = await github_models_resilience.call(attempt, hedge=not on_token)
+        except UpstreamError:
+            # Open circuits and interrupted streams already carry their status and message
+            raise
+        except httpx.TimeoutException as e:
+            raise UpstreamError("ChatGPT API request timed out", status_code=504) from e
+        except httpx.HTTPStatusError as e:
+            raise UpstreamError(f"ChatGPT API error: {str(e)}", status_code=e.response.status_code) from e
         except Exception as e:
-            raise Exception(f"ChatGPT API error: {str(e)}")
+            raise UpstreamError(f"ChatGPT API error: {str(e)}") from e
+        model_router.record(stage, model, input_tokens, time.perf_counter() - start)
+        
+        if use_cache:
+            await llm_cache.set(cache_key, content)
+        return content
+    
+    async def _post(self, headers: dict, data: dict, timeout: float, slot) -> str:
+        response = await http_client.client.post(
+            f"{self.endpoint}/chat/completions", 
+            headers=headers, 
+            json=data,
+            timeout=timeout
+        )
+        result = response.json() if response.is_success else {}
+        slot.observe(response.status_code, response.headers, used_tokens=result.get('usage', {}).get('total_tokens'))
+        response.raise_for_status()
+        record_usage("github-models", data["model"], result.get('usage'))
+        return result['choices'][0]['message']['content']
+    
+    async def _post_streaming(self, headers: dict, data: dict, timeout: float, slot, on_token) -> str:
+        """Read a stream=true completion as server-sent events, forwarding each delta"""
+        parts = []
+        async with http_client.client.stream(
+            "POST",
+            f"{self.endpoint}/chat/completions",
+            headers=headers,
+            json={**data, "stream": True},
+            timeout=timeout
+        ) as response:
+            slot.observe(response.status_code, response.headers)
+            if not response.is_success:
+                await response.aread()
+                response.raise_for_status()
+            
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                payload = line[len("data:"):].strip()
+                if payload == "[DONE]":
+                    break
+                choices = json.loads(payload).get("choices") or []
+                delta = choices[0].get("delta", {}).get("content") if choices else None
+                if delta:
+                    parts.append(delta)
+                    on_token(delta)
+        
+        # Streamed responses carry no usage block, count locally
+        content = "".join(parts)
+        budget = get_token_budget(data["model"])
+        record_tokens(
+            "github-models", data["model"],
+            sum(budget.count(message["content"]) for message in data["messages"]),
+            budget.count(content)
+        )
+        return content
+
     async def translate_text_async(self, text: str, target_language: str = "Urdu"):
         """Translate text to target language asynchronously"""
         system_prompt = f"""
@@ -333,27 +508,4 @@ A well-written paragraph (or short set of paragraphs) that reads like a complete
         Don't make it too formal - use common spoken language.
         """
         
-        headers = {
-            "Authorization": f"Bearer {self.token}",
-            "Content-Type": "application/json"
-        }
-        
-        data = {
-            "model": self.model,
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": text}
-            ],
-            "temperature": 0.7,
-            "max_tokens": 1000
-        }
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                f"{self.endpoint}/chat/completions", 
-                headers=headers, 
-                data=json.dumps(data),
-                timeout=30
-            ) as response:
-                result = await response.json()
-                return result['choices'][0]['message']['content']
\ No newline at end of file
+        return await self._make_request("translate", system_prompt, text, timeout=30)
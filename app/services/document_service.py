@@ -1,58 +1,211 @@
-try:
-    import pypdf
-except ImportError:
-    import PyPDF2 as pypdf
-import docx
+import asyncio
+import bisect
 import os
+import threading
+import zipfile
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from app.config import settings
+from app.services.token_budget import get_token_budget
+from app.services.pdf_extractor import pdf_extractor
+from app.services.pptx_extractor import pptx_extractor
+from app.services.docx_extractor import docx_extractor
+from app.services.ocr_service import OCRService
+from app.services.extractive_compressor import extractive_compressor
+from app.utils.file_handling import file_sha256
+from app.utils.chunking import Span
+
+class ExtractionResult:
+    """Text of one parsed upload. Full text, page offsets and chunks are derived lazily from the
+    page list and memoized, so a file is parsed once however many views of it are needed."""
+
+    def __init__(self, pages: List[str], separator: str = "\n"):
+        self.pages = pages
+        self.separator = separator
+        self._text: Optional[str] = None
+        self._page_offsets: Optional[List[int]] = None
+        # (source text, chunk spans into it) per (max_tokens, compress)
+        self._chunks: Dict[Tuple[int, bool], Tuple[str, List[Span]]] = {}
+        self._lock = threading.Lock()
+        # Set once scanned pages have been sent to OCR
+        self.ocr_checked = False
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = self.separator.join(self.pages).strip()
+        return self._text
+
+    @property
+    def page_offsets(self) -> List[int]:
+        """Character offset in `text` where each page starts"""
+        if self._page_offsets is None:
+            leading = len(self.pages[0]) - len(self.pages[0].lstrip()) if self.pages else 0
+            offsets, position = [], -leading
+            for page in self.pages:
+                offsets.append(max(0, position))
+                position += len(page) + len(self.separator)
+            self._page_offsets = offsets
+        return self._page_offsets
+
+    def page_at(self, offset: int) -> int:
+        """Zero-based page containing a character offset of `text`"""
+        return max(0, bisect.bisect_right(self.page_offsets, offset) - 1)
+
+    def chunks(self, max_tokens: int = None, compress: bool = False) -> List[str]:
+        """Token-budget chunks of the text, optionally after extractive compression"""
+        key = (max_tokens or settings.LLM_CHUNK_TARGET_TOKENS, compress)
+        with self._lock:
+            if key not in self._chunks:
+                text = extractive_compressor.compress(self.text) if compress else self.text
+                self._chunks[key] = (text, split_into_spans(text, key[0]))
+            text, spans = self._chunks[key]
+        return [text[start:end] for start, end in spans]
+
+    @property
+    def size(self) -> int:
+        # Pages plus the joined text; chunks are spans into it
+        return 2 * sum(len(page) for page in self.pages)
+
+class ExtractionCache:
+    """Byte-bounded LRU of extraction results keyed by file content hash"""
+
+    def __init__(self, memory_bytes: int):
+        self.memory_bytes = memory_bytes
+        self._entries: "OrderedDict[str, ExtractionResult]" = OrderedDict()
+        self._used = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[ExtractionResult]:
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+            return result
+
+    def put(self, key: str, result: ExtractionResult):
+        if result.size > self.memory_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._used -= self._entries.pop(key).size
+            self._entries[key] = result
+            self._used += result.size
+            while self._used > self.memory_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._used -= evicted.size
+
+def split_into_spans(text: str, max_tokens: int = None) -> List[Span]:
+    """(start, end) spans of text that fill the token budget, on paragraph then sentence boundaries"""
+    if not text:
+        return []
+    
+    spans = get_token_budget().split_spans(text, max_tokens or settings.LLM_CHUNK_TARGET_TOKENS)
+    
+    print(f"Split text into {len(spans)} chunks")
+    return spans
+
+def split_into_chunks(text: str, max_tokens: int = None) -> list:
+    """Split text into chunks that fill the token budget, on paragraph then sentence boundaries"""
+    return [text[start:end] for start, end in split_into_spans(text, max_tokens)]
+
+extraction_cache = ExtractionCache(settings.EXTRACTION_CACHE_MB * 1024 * 1024)
 
 class DocumentService:
-    def extract_text(self, file_path: str) -> str:
-        """Extract text from various document formats"""
+    def __init__(self):
+        self.ocr_service = OCRService()
+
+    def extract(self, file_path: str, digest: str = None) -> ExtractionResult:
+        """Parse a document once; repeated calls for the same content reuse the result"""
         try:
             ext = os.path.splitext(file_path)[1].lower()
-            
-            if ext == '.pdf':
-                return self._extract_from_pdf(file_path)
-            elif ext in ['.doc', '.docx']:
-                return self._extract_from_docx(file_path)
-            elif ext == '.txt':
-                return self._extract_from_txt(file_path)
-            elif ext in ['.ppt', '.pptx']:
-                return self._extract_from_ppt(file_path)
-            else:
-                return self._extract_from_txt(file_path)
-                
+            key = f"{digest or file_sha256(file_path)}{ext}"
+            result = extraction_cache.get(key)
+            if result is None:
+                # Slides are separate paragraphs so chunks break between them
+                separator = "\n\n" if ext in ['.ppt', '.pptx'] else "\n"
+                result = ExtractionResult(self._extract_pages(file_path, ext), separator)
+                extraction_cache.put(key, result)
+            return result
         except Exception as e:
             raise Exception(f"Text extraction error: {str(e)}")
+
+    async def extract_async(self, file_path: str, digest: str = None) -> ExtractionResult:
+        """extract() off the event loop, with PDF pages that have no text layer read by OCR"""
+        digest = digest or await asyncio.to_thread(file_sha256, file_path)
+        result = await asyncio.to_thread(self.extract, file_path, digest)
+        if result.ocr_checked or not file_path.lower().endswith('.pdf') or not settings.PDF_OCR_ENABLED:
+            return result
+
+        pages, complete = await self._ocr_scanned_pages(file_path, result.pages)
+        if pages is result.pages:
+            result.ocr_checked = complete
+            return result
+        ocr_result = ExtractionResult(pages, result.separator)
+        # Pages that failed OCR (e.g. during an outage) are retried by the next request
+        if complete:
+            ocr_result.ocr_checked = True
+            extraction_cache.put(f"{digest}.pdf", ocr_result)
+        return ocr_result
+
+    async def _ocr_scanned_pages(self, file_path: str, pages: List[str]) -> Tuple[List[str], bool]:
+        """Replace pages with almost no extracted text by OCR of the page image, and whether all succeeded"""
+        scanned = [i for i, page in enumerate(pages) if len(page.strip()) < settings.PDF_OCR_MIN_CHARS]
+        if not scanned:
+            return pages, True
+        if len(scanned) > settings.PDF_OCR_MAX_PAGES:
+            print(f"OCR limited to {settings.PDF_OCR_MAX_PAGES} of {len(scanned)} scanned pages")
+            scanned = scanned[:settings.PDF_OCR_MAX_PAGES]
+
+        images = await asyncio.to_thread(pdf_extractor.render_pages, file_path, scanned)
+        print(f"OCR for {len(images)} of {len(pages)} PDF pages without a text layer")
+        # A rendered page is a single PNG or JPEG, so batch page positions map back one to one
+        indexes = list(images)
+        batch = [images.pop(index) for index in indexes]
+
+        pages, complete = list(pages), True
+        async for position, _, text in self.ocr_service.extract_pages(batch, settings.PDF_OCR_CONCURRENCY, skip_failed=True):
+            if text is None:
+                complete = False
+            elif text:
+                pages[indexes[position]] = text
+        return pages, complete
+
+    def extract_text(self, file_path: str) -> str:
+        """Extract text from various document formats"""
+        return self.extract(file_path).text
     
-    def extract_text_chunked(self, file_path: str, chunk_size: int = 2000) -> list:
-        """Extract text and split into chunks for long documents"""
+    def extract_text_chunked(self, file_path: str, max_tokens: int = None) -> list:
+        """Extract text and split into chunks of at most max_tokens for long documents"""
         try:
-            full_text = self.extract_text(file_path)
-            return self._split_into_chunks(full_text, chunk_size)
+            return self.extract(file_path).chunks(max_tokens)
         except Exception as e:
             raise Exception(f"Chunked text extraction error: {str(e)}")
+
+    def _extract_pages(self, file_path: str, ext: str) -> List[str]:
+        """Text per page (PDF) or a single page for formats without pages"""
+        if ext == '.pdf':
+            try:
+                return pdf_extractor.extract_pages(file_path)
+            except Exception as e:
+                raise Exception(f"PDF extraction error: {str(e)}")
+        elif ext in ['.doc', '.docx']:
+            return [self._extract_from_docx(file_path)]
+        elif ext in ['.ppt', '.pptx']:
+            return self._extract_from_ppt(file_path)
+        else:
+            return [self._extract_from_txt(file_path)]
     
-    def _extract_from_pdf(self, file_path: str) -> str:
-        """Extract text from PDF using pypdf"""
-        try:
-            with open(file_path, 'rb') as file:
-                reader = pypdf.PdfReader(file)
-                text = ""
-                for page in reader.pages:
-                    text += page.extract_text() + "\n"
-                return text.strip()
-        except Exception as e:
-            raise Exception(f"PDF extraction error: {str(e)}")
+    def split_text(self, text: str, max_tokens: int = None) -> list:
+        """Split already extracted text into chunks of at most max_tokens"""
+        return self._split_into_chunks(text, max_tokens)
     
     def _extract_from_docx(self, file_path: str) -> str:
-        """Extract text from DOCX"""
+        """Extract text from DOCX, including tables, headers, footnotes and endnotes"""
         try:
-            doc = docx.Document(file_path)
-            text = ""
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-            return text.strip()
+            if not zipfile.is_zipfile(file_path):
+                raise Exception("legacy .doc files are not supported, save the document as .docx")
+            return docx_extractor.extract_text(file_path).strip()
         except Exception as e:
             raise Exception(f"DOCX extraction error: {str(e)}")
     
@@ -64,58 +217,14 @@ class DocumentService:
         except Exception as e:
             raise Exception(f"TXT extraction error: {str(e)}")
     
-    def _extract_from_ppt(self, file_path: str) -> str:
-        """Extract text from PPT (basic implementation)"""
+    def _extract_from_ppt(self, file_path: str) -> List[str]:
+        """Extract text per slide from PPTX (legacy binary .ppt is not an Office Open XML zip)"""
         try:
-            # Placeholder for PPT extraction
-            # You can implement proper PPT extraction with python-pptx later
-            return "PPT text extraction would be implemented here. Currently using basic text extraction."
+            if not zipfile.is_zipfile(file_path):
+                raise Exception("legacy .ppt files are not supported, save the deck as .pptx")
+            return pptx_extractor.extract_slides(file_path)
         except Exception as e:
             raise Exception(f"PPT extraction error: {str(e)}")
     
-    def _split_into_chunks(self, text: str, chunk_size: int = 2000) -> list:
-        """Split text into chunks of approximately chunk_size characters"""
-        if not text:
-            return []
-        
-        chunks = []
-        current_chunk = ""
-        
-        # Split by paragraphs first for better context
-        paragraphs = text.split('\n\n')
-        
-        for paragraph in paragraphs:
-            paragraph = paragraph.strip()
-            if not paragraph:
-                continue
-                
-            # If paragraph is very long, split by sentences
-            if len(paragraph) > chunk_size:
-                sentences = paragraph.split('. ')
-                for sentence in sentences:
-                    sentence = sentence.strip()
-                    if not sentence:
-                        continue
-                    if sentence[-1] != '.':
-                        sentence += '.'
-                    
-                    if len(current_chunk) + len(sentence) + 1 <= chunk_size:
-                        current_chunk += sentence + " "
-                    else:
-                        if current_chunk:
-                            chunks.append(current_chunk.strip())
-                        current_chunk = sentence + " "
-            else:
-                if len(current_chunk) + len(paragraph) + 2 <= chunk_size:
-                    current_chunk += paragraph + "\n\n"
-                else:
-                    if current_chunk:
-                        chunks.append(current_chunk.strip())
-                    current_chunk = paragraph + "\n\n"
-        
-        # Add the last chunk
-        if current_chunk.strip():
-            chunks.append(current_chunk.strip())
-        
-        print(f"Split text into {len(chunks)} chunks")
-        return chunks
\ No newline at end of file
+    def _split_into_chunks(self, text: str, max_tokens: int = None) -> list:
+        return split_into_chunks(text, max_tokens)
@@ -0,0 +1,111 @@
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import List
+from app.services.pptx_extractor import read_relationships
+
+NS_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+REL_TYPES = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/"
+DOCUMENT_PART = "word/document.xml"
+
+# Footnote/endnote parts start with separator entries that hold no text
+NOTE_SKIP_TYPES = {"separator", "continuationSeparator", "continuationNotice"}
+
+def _stream_lines(archive: zipfile.ZipFile, part: str, note_tag: str = None) -> List[str]:
+    """Paragraphs and table rows of one part in document order, cleared as they close.
+
+    Tables become one ' | '-joined line per row; a nested table's rows are emitted inside the
+    outer cell's text. With note_tag (footnote/endnote) each note is prefixed by its id.
+    """
+    lines: List[str] = []
+    # One (row cells, current cell paragraphs) pair per open table
+    tables: List[tuple] = []
+    # Text boxes nest paragraphs inside a paragraph's runs
+    paragraphs: List[List[str]] = []
+    note_id = None
+
+    with archive.open(part) as f:
+        for event, element in ET.iterparse(f, events=("start", "end")):
+            tag = element.tag
+            if event == "start":
+                if tag == f"{NS_W}tbl":
+                    tables.append(([], []))
+                elif tag == f"{NS_W}p":
+                    paragraphs.append([])
+                elif note_tag and tag == note_tag:
+                    skip = element.get(f"{NS_W}type") in NOTE_SKIP_TYPES
+                    note_id = None if skip else element.get(f"{NS_W}id")
+                continue
+
+            if tag == f"{NS_W}t" and paragraphs:
+                paragraphs[-1].append(element.text or "")
+            elif tag == f"{NS_W}tab" and paragraphs:
+                paragraphs[-1].append("\t")
+            elif tag in (f"{NS_W}br", f"{NS_W}cr") and paragraphs:
+                paragraphs[-1].append(" ")
+            elif tag == f"{NS_W}p":
+                text = "".join(paragraphs.pop()).strip()
+                element.clear()
+                if not text or (note_tag and note_id is None):
+                    continue
+                if tables:
+                    tables[-1][1].append(text)
+                elif note_tag:
+                    lines.append(f"[{note_id}] {text}")
+                else:
+                    lines.append(text)
+            elif tag == f"{NS_W}tc" and tables:
+                cells, cell = tables[-1]
+                cells.append(" ".join(cell))
+                cell.clear()
+                element.clear()
+            elif tag == f"{NS_W}tr" and tables:
+                cells, _ = tables[-1]
+                row = " | ".join(cells)
+                cells.clear()
+                element.clear()
+                if not row.replace("|", "").strip():
+                    continue
+                if len(tables) > 1:
+                    tables[-2][1].append(row)
+                else:
+                    lines.append(row)
+            elif tag == f"{NS_W}tbl" and tables:
+                tables.pop()
+                element.clear()
+            elif note_tag and tag == note_tag:
+                element.clear()
+    return lines
+
+class DOCXExtractor:
+    """Low-memory .docx text extraction streaming the document XML out of the zip"""
+
+    def extract_text(self, file_path: str) -> str:
+        """Headers, body paragraphs and tables in document order, then footnotes and endnotes"""
+        with zipfile.ZipFile(file_path) as archive:
+            relationships = read_relationships(archive, DOCUMENT_PART).values()
+            parts = lambda kind: sorted(
+                target for rel_type, target in relationships
+                if rel_type == REL_TYPES + kind and target in archive.NameToInfo
+            )
+
+            lines: List[str] = []
+            # Sections usually repeat the same header, keep each distinct line once
+            seen = set()
+            for part in parts("header"):
+                for line in _stream_lines(archive, part):
+                    if line not in seen:
+                        seen.add(line)
+                        lines.append(line)
+
+            lines.extend(_stream_lines(archive, DOCUMENT_PART))
+
+            for kind, tag, label in (("footnotes", "footnote", "Footnotes:"), ("endnotes", "endnote", "Endnotes:")):
+                for part in parts(kind):
+                    notes = _stream_lines(archive, part, f"{NS_W}{tag}")
+                    if notes:
+                        lines.append(label)
+                        lines.extend(notes)
+
+        return "\n".join(lines)
+
+docx_extractor = DOCXExtractor()
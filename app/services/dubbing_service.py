@@ -1,12 +1,13 @@
+import io
 import os
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
 from pydub import AudioSegment
-import aiohttp
 import json
 from app.services.chatgpt_service import ChatGPTService
 from app.services.elevenlabs_service import ElevenLabsService
 from app.services.youtube_service import YouTubeService
+from app.services.metrics import DUBBING_QUEUE_DEPTH
+from app.services.workspace import workspaces
 from app.config import settings
 
 class DubbingService:
@@ -14,7 +15,6 @@ class DubbingService:
         self.chatgpt = ChatGPTService()
         self.elevenlabs = ElevenLabsService()
         self.youtube = YouTubeService()
-        self.executor = ThreadPoolExecutor(max_workers=3)  # Reduced for stability
     
     def convert_timestamp_to_seconds(self, timestamp: str) -> float:
         """Convert timestamp to seconds for synchronization"""
@@ -39,6 +39,12 @@ class DubbingService:
         """Process a single segment in parallel"""
         i, start_time, end_time, english_text = segment_data
         
+        try:
+            return await self._process_segment(i, start_time, end_time, english_text)
+        finally:
+            DUBBING_QUEUE_DEPTH.dec()
+    
+    async def _process_segment(self, i, start_time, end_time, english_text):
         try:
             print(f"Processing segment {i}: {english_text[:50]}...")
             
@@ -53,15 +59,9 @@ class DubbingService:
             # Translate text
             urdu_text = await self.chatgpt.translate_text_async(english_text, "Urdu")
             
-            # Generate audio
+            # Generate audio, kept in memory until the segments are assembled
             audio_bytes = await self.elevenlabs.text_to_speech_async(urdu_text)
             
-            # Create segments directory if it doesn't exist
-            os.makedirs("app/temp_uploads/audio_segments", exist_ok=True)
-            
-            segment_file = f"app/temp_uploads/audio_segments/segment_{i:03d}.mp3"
-            self.elevenlabs.save_audio_to_file(audio_bytes, segment_file)
-            
             # Calculate timing
             start_seconds = self.convert_timestamp_to_seconds(start_time)
             end_seconds = self.convert_timestamp_to_seconds(end_time)
@@ -71,7 +71,7 @@ class DubbingService:
                 'start_time': start_seconds,
                 'end_time': end_seconds,
                 'original_duration': original_duration,
-                'audio_file': segment_file,
+                'audio_bytes': audio_bytes,
                 'english_text': english_text,
                 'translated_text': urdu_text,
                 'success': True
@@ -88,103 +88,89 @@ class DubbingService:
         """
         Create dubbed audio synchronized with video timestamps using parallel processing
         """
-        try:
-            # Get transcript with timestamps
-            print("Getting transcript...")
-            transcript = self.youtube.get_transcript_with_timestamps(video_url)
-            if not transcript:
-                raise Exception("No transcript available for this video")
-            
-            print(f"Processing {len(transcript)} segments...")
-            
-            # Create directory for audio segments
-            os.makedirs("app/temp_uploads/audio_segments", exist_ok=True)
-            
-            # Prepare segment data for parallel processing
-            segment_data_list = [
-                (i, start_time, end_time, english_text) 
-                for i, (start_time, end_time, english_text) in enumerate(transcript)
-            ]
-            
-            # Limit number of segments for testing
-            if len(segment_data_list) > 20:
-                print(f"Limiting to first 20 segments out of {len(segment_data_list)}")
-                segment_data_list = segment_data_list[:20]
-            
-            # Process segments in parallel with limited concurrency
-            semaphore = asyncio.Semaphore(2)  # Limit concurrent requests
-            
-            async def process_with_semaphore(segment_data):
-                async with semaphore:
-                    return await self.process_segment(segment_data)
-            
-            tasks = [process_with_semaphore(segment_data) for segment_data in segment_data_list]
-            segments_info = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            # Filter successful segments
-            successful_segments = [seg for seg in segments_info if isinstance(seg, dict) and seg.get('success')]
-            failed_segments = [seg for seg in segments_info if isinstance(seg, dict) and not seg.get('success')]
-            
-            if failed_segments:
-                print(f"Failed to process {len(failed_segments)} segments")
-            
-            if not successful_segments:
-                raise Exception("No segments were processed successfully")
-            
-            print(f"Successfully processed {len(successful_segments)} segments")
-            
-            # Sort segments by start time
-            successful_segments.sort(key=lambda x: x['start_time'])
-            
-            # Create final synchronized audio
-            final_audio = AudioSegment.silent(duration=0)
-            current_position = 0
-            
-            for segment in successful_segments:
-                try:
-                    # Load generated audio
-                    segment_audio = AudioSegment.from_mp3(segment['audio_file'])
-                    segment_duration = len(segment_audio) / 1000.0
-                    
-                    # Calculate silence needed
-                    silence_needed = segment['start_time'] - current_position
-                    
-                    if silence_needed > 0:
-                        silence = AudioSegment.silent(duration=int(silence_needed * 1000))
-                        final_audio += silence
-                        current_position += silence_needed
-                    
-                    # Add segment audio
-                    final_audio += segment_audio
-                    current_position += segment_duration
-                    
-                except Exception as e:
-                    print(f"Error adding segment to final audio: {str(e)}")
-                    continue
-            
-            # Export final audio
-            final_output = f"app/temp_uploads/final_dubbed_audio_{os.urandom(4).hex()}.mp3"
-            final_audio.export(final_output, format="mp3", bitrate="128k")
-            
-            print(f"Final audio created: {final_output}")
-            
-            # Cleanup segment files
-            for segment in successful_segments:
-                if os.path.exists(segment['audio_file']):
-                    try:
-                        os.remove(segment['audio_file'])
-                    except:
-                        pass
-            
-            return final_output
-            
-        except Exception as e:
-            # Cleanup on error
-            print(f"Dubbing error: {str(e)}")
-            if os.path.exists("app/temp_uploads/audio_segments"):
-                for file in os.listdir("app/temp_uploads/audio_segments"):
-                    try:
-                        os.remove(f"app/temp_uploads/audio_segments/{file}")
-                    except:
-                        pass
-            raise e
\ No newline at end of file
+        # The job's scratch files live in its own workspace, removed on success and on error
+        async with workspaces.scope("dubbing") as workspace:
+            try:
+                # Get transcript with timestamps
+                print("Getting transcript...")
+                transcript = await self.youtube.get_transcript_with_timestamps(video_url)
+                if not transcript:
+                    raise Exception("No transcript available for this video")
+                
+                print(f"Processing {len(transcript)} segments...")
+                
+                # Prepare segment data for parallel processing
+                segment_data_list = [
+                    (i, start_time, end_time, english_text) 
+                    for i, (start_time, end_time, english_text) in enumerate(transcript)
+                ]
+                
+                # Limit number of segments for testing
+                if len(segment_data_list) > 20:
+                    print(f"Limiting to first 20 segments out of {len(segment_data_list)}")
+                    segment_data_list = segment_data_list[:20]
+                
+                # Process segments in parallel, the provider rate limiters bound concurrency
+                DUBBING_QUEUE_DEPTH.inc(len(segment_data_list))
+                tasks = [self.process_segment(segment_data) for segment_data in segment_data_list]
+                segments_info = await asyncio.gather(*tasks, return_exceptions=True)
+                
+                # Filter successful segments
+                successful_segments = [seg for seg in segments_info if isinstance(seg, dict) and seg.get('success')]
+                failed_segments = [seg for seg in segments_info if isinstance(seg, dict) and not seg.get('success')]
+                
+                if failed_segments:
+                    print(f"Failed to process {len(failed_segments)} segments")
+                
+                if not successful_segments:
+                    raise Exception("No segments were processed successfully")
+                
+                print(f"Successfully processed {len(successful_segments)} segments")
+                
+                # Decoding and encoding run ffmpeg, keep them off the event loop
+                scratch_output = workspace.file("final_dubbed_audio.mp3")
+                await asyncio.to_thread(self._assemble_audio, successful_segments, scratch_output)
+                
+                # Publish the finished file only, so a download never sees a partial export
+                final_output = f"app/temp_uploads/final_dubbed_audio_{os.urandom(4).hex()}.mp3"
+                os.replace(scratch_output, final_output)
+                
+                print(f"Final audio created: {final_output}")
+                return final_output
+                
+            except Exception as e:
+                print(f"Dubbing error: {str(e)}")
+                raise e
+    
+    def _assemble_audio(self, segments: list, output_path: str):
+        """Lay the segment audio out on the transcript timeline and export it as MP3"""
+        # Sort segments by start time
+        segments.sort(key=lambda x: x['start_time'])
+        
+        # Create final synchronized audio
+        final_audio = AudioSegment.silent(duration=0)
+        current_position = 0
+        
+        for segment in segments:
+            try:
+                # Decode generated audio from memory (ffmpeg reads it from a pipe)
+                segment_audio = AudioSegment.from_file(io.BytesIO(segment['audio_bytes']), format="mp3")
+                segment_duration = len(segment_audio) / 1000.0
+                
+                # Calculate silence needed
+                silence_needed = segment['start_time'] - current_position
+                
+                if silence_needed > 0:
+                    silence = AudioSegment.silent(duration=int(silence_needed * 1000))
+                    final_audio += silence
+                    current_position += silence_needed
+                
+                # Add segment audio
+                final_audio += segment_audio
+                current_position += segment_duration
+                
+            except Exception as e:
+                print(f"Error adding segment to final audio: {str(e)}")
+                continue
+        
+        final_audio.export(output_path, format="mp3", bitrate="128k")
@@ -1,6 +1,9 @@
 from elevenlabs import ElevenLabs
 from app.config import settings
-import aiohttp
+from app.services.http_client import http_client
+from app.services.rate_limiter import elevenlabs_limiter
+from app.services.resilience import UpstreamError
+from app.services.metrics import track_call, TTS_CHARACTERS
 
 class ElevenLabsService:
     def __init__(self):
@@ -15,35 +18,36 @@ class ElevenLabsService:
         try:
             voice_id = voice_id or self.default_voice_id
             
-            async with aiohttp.ClientSession() as session:
-                url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
-                
-                headers = {
-                    "Accept": "audio/mpeg",
-                    "Content-Type": "application/json",
-                    "xi-api-key": self.api_key
-                }
-                
-                data = {
-                    "text": text,
-                    "model_id": "eleven_multilingual_v2",
-                    "voice_settings": {
-                        "stability": 0.5,
-                        "similarity_boost": 0.5
-                    }
+            url = f"{settings.ELEVENLABS_API_URL}/v1/text-to-speech/{voice_id}"
+            
+            headers = {
+                "Accept": "audio/mpeg",
+                "Content-Type": "application/json",
+                "xi-api-key": self.api_key
+            }
+            
+            data = {
+                "text": text,
+                "model_id": "eleven_multilingual_v2",
+                "voice_settings": {
+                    "stability": 0.5,
+                    "similarity_boost": 0.5
                 }
-                
-                async with session.post(
+            }
+            
+            async with elevenlabs_limiter.slot() as slot, track_call("elevenlabs", "tts"):
+                response = await http_client.client.post(
                     url, 
                     headers=headers, 
                     json=data,
                     timeout=30
-                ) as response:
-                    if response.status == 200:
-                        return await response.read()
-                    else:
-                        error_text = await response.text()
-                        raise Exception(f"ElevenLabs API error: {error_text}")
+                )
+                slot.observe(response.status_code, response.headers)
+                if response.status_code != 200:
+                    raise UpstreamError(f"ElevenLabs API error: {response.text}", status_code=response.status_code)
+            
+            TTS_CHARACTERS.labels("elevenlabs").inc(len(text))
+            return response.content
                         
         except Exception as e:
             raise Exception(f"ElevenLabs TTS async error: {str(e)}")
@@ -64,14 +68,14 @@ class ElevenLabsService:
             )
             
             # Combine generator chunks into bytes
-            audio_bytes = b"".join(list(audio_generator))
+            audio_bytes = b"".join(audio_generator)
             return audio_bytes
             
         except Exception as e:
             raise Exception(f"ElevenLabs TTS error: {str(e)}")
     
     def save_audio_to_file(self, audio_bytes: bytes, file_path: str):
-        """Save audio bytes to file"""
+        """Save audio bytes (or a memoryview of them) to file"""
         try:
             with open(file_path, "wb") as f:
                 f.write(audio_bytes)
@@ -0,0 +1,77 @@
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, List, Optional, Tuple
+from app.config import settings
+
+class ExtractionPool:
+    """Process pool for extractors that split a document into independent pages or slides.
+
+    A worker function receives (file_path, start, end, *args), opens the file itself and returns
+    one item per page in [start, end), so only paths and extracted text cross process boundaries.
+    Documents under EXTRACTION_PARALLEL_MIN_PAGES are handled in the calling thread, unless the
+    worker is isolated.
+    """
+
+    def __init__(self):
+        self.workers = settings.EXTRACTION_WORKERS or os.cpu_count() or 1
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn: forking a process that runs an event loop and HTTP pools is not safe
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def shutdown(self):
+        """Stop the worker processes (called from the FastAPI lifespan)"""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def map_ranges(self, worker: Callable[..., list], file_path: str, count: int, *args, isolated: bool = False) -> list:
+        """Run worker over page ranges of the file, results concatenated in page order.
+
+        isolated workers never run in the calling thread, whatever the document size, because
+        their per-page timeout (SIGALRM) only fires in a process's main thread.
+        """
+        if not isolated and (self.workers <= 1 or count < settings.EXTRACTION_PARALLEL_MIN_PAGES):
+            return worker(file_path, 0, count, *args)
+
+        ranges = self._ranges(count) if count >= settings.EXTRACTION_PARALLEL_MIN_PAGES else [(0, count)]
+        try:
+            return self._run(worker, file_path, ranges, args)
+        except BrokenProcessPool as e:
+            # A worker died (e.g. out of memory); start a fresh pool next time
+            print(f"Extraction worker pool failed: {str(e)}")
+            self.shutdown()
+            if not isolated:
+                return worker(file_path, 0, count, *args)
+
+        # One retry on a fresh pool; a page that hangs in this thread could never be interrupted
+        try:
+            return self._run(worker, file_path, ranges, args)
+        except BrokenProcessPool:
+            self.shutdown()
+            raise
+
+    def _run(self, worker: Callable[..., list], file_path: str, ranges: List[Tuple[int, int]], args: tuple) -> list:
+        pool = self._get_pool()
+        futures = [pool.submit(worker, file_path, start, end, *args) for start, end in ranges]
+        results = []
+        for future in futures:
+            results.extend(future.result())
+        return results
+
+    def _ranges(self, count: int) -> List[Tuple[int, int]]:
+        """Two ranges per worker so a slow range does not leave the other workers idle"""
+        size = max(settings.EXTRACTION_MIN_PAGES_PER_TASK, math.ceil(count / (self.workers * 2)))
+        return [(start, min(start + size, count)) for start in range(0, count, size)]
+
+extraction_pool = ExtractionPool()
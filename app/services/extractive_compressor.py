@@ -0,0 +1,190 @@
+import math
+import re
+from collections import Counter
+from typing import List, Tuple
+from app.config import settings
+from app.services.token_budget import get_token_budget
+
+# Try to import numpy for vectorized TextRank, fallback to TF-IDF centroid similarity
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+# Latin and Urdu/Arabic sentence ends; words in any script
+SENTENCE_SPLIT = re.compile(r'(?<=[.!?\u06d4\u061f])\s+')
+WORD = re.compile(r'\w{3,}')
+# Auto-generated captions often have no punctuation, long runs are cut into windows of words
+MAX_SENTENCE_WORDS = 60
+WINDOW_WORDS = 40
+# Sentences ranked together; keeps the similarity matrix small and every part of the text represented
+BLOCK_SENTENCES = 400
+DAMPING = 0.85
+# How strongly similarity to already kept sentences counts against a candidate
+REDUNDANCY_WEIGHT = 0.7
+ITERATIONS = 30
+
+STOPWORDS = frozenset("""
+the and for are but not you all any can had her was one our out has him his how man new now old see two way who
+its did get may she use that with have this will your from they know want been good much some time very when
+come here just like long make many more only over such take than them well were what which their there would
+about after also into most other these then could should because where while being those through between
+""".split())
+
+class ExtractiveCompressor:
+    """Keep the most central sentences of a long text, in their original order, within a token budget.
+
+    Sentences are ranked by TextRank over TF-IDF cosine similarity (centroid similarity without
+    numpy) and picked with a redundancy penalty, per block of consecutive sentences. Each block
+    keeps its proportional share of the budget, so every part of the document stays represented.
+    The budget grows with the input (EXTRACTIVE_MIN_KEEP), so long documents are thinned rather
+    than cut down to a fixed size.
+    """
+
+    def __init__(self):
+        self.budget = get_token_budget()
+
+    def compress(self, text: str, target_tokens: int = None) -> str:
+        target_tokens = target_tokens or settings.EXTRACTIVE_TARGET_TOKENS
+        if not settings.EXTRACTIVE_ENABLED or not text:
+            return text
+
+        total_tokens = self.budget.count(text)
+        # The kept share scales with the input, so long documents still reach the map step in full coverage
+        target_tokens = max(target_tokens, int(total_tokens * settings.EXTRACTIVE_MIN_KEEP))
+        if total_tokens <= target_tokens:
+            return text
+
+        sentences = self._sentences(text)
+        if len(sentences) < 2:
+            return text
+
+        token_counts = [self.budget.count(sentence) for _, sentence in sentences]
+        terms = [self._terms(sentence) for _, sentence in sentences]
+        idf = self._idf(terms)
+
+        keep = [False] * len(sentences)
+        ratio = target_tokens / sum(token_counts)
+        for start in range(0, len(sentences), BLOCK_SENTENCES):
+            end = min(start + BLOCK_SENTENCES, len(sentences))
+            block_budget = ratio * sum(token_counts[start:end])
+            for offset in self._select(terms[start:end], idf, token_counts[start:end], block_budget):
+                keep[start + offset] = True
+
+        compressed = self._join([s for s, kept in zip(sentences, keep) if kept])
+        print(f"Extractive compression: kept {sum(keep)} of {len(sentences)} sentences, "
+              f"{total_tokens} -> {self.budget.count(compressed)} tokens")
+        return compressed
+
+    def _sentences(self, text: str) -> List[Tuple[int, str]]:
+        """(paragraph index, sentence) pairs, with unpunctuated runs cut into word windows"""
+        sentences = []
+        for paragraph_index, paragraph in enumerate(re.split(r'\n\s*\n', text)):
+            for sentence in SENTENCE_SPLIT.split(paragraph.strip()):
+                words = sentence.split()
+                if len(words) <= MAX_SENTENCE_WORDS:
+                    if words:
+                        sentences.append((paragraph_index, " ".join(words)))
+                    continue
+                for i in range(0, len(words), WINDOW_WORDS):
+                    sentences.append((paragraph_index, " ".join(words[i:i + WINDOW_WORDS])))
+        return sentences
+
+    @staticmethod
+    def _terms(sentence: str) -> Counter:
+        return Counter(word for word in WORD.findall(sentence.lower()) if word not in STOPWORDS)
+
+    @staticmethod
+    def _idf(terms: List[Counter]) -> dict:
+        document_frequency = Counter()
+        for counts in terms:
+            document_frequency.update(counts.keys())
+        n = len(terms)
+        return {term: math.log((1 + n) / (1 + df)) + 1 for term, df in document_frequency.items()}
+
+    def _select(self, terms: List[Counter], idf: dict, token_counts: List[int], budget: float) -> List[int]:
+        """Greedy maximal marginal relevance: central sentences first, skipping near-repeats of kept ones"""
+        vectors = self._vectors(terms, idf)
+        scores = self._centrality(vectors)
+        top = max(scores) or 1
+        relevance = [score / top for score in scores]
+        redundancy = [0.0] * len(terms)
+        remaining = set(range(len(terms)))
+        selected, used = [], 0
+        smallest = min(token_counts)
+
+        while remaining and budget - used >= smallest:
+            best = max(remaining, key=lambda i: relevance[i] - REDUNDANCY_WEIGHT * redundancy[i])
+            remaining.discard(best)
+            if used + token_counts[best] > budget:
+                continue
+            selected.append(best)
+            used += token_counts[best]
+            for i, similarity in enumerate(self._similarities(vectors, best)):
+                if similarity > redundancy[i]:
+                    redundancy[i] = similarity
+        return selected
+
+    @staticmethod
+    def _vectors(terms: List[Counter], idf: dict):
+        """Unit-length TF-IDF vectors, as a matrix with numpy or as term dicts without"""
+        if not HAS_NUMPY:
+            vectors = []
+            for counts in terms:
+                vector = {term: count * idf[term] for term, count in counts.items()}
+                norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1
+                vectors.append({term: weight / norm for term, weight in vector.items()})
+            return vectors
+
+        vocabulary = {}
+        for counts in terms:
+            for term in counts:
+                vocabulary.setdefault(term, len(vocabulary))
+        matrix = np.zeros((len(terms), max(1, len(vocabulary))), dtype=np.float32)
+        for row, counts in enumerate(terms):
+            for term, count in counts.items():
+                matrix[row, vocabulary[term]] = count * idf[term]
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms == 0, 1, norms)
+
+    @staticmethod
+    def _centrality(vectors) -> List[float]:
+        if not HAS_NUMPY:
+            # Similarity to the block's TF-IDF centroid, linear in the number of terms
+            centroid = Counter()
+            for vector in vectors:
+                centroid.update(vector)
+            return [sum(weight * centroid[term] for term, weight in vector.items()) for vector in vectors]
+
+        # TextRank: PageRank over the cosine similarity graph
+        similarity = vectors @ vectors.T
+        np.fill_diagonal(similarity, 0)
+        out_weight = similarity.sum(axis=1, keepdims=True)
+        transition = np.divide(similarity, out_weight, out=np.zeros_like(similarity), where=out_weight > 0)
+
+        n = len(vectors)
+        scores = np.full(n, 1.0 / n, dtype=np.float32)
+        for _ in range(ITERATIONS):
+            scores = (1 - DAMPING) / n + DAMPING * (transition.T @ scores)
+        return scores.tolist()
+
+    @staticmethod
+    def _similarities(vectors, index: int) -> List[float]:
+        if not HAS_NUMPY:
+            chosen = vectors[index]
+            return [sum(weight * vector.get(term, 0.0) for term, weight in chosen.items()) for vector in vectors]
+        return (vectors @ vectors[index]).tolist()
+
+    @staticmethod
+    def _join(sentences: List[Tuple[int, str]]) -> str:
+        parts = []
+        previous = None
+        for paragraph_index, sentence in sentences:
+            if previous is not None:
+                parts.append(" " if paragraph_index == previous else "\n\n")
+            parts.append(sentence)
+            previous = paragraph_index
+        return "".join(parts)
+
+extractive_compressor = ExtractiveCompressor()
@@ -0,0 +1,52 @@
+import httpx
+from typing import Optional
+from app.config import settings
+
+# HTTP/2 needs the optional h2 package, fall back to HTTP/1.1 keep-alive
+try:
+    import h2  # noqa: F401
+    HAS_HTTP2 = True
+except ImportError:
+    HAS_HTTP2 = False
+
+class HTTPClientService:
+    """App-lifetime pooled async HTTP client shared by every outbound call"""
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _build_client(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY
+        )
+        timeout = httpx.Timeout(settings.HTTP_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT)
+
+        return httpx.AsyncClient(
+            limits=limits,
+            timeout=timeout,
+            http2=settings.HTTP2_ENABLED and HAS_HTTP2,
+            follow_redirects=True
+        )
+
+    async def start(self):
+        """Open the connection pool (called from the FastAPI lifespan)"""
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+            print(f"HTTP client started (http2={settings.HTTP2_ENABLED and HAS_HTTP2})")
+
+    async def close(self):
+        """Close pooled connections (called from the FastAPI lifespan)"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared client, opened lazily when used outside the app lifespan (scripts, benchmarks)"""
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+        return self._client
+
+http_client = HTTPClientService()
@@ -0,0 +1,178 @@
+import io
+import math
+from typing import List
+from app.config import settings
+
+# Try to import Pillow, fallback to sending images as uploaded
+try:
+    from PIL import Image, ImageOps, ImageSequence, ImageStat
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+# Formats the vision endpoint accepts as they are
+VISION_MIME_TYPES = {"image/png", "image/jpeg", "image/webp", "image/gif"}
+# Lossless sources are usually screenshots, where PNG can beat JPEG and keeps text edges sharp
+LOSSLESS_MIME_TYPES = {"image/png", "image/gif", "image/bmp", "image/tiff"}
+EXIF_ORIENTATION = 0x0112
+
+class PreparedImage:
+    """Image bytes ready for a vision request, with what preprocessing did to them.
+
+    original_size is the byte size of the upload the image (or tile) came from.
+    """
+
+    def __init__(self, data: bytes, mime_type: str, original_size: int, width: int = 0, height: int = 0,
+                 grayscale: bool = False):
+        self.data = data
+        self.mime_type = mime_type
+        self.original_size = original_size
+        self.width = width
+        self.height = height
+        self.grayscale = grayscale
+
+    @property
+    def tokens(self) -> int:
+        """Vision input tokens at high detail: a base cost plus one per 512px tile (1000 if unknown)"""
+        if not self.width or not self.height:
+            return 1000
+        return 85 + 170 * math.ceil(self.width / 512) * math.ceil(self.height / 512)
+
+class ImagePreprocessor:
+    """Shrink images to what the vision model actually looks at before they are base64-encoded.
+
+    The model fits images into OCR_MAX_LONG_SIDE and then scales the short side down to
+    OCR_MAX_SHORT_SIDE, so larger uploads only cost upload time. Images are auto-oriented from
+    EXIF, converted to grayscale when they carry almost no colour, and re-encoded as JPEG (or
+    PNG for screenshots, if smaller). Uploads under OCR_PREPROCESS_MIN_KB, and any whose
+    re-encoding comes out larger, are sent as they are.
+    """
+
+    def prepare(self, image_bytes: bytes, mime_type: str) -> PreparedImage:
+        """One request-ready image (the first page, untiled)"""
+        passthrough = PreparedImage(image_bytes, mime_type, len(image_bytes))
+        if not HAS_PIL or not settings.OCR_PREPROCESS_ENABLED:
+            return passthrough
+
+        try:
+            image = Image.open(io.BytesIO(image_bytes))
+            rotated = image.getexif().get(EXIF_ORIENTATION, 1) != 1
+            resized = self._target_size(*image.size) != image.size
+            # Re-encoding a small upload costs more time than its bytes take to send
+            if len(image_bytes) <= settings.OCR_PREPROCESS_MIN_KB * 1024 and not rotated and mime_type in VISION_MIME_TYPES:
+                passthrough.width, passthrough.height = self._target_size(*image.size)
+                return passthrough
+            # JPEGs can decode straight at 1/2, 1/4 or 1/8 scale, much faster than decoding in full
+            if image.format == "JPEG" and resized:
+                image.draft(image.mode, self._target_size(*image.size))
+            image = ImageOps.exif_transpose(image)
+        except Exception as e:
+            print(f"Image preprocessing skipped, cannot decode image: {str(e)}")
+            return passthrough
+
+        prepared = self._shrink(image, mime_type, len(image_bytes))
+        if len(prepared.data) >= len(image_bytes) and not resized and not rotated and mime_type in VISION_MIME_TYPES:
+            passthrough.width, passthrough.height = prepared.width, prepared.height
+            return passthrough
+        return prepared
+
+    def prepare_pages(self, image_bytes: bytes, mime_type: str) -> List[List[PreparedImage]]:
+        """Request-ready tiles of every page of an image.
+
+        Each frame of a multi-page TIFF is a page. A page more elongated than OCR_TILE_MAX_ASPECT
+        (receipts, whiteboard panoramas) is cut along its long side into overlapping tiles, since
+        sent whole it would be shrunk until its text is unreadable. Without Pillow the image is
+        sent as one page.
+        """
+        if not HAS_PIL:
+            return [[self.prepare(image_bytes, mime_type)]]
+        try:
+            image = Image.open(io.BytesIO(image_bytes))
+            frames = getattr(image, "n_frames", 1) if image.format == "TIFF" else 1
+            if frames == 1 and len(self.tile_boxes(*image.size)) == 1:
+                return [[self.prepare(image_bytes, mime_type)]]
+
+            pages = []
+            for frame in ImageSequence.Iterator(image):
+                frame = ImageOps.exif_transpose(frame)
+                pages.append([
+                    self._shrink(frame.crop(box), mime_type, len(image_bytes))
+                    for box in self.tile_boxes(*frame.size)
+                ])
+            return pages
+        except Exception as e:
+            print(f"Image page split skipped: {str(e)}")
+            return [[self.prepare(image_bytes, mime_type)]]
+
+    def tile_boxes(self, width: int, height: int) -> List[tuple]:
+        """Crop boxes in reading order (top to bottom, or left to right for wide images)"""
+        long_side, short_side = max(width, height), min(width, height)
+        if long_side <= short_side * settings.OCR_TILE_MAX_ASPECT:
+            return [(0, 0, width, height)]
+
+        length = int(short_side * settings.OCR_TILE_ASPECT)
+        overlap = int(length * settings.OCR_TILE_OVERLAP)
+        count = math.ceil((long_side - overlap) / (length - overlap))
+        if count > settings.OCR_TILE_MAX_TILES:
+            # Longer tiles rather than more requests
+            count = settings.OCR_TILE_MAX_TILES
+            length = math.ceil((long_side + (count - 1) * overlap) / count)
+
+        # Spread the tiles evenly, so every overlap is at least `overlap`
+        starts = [round(i * (long_side - length) / (count - 1)) for i in range(count)]
+        if height >= width:
+            return [(0, start, width, start + length) for start in starts]
+        return [(start, 0, start + length, height) for start in starts]
+
+    def _shrink(self, image, mime_type: str, original_size: int) -> PreparedImage:
+        """Downscale, grayscale and re-encode a decoded image"""
+        image = self._flatten(image)
+        width, height = self._target_size(*image.size)
+        if (width, height) != image.size:
+            image = image.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+
+        grayscale = image.mode == "L" or self._is_colourless(image)
+        if grayscale:
+            image = image.convert("L")
+
+        data, encoded_mime = self._encode(image, "JPEG"), "image/jpeg"
+        if mime_type in LOSSLESS_MIME_TYPES:
+            png = self._encode(image, "PNG")
+            if len(png) < len(data):
+                data, encoded_mime = png, "image/png"
+        return PreparedImage(data, encoded_mime, original_size, width, height, grayscale)
+
+    def _target_size(self, width: int, height: int) -> tuple:
+        scale = min(1.0, settings.OCR_MAX_LONG_SIDE / max(width, height))
+        scale = min(scale, settings.OCR_MAX_SHORT_SIDE / min(width, height))
+        if scale >= 1:
+            return width, height
+        return max(1, round(width * scale)), max(1, round(height * scale))
+
+    def _flatten(self, image):
+        """RGB or L image, with transparency composited onto white"""
+        if image.mode in ("RGB", "L"):
+            return image
+        if image.mode in ("RGBA", "LA", "P", "PA"):
+            rgba = image.convert("RGBA")
+            background = Image.new("RGB", rgba.size, (255, 255, 255))
+            background.paste(rgba, mask=rgba.getchannel("A"))
+            return background
+        return image.convert("RGB")
+
+    def _is_colourless(self, image) -> bool:
+        """Mean saturation of a thumbnail at or under OCR_GRAYSCALE_MAX_SATURATION (0-255)"""
+        thumbnail = image.copy()
+        thumbnail.thumbnail((64, 64))
+        saturation = ImageStat.Stat(thumbnail.convert("HSV")).mean[1]
+        return saturation <= settings.OCR_GRAYSCALE_MAX_SATURATION
+
+    def _encode(self, image, image_format: str) -> bytes:
+        buffer = io.BytesIO()
+        if image_format == "JPEG":
+            image.save(buffer, "JPEG", quality=settings.OCR_JPEG_QUALITY, optimize=True)
+        else:
+            image.save(buffer, "PNG", compress_level=6)
+        return buffer.getvalue()
+
+image_preprocessor = ImagePreprocessor()
@@ -0,0 +1,155 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from app.config import settings
+
+class LLMCache:
+    """Content-addressed cache for chat completions.
+
+    A byte-bounded in-memory LRU sits in front of a SQLite file, both tiers expiring entries
+    after the TTL. Keys are the SHA-256 of every request field that affects the answer.
+    """
+
+    def __init__(self, path: str, memory_bytes: int, ttl_seconds: float, enabled: bool = True):
+        self.path = path
+        self.memory_bytes = memory_bytes
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        # key -> (value, expires_at)
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._memory_used = 0
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "evictions": 0,
+            "bytes_served": 0
+        }
+
+    @staticmethod
+    def make_key(model: str, system_prompt: str, user_content: str, temperature: float, max_tokens: int) -> str:
+        payload = json.dumps(
+            [model, system_prompt, user_content, temperature, max_tokens],
+            ensure_ascii=False,
+            separators=(",", ":")
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+
+        entry = self._memory.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at >= time.time():
+                self._memory.move_to_end(key)
+                self._record_hit("memory_hits", value)
+                return value
+            del self._memory[key]
+            self._memory_used -= _entry_size(key, value)
+            self._stats["evictions"] += 1
+
+        row = await asyncio.to_thread(self._disk_get, key)
+        if row is not None:
+            value, expires_at = row
+            self._memory_put(key, value, expires_at)
+            self._record_hit("disk_hits", value)
+            return value
+
+        self._stats["misses"] += 1
+        return None
+
+    async def set(self, key: str, value: str):
+        if not self.enabled:
+            return
+        self._memory_put(key, value, time.time() + self.ttl_seconds)
+        self._stats["writes"] += 1
+        await asyncio.to_thread(self._disk_set, key, value)
+
+    def _record_hit(self, tier: str, value: str):
+        self._stats[tier] += 1
+        self._stats["bytes_served"] += len(value.encode("utf-8"))
+
+    def _memory_put(self, key: str, value: str, expires_at: float):
+        size = _entry_size(key, value)
+        if size > self.memory_bytes:
+            return
+        if key in self._memory:
+            self._memory_used -= _entry_size(key, self._memory.pop(key)[0])
+        self._memory[key] = (value, expires_at)
+        self._memory_used += size
+        while self._memory_used > self.memory_bytes:
+            old_key, (old_value, _) = self._memory.popitem(last=False)
+            self._memory_used -= _entry_size(old_key, old_value)
+            self._stats["evictions"] += 1
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS llm_cache_expires ON llm_cache (expires_at)")
+        return self._db
+
+    def _disk_get(self, key: str) -> Optional[Tuple[str, float]]:
+        """(value, expires_at) of an unexpired entry"""
+        with self._db_lock:
+            row = self._connection().execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return row[0], row[1]
+
+    def _disk_set(self, key: str, value: str):
+        now = time.time()
+        with self._db_lock:
+            db = self._connection()
+            db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, now + self.ttl_seconds)
+            )
+            db.execute("DELETE FROM llm_cache WHERE expires_at < ?", (now,))
+            db.commit()
+
+    def stats(self) -> dict:
+        hits = self._stats["memory_hits"] + self._stats["disk_hits"]
+        lookups = hits + self._stats["misses"]
+        return {
+            **self._stats,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_used,
+            "memory_limit_bytes": self.memory_bytes,
+            "enabled": self.enabled
+        }
+
+    def close(self):
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+def _entry_size(key: str, value: str) -> int:
+    return len(key) + len(value.encode("utf-8"))
+
+llm_cache = LLMCache(
+    path=settings.LLM_CACHE_PATH,
+    memory_bytes=settings.LLM_CACHE_MEMORY_MB * 1024 * 1024,
+    ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+    enabled=settings.LLM_CACHE_ENABLED
+)
@@ -0,0 +1,172 @@
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Optional
+import httpx
+
+# Try to import prometheus_client, fallback to no-op metrics
+try:
+    from prometheus_client import Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST, REGISTRY
+    from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+    HAS_PROMETHEUS = True
+except ImportError:
+    HAS_PROMETHEUS = False
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+class _NoopMetric:
+    """Stands in for every metric type when prometheus_client is not installed"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def inc(self, amount: float = 1):
+        pass
+
+    def dec(self, amount: float = 1):
+        pass
+
+    def set(self, value: float):
+        pass
+
+    def observe(self, value: float):
+        pass
+
+if not HAS_PROMETHEUS:
+    Counter = Gauge = Histogram = _NoopMetric
+
+# Provider calls run from tens of milliseconds (cached subtitles) to minutes (long completions, OCR)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+
+PROVIDER_LATENCY = Histogram(
+    "provider_request_duration_seconds", "Latency of one upstream provider call",
+    ["provider", "operation"], buckets=LATENCY_BUCKETS
+)
+PROVIDER_ERRORS = Counter(
+    "provider_errors_total", "Failed upstream provider calls", ["provider", "operation", "status"]
+)
+PROVIDER_RETRIES = Counter("provider_retries_total", "Retried upstream provider calls", ["provider"])
+PROVIDER_HEDGES = Counter("provider_hedged_requests_total", "Hedged duplicate requests sent", ["provider"])
+PROVIDER_IN_FLIGHT = Gauge("provider_in_flight_requests", "Upstream provider calls in progress", ["provider"])
+PROVIDER_TOKENS = Counter(
+    "provider_tokens_total", "Tokens billed by the provider", ["provider", "model", "direction"]
+)
+TTS_CHARACTERS = Counter("tts_characters_total", "Characters sent for speech synthesis", ["provider"])
+DUBBING_QUEUE_DEPTH = Gauge("dubbing_queue_depth", "Dubbing segments waiting for translation and speech")
+OCR_IMAGE_BYTES = Histogram(
+    "ocr_image_bytes", "Image size before and after preprocessing for vision OCR", ["stage"],
+    buckets=(16e3, 64e3, 128e3, 256e3, 512e3, 1e6, 2e6, 4e6, 8e6, 16e6)
+)
+STAGE_LATENCY = Histogram(
+    "pipeline_stage_duration_seconds", "Time spent in each stage of a route's pipeline",
+    ["route", "stage"], buckets=LATENCY_BUCKETS
+)
+
+def error_status(exc: BaseException) -> str:
+    """Short label for why a provider call failed"""
+    if getattr(exc, "status_code", None):
+        return str(exc.status_code)
+    if isinstance(exc, httpx.HTTPStatusError):
+        return str(exc.response.status_code)
+    if isinstance(exc, httpx.TimeoutException):
+        return "timeout"
+    if isinstance(exc, httpx.TransportError):
+        return "connection"
+    return type(exc).__name__
+
+class track_call:
+    """Time one provider call, counting it as in flight and recording its failure status.
+
+    Works with `with` and `async with`, so it can share a statement with a limiter slot.
+    """
+
+    def __init__(self, provider: str, operation: str):
+        self.provider = provider
+        self.operation = operation
+        self.in_flight = PROVIDER_IN_FLIGHT.labels(provider)
+
+    def __enter__(self):
+        self.in_flight.inc()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.in_flight.dec()
+        PROVIDER_LATENCY.labels(self.provider, self.operation).observe(time.perf_counter() - self.start)
+        if isinstance(exc, Exception):
+            PROVIDER_ERRORS.labels(self.provider, self.operation, error_status(exc)).inc()
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+@contextmanager
+def stage_timer(route: str, stage: str):
+    """Time one stage of a route's pipeline"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.labels(route, stage).observe(time.perf_counter() - start)
+
+def record_tokens(provider: str, model: str, input_tokens: Optional[int], output_tokens: Optional[int]):
+    if input_tokens:
+        PROVIDER_TOKENS.labels(provider, model, "input").inc(input_tokens)
+    if output_tokens:
+        PROVIDER_TOKENS.labels(provider, model, "output").inc(output_tokens)
+
+def record_usage(provider: str, model: str, usage: Optional[dict]):
+    """Count tokens from an OpenAI-style `usage` block"""
+    usage = usage or {}
+    record_tokens(provider, model, usage.get("prompt_tokens"), usage.get("completion_tokens"))
+
+class StatsCollector:
+    """Expose the numeric fields of existing stats() dicts at scrape time.
+
+    Fields named in `counters` only ever grow (hits, writes, throttled responses) and are
+    exported as counters, so rate() and increase() work on them; the rest are point-in-time
+    gauges.
+    """
+
+    def __init__(self):
+        self.sources: Dict[str, Callable[[], dict]] = {}
+        self.counters: Dict[str, frozenset] = {}
+
+    def add(self, name: str, stats: Callable[[], dict], counters: Iterable[str] = ()):
+        self.sources[name] = stats
+        self.counters[name] = frozenset(counters)
+
+    def collect(self):
+        for source, stats in self.sources.items():
+            counters = self.counters.get(source, frozenset())
+            for key, value in _flatten(stats()).items():
+                name, documentation = f"app_{source}_{key}", f"{source} {key.replace('_', ' ')}"
+                if key in counters:
+                    yield CounterMetricFamily(name, documentation, value=value)
+                else:
+                    yield GaugeMetricFamily(name, documentation, value=value)
+
+def _flatten(stats: dict, prefix: str = "") -> Dict[str, float]:
+    values = {}
+    for key, value in stats.items():
+        name = f"{prefix}{key}".replace("-", "_")
+        if isinstance(value, bool):
+            values[name] = float(value)
+        elif isinstance(value, (int, float)):
+            values[name] = float(value)
+        elif isinstance(value, dict):
+            values.update(_flatten(value, f"{name}_"))
+    return values
+
+stats_collector = StatsCollector()
+if HAS_PROMETHEUS:
+    REGISTRY.register(stats_collector)
+
+def render_metrics() -> bytes:
+    if not HAS_PROMETHEUS:
+        return b"# prometheus_client is not installed\n"
+    return generate_latest()
@@ -0,0 +1,89 @@
+import json
+from typing import Dict, List, Optional
+from app.config import settings
+from app.services.resilience import LatencyWindow
+
+class ModelRoute:
+    """Model and output budget for one stage, used for inputs up to max_input_tokens"""
+
+    def __init__(self, model: str, max_tokens: int = 2000, max_input_tokens: Optional[int] = None):
+        self.model = model
+        self.max_tokens = max_tokens
+        self.max_input_tokens = max_input_tokens
+
+    def to_dict(self) -> dict:
+        return {"model": self.model, "max_tokens": self.max_tokens, "max_input_tokens": self.max_input_tokens}
+
+def default_routes() -> Dict[str, List[dict]]:
+    """Small model for short per-item work, the default model for chunk work, the large model for final answers"""
+    return {
+        "summary": [{"model": settings.LLM_MODEL, "max_tokens": 2000}],
+        "map": [{"model": settings.LLM_MODEL, "max_tokens": 1200}],
+        "merge": [{"model": settings.LLM_MODEL, "max_tokens": 1500}],
+        "combine": [{"model": settings.LLM_LARGE_MODEL, "max_tokens": 2000}],
+        "questions": [{"model": settings.LLM_MODEL, "max_tokens": 2000}],
+        "chunk_questions": [{"model": settings.LLM_MODEL, "max_tokens": 1200}],
+        "combine_questions": [{"model": settings.LLM_MODEL, "max_tokens": 2000}],
+        "past_paper": [{"model": settings.LLM_LARGE_MODEL, "max_tokens": 3000}],
+        # Dubbing translates one short caption at a time
+        "translate": [
+            {"model": settings.LLM_SMALL_MODEL, "max_tokens": 400, "max_input_tokens": 200},
+            {"model": settings.LLM_MODEL, "max_tokens": 1000}
+        ],
+        "ocr": [{"model": settings.OCR_MODEL, "max_tokens": 4000}]
+    }
+
+class ModelRouter:
+    """Per-stage routing table with latency tracking so the table can be tuned"""
+
+    def __init__(self, routes: Dict[str, List[dict]]):
+        self.routes: Dict[str, List[ModelRoute]] = {
+            stage: [ModelRoute(**tier) for tier in tiers]
+            for stage, tiers in routes.items()
+        }
+        self.latency: Dict[str, LatencyWindow] = {}
+        self.calls: Dict[str, Dict[str, int]] = {}
+
+    def route(self, stage: str, input_tokens: int = 0) -> ModelRoute:
+        """First tier of the stage whose input limit fits, the last tier otherwise"""
+        tiers = self.routes.get(stage)
+        if not tiers:
+            raise Exception(f"No model route configured for stage '{stage}'")
+        for tier in tiers:
+            if tier.max_input_tokens is None or input_tokens <= tier.max_input_tokens:
+                return tier
+        return tiers[-1]
+
+    def record(self, stage: str, model: str, input_tokens: int, seconds: float, cached: bool = False):
+        calls = self.calls.setdefault(stage, {})
+        calls[model] = calls.get(model, 0) + 1
+        if cached:
+            return
+        self.latency.setdefault(stage, LatencyWindow()).add(seconds)
+        size = f" for {input_tokens} input tokens" if input_tokens else ""
+        print(f"[{stage}] {model}: {seconds:.2f}s{size}")
+
+    def stats(self) -> dict:
+        return {
+            stage: {
+                "routes": [tier.to_dict() for tier in tiers],
+                "calls": self.calls.get(stage, {}),
+                "latency_ms": self.latency[stage].summary_ms() if stage in self.latency else None
+            }
+            for stage, tiers in self.routes.items()
+        }
+
+def load_routes() -> Dict[str, List[dict]]:
+    """Default table with per-stage overrides from MODEL_ROUTES (JSON, one tier or a list of tiers per stage)"""
+    routes = default_routes()
+    if not settings.MODEL_ROUTES:
+        return routes
+    try:
+        overrides = json.loads(settings.MODEL_ROUTES)
+    except ValueError as e:
+        raise Exception(f"Invalid MODEL_ROUTES: {str(e)}")
+    for stage, tiers in overrides.items():
+        routes[stage] = tiers if isinstance(tiers, list) else [tiers]
+    return routes
+
+model_router = ModelRouter(load_routes())
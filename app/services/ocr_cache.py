@@ -0,0 +1,275 @@
+import asyncio
+import hashlib
+import io
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Optional
+from app.config import settings
+
+# Try to import Pillow and numpy for perceptual hashing, the cache is off without them
+try:
+    from PIL import Image, ImageOps
+    import numpy as np
+    HAS_IMAGING = True
+except ImportError:
+    HAS_IMAGING = False
+
+# Images are compared as THUMBNAIL_SIZE squares (their aspect ratio is checked separately)
+THUMBNAIL_SIZE = 256
+BLOCK_SIZE = 16
+# The hash keeps the HASH_FREQUENCIES x HASH_FREQUENCIES lowest frequencies of a HASH_SIZE DCT, less the mean
+HASH_SIZE = 64
+HASH_FREQUENCIES = 16
+HASH_BYTES = (HASH_FREQUENCIES * HASH_FREQUENCIES - 1 + 7) // 8
+MAX_ASPECT_DIFFERENCE = 0.03
+# Closest candidates verified against their thumbnails per lookup
+MAX_CANDIDATES = 4
+
+if HAS_IMAGING:
+    _k = np.arange(HASH_SIZE)[:, None]
+    _n = np.arange(HASH_SIZE)[None, :]
+    DCT = np.sqrt(2 / HASH_SIZE) * np.cos(np.pi * (2 * _n + 1) * _k / (2 * HASH_SIZE))
+    DCT[0, :] = np.sqrt(1 / HASH_SIZE)
+    POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint16)
+
+class ImageFingerprint:
+    """SHA-256 of the encoded bytes, perceptual hash, aspect ratio and normalized grayscale thumbnail of an image"""
+
+    def __init__(self, digest: bytes, phash: bytes, aspect: float, thumbnail):
+        self.digest = digest
+        self.phash = phash
+        self.aspect = aspect
+        self.thumbnail = thumbnail
+
+class OCRCache:
+    """OCR results for images seen before.
+
+    An image with the same bytes (SHA-256) as a stored one is always a hit. With perceptual
+    matching on, images that only look the same match too: slides and past-paper photos come
+    back re-encoded or resized, so byte hashes miss them. Images are normalized (oriented,
+    grayscale, contrast-stretched, shrunk to a thumbnail) and indexed by a 255-bit DCT
+    perceptual hash held in memory. Hashes within max_distance bits are candidates; since a
+    hash cannot see a changed word, a candidate is only a hit if every block of its stored
+    thumbnail is close to the new image's. Edits smaller than a block's noise (a few digits)
+    can still match, which is why perceptual matching is opt-in. Entries live in a SQLite
+    file, least recently used ones evicted past max_bytes.
+    """
+
+    def __init__(self, path: str, max_bytes: int, max_distance: int, max_block_difference: float,
+                 enabled: bool = True, perceptual: bool = False):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_distance = max_distance
+        self.max_block_difference = max_block_difference
+        self.enabled = enabled and HAS_IMAGING
+        self.perceptual = perceptual
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        # In-memory index of the stored entries, loaded with the database
+        self._ids = None
+        self._hashes = None
+        self._aspects = None
+        self._models = None
+        self._bytes = 0
+        self._stats = {
+            "hits": 0,
+            "exact_hits": 0,
+            "misses": 0,
+            "rejected": 0,
+            "writes": 0,
+            "evictions": 0
+        }
+
+    async def fingerprint(self, image_bytes: bytes) -> Optional[ImageFingerprint]:
+        """Fingerprint of an encoded image, None if the cache is off or the image cannot be decoded"""
+        if not self.enabled:
+            return None
+        return await asyncio.to_thread(self._fingerprint, image_bytes)
+
+    async def get(self, fingerprint: Optional[ImageFingerprint], model: str) -> Optional[str]:
+        if fingerprint is None:
+            return None
+        text = await asyncio.to_thread(self._lookup, fingerprint, model)
+        self._stats["hits" if text is not None else "misses"] += 1
+        return text
+
+    async def set(self, fingerprint: Optional[ImageFingerprint], model: str, text: str):
+        if fingerprint is None:
+            return
+        await asyncio.to_thread(self._store, fingerprint, model, text)
+
+    def _fingerprint(self, image_bytes: bytes) -> Optional[ImageFingerprint]:
+        try:
+            image = Image.open(io.BytesIO(image_bytes))
+            # JPEGs decode straight at a fraction of their size, and in grayscale
+            image.draft("L", (THUMBNAIL_SIZE * 2, THUMBNAIL_SIZE * 2))
+            image = ImageOps.exif_transpose(image)
+            if image.mode in ("RGBA", "LA", "P", "PA"):
+                rgba = image.convert("RGBA")
+                image = Image.new("RGBA", rgba.size, (255, 255, 255, 255))
+                image.alpha_composite(rgba)
+            aspect = image.width / image.height
+            thumbnail = image.convert("L").resize((THUMBNAIL_SIZE, THUMBNAIL_SIZE), Image.BOX, reducing_gap=2.0)
+            # Brightness and contrast differ between photos of the same page
+            thumbnail = ImageOps.autocontrast(thumbnail)
+        except Exception as e:
+            print(f"OCR cache skipped, cannot decode image: {str(e)}")
+            return None
+
+        pixels = np.asarray(thumbnail.resize((HASH_SIZE, HASH_SIZE), Image.BOX), dtype=np.float64)
+        frequencies = (DCT @ pixels @ DCT.T)[:HASH_FREQUENCIES, :HASH_FREQUENCIES].flatten()[1:]
+        bits = frequencies > np.median(frequencies)
+        digest = hashlib.sha256(image_bytes).digest()
+        return ImageFingerprint(digest, np.packbits(bits).tobytes(), aspect, np.asarray(thumbnail, dtype=np.uint8))
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS ocr_cache ("
+                "id INTEGER PRIMARY KEY, model TEXT NOT NULL, phash BLOB NOT NULL, aspect REAL NOT NULL, "
+                "thumbnail BLOB NOT NULL, text TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL, digest BLOB)"
+            )
+            # Files written before exact matching have no digest; their entries are only found perceptually
+            columns = [row[1] for row in self._db.execute("PRAGMA table_info(ocr_cache)")]
+            if "digest" not in columns:
+                self._db.execute("ALTER TABLE ocr_cache ADD COLUMN digest BLOB")
+            self._db.execute("CREATE INDEX IF NOT EXISTS ocr_cache_digest ON ocr_cache (digest)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS ocr_cache_last_used ON ocr_cache (last_used)")
+            rows = self._db.execute("SELECT id, phash, aspect, model, size FROM ocr_cache").fetchall()
+            self._ids = np.array([row[0] for row in rows], dtype=np.int64)
+            self._hashes = np.array([np.frombuffer(row[1], dtype=np.uint8) for row in rows], dtype=np.uint8).reshape(-1, HASH_BYTES)
+            self._aspects = np.array([row[2] for row in rows], dtype=np.float64)
+            self._models = np.array([row[3] for row in rows], dtype=object)
+            self._bytes = sum(row[4] for row in rows)
+        return self._db
+
+    def _lookup(self, fingerprint: ImageFingerprint, model: str) -> Optional[str]:
+        with self._lock:
+            return self._find(fingerprint, model, touch=True)
+
+    def _find(self, fingerprint: ImageFingerprint, model: str, touch: bool) -> Optional[str]:
+        """Text of the stored image with the same bytes, else the closest one that passes the block check
+        when perceptual matching is on (called with the lock held)"""
+        db = self._connection()
+        row = db.execute(
+            "SELECT id, text FROM ocr_cache WHERE digest = ? AND model = ?", (fingerprint.digest, model)
+        ).fetchone()
+        if row is not None:
+            if touch:
+                self._stats["exact_hits"] += 1
+                db.execute("UPDATE ocr_cache SET last_used = ? WHERE id = ?", (time.time(), row[0]))
+                db.commit()
+            return row[1]
+        if not self.perceptual or not len(self._ids):
+            return None
+
+        query = np.frombuffer(fingerprint.phash, dtype=np.uint8)
+        distances = POPCOUNT[self._hashes ^ query].sum(axis=1)
+        close = (
+            (distances <= self.max_distance)
+            & (np.abs(self._aspects / fingerprint.aspect - 1) <= MAX_ASPECT_DIFFERENCE)
+            & (self._models == model)
+        )
+        candidates = np.flatnonzero(close)
+        for position in candidates[np.argsort(distances[candidates])][:MAX_CANDIDATES]:
+            entry_id = int(self._ids[position])
+            row = db.execute("SELECT thumbnail, text FROM ocr_cache WHERE id = ?", (entry_id,)).fetchone()
+            if row is None:
+                continue
+            thumbnail = np.frombuffer(zlib.decompress(row[0]), dtype=np.uint8).reshape(THUMBNAIL_SIZE, THUMBNAIL_SIZE)
+            if self._block_difference(thumbnail, fingerprint.thumbnail) > self.max_block_difference:
+                self._stats["rejected"] += 1
+                continue
+            if touch:
+                db.execute("UPDATE ocr_cache SET last_used = ? WHERE id = ?", (time.time(), entry_id))
+                db.commit()
+            return row[1]
+        return None
+
+    def _block_difference(self, a, b) -> float:
+        """Largest mean absolute pixel difference over the blocks of two thumbnails"""
+        blocks = THUMBNAIL_SIZE // BLOCK_SIZE
+        difference = np.abs(a.astype(np.int16) - b.astype(np.int16))
+        return float(difference.reshape(blocks, BLOCK_SIZE, blocks, BLOCK_SIZE).mean(axis=(1, 3)).max())
+
+    def _store(self, fingerprint: ImageFingerprint, model: str, text: str):
+        thumbnail = zlib.compress(fingerprint.thumbnail.tobytes())
+        size = len(fingerprint.digest) + len(fingerprint.phash) + len(thumbnail) + len(text.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            # Another request may have read the same image meanwhile
+            if self._find(fingerprint, model, touch=False) is not None:
+                return
+            db = self._connection()
+            cursor = db.execute(
+                "INSERT INTO ocr_cache (model, digest, phash, aspect, thumbnail, text, size, last_used) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (model, fingerprint.digest, fingerprint.phash, fingerprint.aspect, thumbnail, text, size, time.time())
+            )
+            self._ids = np.append(self._ids, cursor.lastrowid)
+            self._hashes = np.vstack([self._hashes, np.frombuffer(fingerprint.phash, dtype=np.uint8)])
+            self._aspects = np.append(self._aspects, fingerprint.aspect)
+            self._models = np.append(self._models, np.array([model], dtype=object))
+            self._bytes += size
+            self._stats["writes"] += 1
+
+            evicted = []
+            while self._bytes > self.max_bytes:
+                rows = db.execute(
+                    "SELECT id, size FROM ocr_cache ORDER BY last_used LIMIT 64"
+                ).fetchall()
+                if not rows:
+                    break
+                batch = []
+                for entry_id, entry_size in rows:
+                    if self._bytes <= self.max_bytes:
+                        break
+                    batch.append(entry_id)
+                    self._bytes -= entry_size
+                db.executemany("DELETE FROM ocr_cache WHERE id = ?", [(entry_id,) for entry_id in batch])
+                evicted.extend(batch)
+            db.commit()
+
+            if evicted:
+                keep = ~np.isin(self._ids, evicted)
+                self._ids, self._hashes = self._ids[keep], self._hashes[keep]
+                self._aspects, self._models = self._aspects[keep], self._models[keep]
+                self._stats["evictions"] += len(evicted)
+
+    def stats(self) -> dict:
+        lookups = self._stats["hits"] + self._stats["misses"]
+        with self._lock:
+            entries = len(self._ids) if self._ids is not None else 0
+            used = self._bytes
+        return {
+            **self._stats,
+            "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else 0.0,
+            "entries": entries,
+            "bytes": used,
+            "limit_bytes": self.max_bytes,
+            "enabled": self.enabled,
+            "perceptual": self.perceptual
+        }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+                self._ids = None
+
+ocr_cache = OCRCache(
+    path=settings.OCR_CACHE_PATH,
+    max_bytes=settings.OCR_CACHE_MAX_MB * 1024 * 1024,
+    max_distance=settings.OCR_CACHE_MAX_DISTANCE,
+    max_block_difference=settings.OCR_CACHE_MAX_BLOCK_DIFFERENCE,
+    enabled=settings.OCR_CACHE_ENABLED,
+    perceptual=settings.OCR_CACHE_PERCEPTUAL
+)
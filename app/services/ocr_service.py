@@ -1,26 +1,183 @@
-import requests
+import asyncio
 import base64
-import os
+import difflib
+import json
+import mimetypes
+import re
+import time
+import anyio
+import httpx
+from typing import AsyncIterator, Callable, List, Optional, Tuple
 from app.config import settings
+from app.services.http_client import http_client
+from app.services.rate_limiter import github_models_limiter
+from app.services.resilience import github_models_resilience, UpstreamError
+from app.services.model_router import model_router
+from app.services.metrics import track_call, record_usage, stage_timer, OCR_IMAGE_BYTES
+from app.services.image_preprocessor import image_preprocessor, PreparedImage
+from app.services.ocr_cache import ocr_cache
+
+# Stands in for the base64 image in the serialized request, replaced by the encoded bytes
+IMAGE_PLACEHOLDER = "@@image-base64@@"
+
+# Leading bytes of the image formats the vision model accepts
+IMAGE_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+)
+
+def image_mime_type(image_bytes: bytes, default: str = "image/png") -> str:
+    """MIME type of an in-memory image from its signature"""
+    head = bytes(image_bytes[:12])
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    for signature, mime_type in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return mime_type
+    return default
+
+# Lines compared when removing the text two neighbouring tiles both contain
+STITCH_MAX_LINES = 8
+STITCH_MIN_SIMILARITY = 0.85
+
+def _normalize_line(line: str) -> str:
+    return " ".join(re.sub(r'[^\w\s]', ' ', line.lower()).split())
+
+def _same_line(a: str, b: str) -> bool:
+    a, b = _normalize_line(a), _normalize_line(b)
+    if a == b:
+        return True
+    return bool(a and b) and difflib.SequenceMatcher(None, a, b).ratio() >= STITCH_MIN_SIMILARITY
+
+def stitch_tiles(texts: List[str]) -> str:
+    """Join the text of overlapping tiles in reading order, dropping lines repeated across a seam.
+
+    The longest run of lines ending one tile that also starts the next is kept once. A line cut
+    by the tile edge may be garbled at the end of one tile or the start of the next, so one such
+    line on either side of the seam is allowed before the repeated run.
+    """
+    lines = texts[0].strip().splitlines() if texts else []
+    for text in texts[1:]:
+        following = text.strip().splitlines()
+        best = None  # (repeated lines, lines dropped from the end of `lines`, lines skipped in `following`)
+        for cut_tail in (0, 1):
+            for cut_head in (0, 1):
+                tail = lines[:len(lines) - cut_tail]
+                head = following[cut_head:]
+                for size in range(min(STITCH_MAX_LINES, len(tail), len(head)), 0, -1):
+                    if all(_same_line(tail[len(tail) - size + i], head[i]) for i in range(size)):
+                        if best is None or size > best[0]:
+                            best = (size, cut_tail, cut_head)
+                        break
+        if best:
+            size, cut_tail, cut_head = best
+            kept = lines[:len(lines) - cut_tail]
+            seam = len(kept) - size
+            # Of each repeated pair keep the longer reading, the other may be cut by the tile edge
+            for i in range(size):
+                kept[seam + i] = max(kept[seam + i], following[cut_head + i], key=len)
+            lines = kept + following[cut_head + size:]
+        else:
+            lines.extend(following)
+    return "\n".join(lines)
 
 class OCRService:
     def __init__(self):
         self.token = settings.GITHUB_TOKEN
-        self.endpoint = "https://models.github.ai/inference"
-        self.model = "openai/gpt-4.1"  # Vision-capable model
+        self.endpoint = settings.GITHUB_MODELS_ENDPOINT
     
-    def extract_text_from_image(self, image_path: str) -> str:
+    async def extract_text_from_image(self, image_path: str, on_page: Optional[Callable] = None) -> str:
         """
         Extract text from image using GPT-4 Vision API
         """
+        image_bytes = await anyio.Path(image_path).read_bytes()
+        return await self.extract_text_from_image_bytes(
+            image_bytes, mimetypes.guess_type(image_path)[0] or "image/png", on_page
+        )
+    
+    async def extract_text_from_image_bytes(self, image_bytes: bytes, mime_type: str = "image/png",
+                                            on_page: Optional[Callable] = None) -> str:
+        """Extract text from an in-memory image, every page of a multi-page TIFF and tiles of elongated scans"""
+        return await self.extract_text_from_images([(image_bytes, mime_type)], on_page)
+    
+    async def extract_text_from_images(self, images: List[Tuple[bytes, str]], on_page: Optional[Callable] = None) -> str:
+        """Text of every page of every (bytes, MIME type) image in order, pages separated by blank lines.
+
+        on_page(completed, total, index, text) is called as each page finishes.
+        """
+        pages = {}
+        async for index, total, text in self.extract_pages(images):
+            pages[index] = text
+            if on_page:
+                on_page(len(pages), total, index, text)
+        return "\n\n".join(pages[index] for index in sorted(pages))
+    
+    async def extract_pages(self, images: List[Tuple[bytes, str]], concurrency: int = None,
+                            skip_failed: bool = False) -> AsyncIterator[Tuple[int, int, Optional[str]]]:
+        """OCR many images concurrently, yielding (page index, page count, text) as each page finishes.
+
+        Pages are numbered across all images in order, each frame of a multi-page TIFF being a
+        page. Tiles of elongated pages are read concurrently with the other pages, at most
+        `concurrency` (OCR_BATCH_CONCURRENCY) requests at a time under the shared rate limiter,
+        and stitched back together. Tiles that look like ones read before are answered from the
+        OCR cache. A failed page raises, or with skip_failed yields None as text.
+        """
+        # Decode, orient, split, downscale and re-encode off the event loop
+        with stage_timer("ocr", "preprocess"):
+            prepared = await asyncio.gather(*(
+                asyncio.to_thread(image_preprocessor.prepare_pages, image_bytes, mime_type)
+                for image_bytes, mime_type in images
+            ))
+        for image_bytes, _ in images:
+            OCR_IMAGE_BYTES.labels("original").observe(len(image_bytes))
+        pages = [tiles for image_pages in prepared for tiles in image_pages]
+        semaphore = asyncio.Semaphore(concurrency or settings.OCR_BATCH_CONCURRENCY)
+
+        async def read_tile(tile: PreparedImage) -> str:
+            # Images read before, even re-encoded or resized, skip the vision model
+            model = model_router.route("ocr").model
+            fingerprint = await ocr_cache.fingerprint(tile.data)
+            text = await ocr_cache.get(fingerprint, model)
+            if text is None:
+                async with semaphore:
+                    text = await self._request_text(tile)
+                await ocr_cache.set(fingerprint, model, text)
+            return text
+
+        async def read_page(index: int, tiles: List[PreparedImage]):
+            texts = await asyncio.gather(*(read_tile(tile) for tile in tiles), return_exceptions=True)
+            errors = [text for text in texts if isinstance(text, BaseException)]
+            if errors:
+                if not skip_failed:
+                    raise errors[0]
+                print(f"OCR of page {index + 1} failed: {str(errors[0])}")
+                return index, None
+            return index, stitch_tiles(texts) if len(texts) > 1 else texts[0]
+
+        tasks = [asyncio.create_task(read_page(index, tiles)) for index, tiles in enumerate(pages)]
+        try:
+            for next_page in asyncio.as_completed(tasks):
+                index, text = await next_page
+                yield index, len(pages), text
+        finally:
+            # The consumer stopped early or a page failed
+            for task in tasks:
+                task.cancel()
+    
+    async def _request_text(self, image: PreparedImage) -> str:
+        """One vision request for one prepared image or tile"""
         try:
-            # Read and encode image
-            with open(image_path, "rb") as f:
-                image_b64 = base64.b64encode(f.read()).decode("utf-8")
+            OCR_IMAGE_BYTES.labels("sent").observe(len(image.data))
             
-            # Prepare request payload
+            # Prepare request payload (the ocr route must name a vision-capable model)
+            route = model_router.route("ocr")
             data = {
-                "model": self.model,
+                "model": route.model,
                 "messages": [
                     {
                         "role": "system",
@@ -30,49 +187,60 @@ class OCRService:
                         "role": "user",
                         "content": [
                             {"type": "text", "text": "Extract all text from this image exactly as it appears:"},
-                            {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{image_b64}"}}
+                            {"type": "image_url", "image_url": {"url": f"data:{image.mime_type};base64,{IMAGE_PLACEHOLDER}"}}
                         ]
                     }
                 ],
-                "temperature": 0
+                "temperature": 0,
+                "max_tokens": route.max_tokens
             }
             
+            body = self._request_body(data, image)
+            
             headers = {
                 "Authorization": f"Bearer {self.token}",
                 "Content-Type": "application/json"
             }
             
-            # Send request
-            response = requests.post(
-                f"{self.endpoint}/chat/completions", 
-                headers=headers, 
-                json=data
-            )
-            response.raise_for_status()
+            # Send request (image tokens are estimated from its size, settled from usage afterwards)
+            async def attempt():
+                async with github_models_limiter.slot(image.tokens + route.max_tokens) as slot, track_call("github-models", "ocr"):
+                    response = await http_client.client.post(
+                        f"{self.endpoint}/chat/completions", 
+                        headers=headers, 
+                        content=body,
+                        timeout=settings.OCR_TIMEOUT
+                    )
+                    result = response.json() if response.is_success else {}
+                    slot.observe(response.status_code, response.headers, used_tokens=result.get("usage", {}).get("total_tokens"))
+                    response.raise_for_status()
+                    return result
             
-            result = response.json()
+            # Shares the inference endpoint's circuit breaker; image payloads are too heavy to hedge
+            start = time.perf_counter()
+            result = await github_models_resilience.call(attempt, hedge=False)
+            model_router.record("ocr", route.model, 0, time.perf_counter() - start)
+            record_usage("github-models", route.model, result.get("usage"))
             extracted_text = result["choices"][0]["message"]["content"]
             
             return extracted_text
             
+        except (UpstreamError, httpx.HTTPError):
+            # Circuit, throttling and HTTP status errors keep their type for the batch layer and routes
+            raise
         except Exception as e:
-            raise Exception(f"OCR extraction error: {str(e)}")
+            raise UpstreamError(f"OCR extraction error: {str(e)}") from e
     
-    def extract_text_from_bytes(self, image_bytes: bytes) -> str:
+    def _request_body(self, data: dict, image: PreparedImage) -> bytes:
+        """Serialize the request with the base64 image written straight into the body.
+
+        Going through a str and json.dumps would copy (and escape-scan) the image several times.
         """
-        Extract text from image bytes
+        head, tail = json.dumps(data).split(IMAGE_PLACEHOLDER)
+        return b"".join((head.encode("utf-8"), base64.b64encode(image.data), tail.encode("utf-8")))
+    
+    async def extract_text_from_bytes(self, image_bytes: bytes, mime_type: str = None) -> str:
         """
-        try:
-            # Save bytes to temporary file and process
-            temp_path = "app/temp_uploads/temp_ocr_image.png"
-            os.makedirs(os.path.dirname(temp_path), exist_ok=True)
-            
-            with open(temp_path, "wb") as f:
-                f.write(image_bytes)
-            
-            return self.extract_text_from_image(temp_path)
-            
-        finally:
-            # Clean up temp file
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
\ No newline at end of file
+        Extract text from image bytes (or a memoryview), without writing them to disk
+        """
+        return await self.extract_text_from_image_bytes(image_bytes, mime_type or image_mime_type(image_bytes))
@@ -0,0 +1,119 @@
+import signal
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+from app.config import settings
+from app.services.extraction_pool import extraction_pool
+
+try:
+    import pypdf
+except ImportError:
+    import PyPDF2 as pypdf
+
+# Try to import PyMuPDF to render pages, fallback to the scan image embedded in the page
+try:
+    import fitz
+    HAS_FITZ = True
+except ImportError:
+    HAS_FITZ = False
+
+# SIGALRM bounds a single page inside a worker process (main thread only); unavailable on Windows
+HAS_ALARM = hasattr(signal, "setitimer")
+
+class PageTimeout(Exception):
+    pass
+
+@contextmanager
+def _page_deadline(seconds: float):
+    if not HAS_ALARM or seconds <= 0 or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def expire(signum, frame):
+        raise PageTimeout()
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+def _extract_page_range(file_path: str, start: int, end: int, page_timeout: float) -> List[str]:
+    """Worker: open the PDF and extract pages [start, end), an empty string for pages that time out or fail"""
+    pages = []
+    with open(file_path, 'rb') as file:
+        reader = pypdf.PdfReader(file)
+        for index in range(start, end):
+            try:
+                with _page_deadline(page_timeout):
+                    pages.append(reader.pages[index].extract_text() or "")
+            except PageTimeout:
+                print(f"PDF page {index + 1} timed out after {page_timeout}s, skipped")
+                pages.append("")
+            except Exception as e:
+                print(f"PDF page {index + 1} extraction error: {str(e)}")
+                pages.append("")
+    return pages
+
+def _embedded_scan(page) -> Optional[Tuple[bytes, str]]:
+    """Largest JPEG image drawn on the page, which for scanned documents is the page itself"""
+    best = None
+    resources = page.get("/Resources") or {}
+    xobjects = resources.get("/XObject") or {}
+    for name in xobjects:
+        xobject = xobjects[name].get_object()
+        if xobject.get("/Subtype") != "/Image":
+            continue
+        filters = xobject.get("/Filter")
+        if list(filters if isinstance(filters, list) else [filters]) != ["/DCTDecode"]:
+            continue
+        # DCTDecode streams are complete JPEG files
+        data = xobject.get_data()
+        if best is None or len(data) > len(best):
+            best = data
+    return (best, "image/jpeg") if best else None
+
+class PDFExtractor:
+    """Page-parallel PDF text extraction, each worker process reading its own page range"""
+
+    def page_count(self, file_path: str) -> int:
+        with open(file_path, 'rb') as file:
+            return len(pypdf.PdfReader(file).pages)
+
+    def extract_pages(self, file_path: str) -> List[str]:
+        """Text of every page, in page order"""
+        # Without SIGALRM a page cannot be timed out anywhere, so small files may as well stay in-thread
+        return extraction_pool.map_ranges(
+            _extract_page_range, file_path, self.page_count(file_path), settings.PDF_PAGE_TIMEOUT,
+            isolated=HAS_ALARM and settings.PDF_PAGE_TIMEOUT > 0
+        )
+
+    def render_pages(self, file_path: str, indexes: List[int]) -> Dict[int, Tuple[bytes, str]]:
+        """(image bytes, MIME type) for each page index that can be turned into an image"""
+        images = {}
+        if HAS_FITZ:
+            with fitz.open(file_path) as document:
+                for index in indexes:
+                    try:
+                        pixmap = document[index].get_pixmap(dpi=settings.PDF_OCR_DPI)
+                        images[index] = (pixmap.tobytes("png"), "image/png")
+                    except Exception as e:
+                        # A corrupt page is left out, the rest of the batch is still OCRed
+                        print(f"PDF page {index + 1} render error: {str(e)}")
+            return images
+
+        with open(file_path, 'rb') as file:
+            reader = pypdf.PdfReader(file)
+            for index in indexes:
+                try:
+                    image = _embedded_scan(reader.pages[index])
+                except Exception as e:
+                    print(f"PDF page {index + 1} image extraction error: {str(e)}")
+                    continue
+                if image:
+                    images[index] = image
+        return images
+
+pdf_extractor = PDFExtractor()
@@ -0,0 +1,130 @@
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional
+from app.services.extraction_pool import extraction_pool
+
+NS_P = "{http://schemas.openxmlformats.org/presentationml/2006/main}"
+NS_A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+NS_R = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+NS_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+NOTES_SLIDE_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/notesSlide"
+
+TITLE_PLACEHOLDERS = {"title", "ctrTitle"}
+# Notes pages repeat the slide image, number, date and footer as placeholders
+NOTES_SKIP_PLACEHOLDERS = {"sldImg", "sldNum", "dt", "ftr", "hdr"}
+
+def read_relationships(archive: zipfile.ZipFile, part: str) -> Dict[str, tuple]:
+    """rId -> (type, target part path) for a part's .rels file"""
+    directory, name = posixpath.split(part)
+    rels_path = posixpath.join(directory, "_rels", f"{name}.rels")
+    if rels_path not in archive.namelist():
+        return {}
+    with archive.open(rels_path) as f:
+        root = ET.parse(f).getroot()
+    return {
+        rel.get("Id"): (rel.get("Type"), posixpath.normpath(posixpath.join(directory, rel.get("Target"))))
+        for rel in root.iter(f"{NS_REL}Relationship")
+    }
+
+def _slide_parts(archive: zipfile.ZipFile) -> List[str]:
+    """Slide part names in presentation order"""
+    relationships = read_relationships(archive, "ppt/presentation.xml")
+    with archive.open("ppt/presentation.xml") as f:
+        root = ET.parse(f).getroot()
+    return [
+        relationships[slide_id.get(f"{NS_R}id")][1]
+        for slide_id in root.iter(f"{NS_P}sldId")
+        if slide_id.get(f"{NS_R}id") in relationships
+    ]
+
+def _shape_text(archive: zipfile.ZipFile, part: str, skip_placeholders=frozenset()) -> tuple:
+    """Stream one slide (or notes) part: (title lines, body lines), tables as ' | '-joined rows.
+
+    Paragraphs are read and cleared as they close, so memory does not grow with the part.
+    """
+    titles, body = [], []
+    placeholder: Optional[str] = None
+    row: List[str] = []
+    cell: List[str] = []
+    table_depth = 0
+
+    with archive.open(part) as f:
+        for event, element in ET.iterparse(f, events=("start", "end")):
+            tag = element.tag
+            if event == "start":
+                if tag == f"{NS_A}tbl":
+                    table_depth += 1
+                continue
+
+            if tag == f"{NS_P}ph":
+                placeholder = element.get("type", "body")
+            elif tag == f"{NS_A}p":
+                text = "".join(
+                    (node.text or "") if node.tag == f"{NS_A}t" else " "
+                    for node in element.iter() if node.tag in (f"{NS_A}t", f"{NS_A}br")
+                ).strip()
+                element.clear()
+                if not text or placeholder in skip_placeholders:
+                    continue
+                if table_depth:
+                    cell.append(text)
+                elif placeholder in TITLE_PLACEHOLDERS:
+                    titles.append(text)
+                else:
+                    body.append(text)
+            elif tag == f"{NS_A}tc":
+                row.append(" ".join(cell))
+                cell = []
+                element.clear()
+            elif tag == f"{NS_A}tr":
+                if any(row):
+                    body.append(" | ".join(row))
+                row = []
+                element.clear()
+            elif tag == f"{NS_A}tbl":
+                table_depth -= 1
+                element.clear()
+            elif tag in (f"{NS_P}sp", f"{NS_P}graphicFrame"):
+                placeholder = None
+                element.clear()
+    return titles, body
+
+def _extract_slide_range(file_path: str, start: int, end: int) -> List[str]:
+    """Worker: text of slides [start, end) with their speaker notes"""
+    slides = []
+    with zipfile.ZipFile(file_path) as archive:
+        parts = _slide_parts(archive)
+        for index in range(start, end):
+            part = parts[index]
+            try:
+                titles, body = _shape_text(archive, part)
+                lines = [f"Slide {index + 1}: {' - '.join(titles)}" if titles else f"Slide {index + 1}"]
+                lines.extend(body)
+
+                notes_parts = [
+                    target for rel_type, target in read_relationships(archive, part).values()
+                    if rel_type == NOTES_SLIDE_TYPE
+                ]
+                if notes_parts:
+                    _, notes = _shape_text(archive, notes_parts[0], NOTES_SKIP_PLACEHOLDERS)
+                    if notes:
+                        lines.append("Notes: " + " ".join(notes))
+                slides.append("\n".join(lines))
+            except Exception as e:
+                print(f"Slide {index + 1} extraction error: {str(e)}")
+                slides.append(f"Slide {index + 1}")
+    return slides
+
+class PPTXExtractor:
+    """Slide-parallel .pptx text extraction streaming slide XML out of the zip"""
+
+    def slide_count(self, file_path: str) -> int:
+        with zipfile.ZipFile(file_path) as archive:
+            return len(_slide_parts(archive))
+
+    def extract_slides(self, file_path: str) -> List[str]:
+        """Titles, body text, tables and speaker notes of every slide, in slide order"""
+        return extraction_pool.map_ranges(_extract_slide_range, file_path, self.slide_count(file_path))
+
+pptx_extractor = PPTXExtractor()
@@ -0,0 +1,226 @@
+import asyncio
+import re
+import time
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Dict, Mapping, Optional
+from app.config import settings
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at `rate` units per second"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def set_rate(self, rate: float, capacity: float):
+        self._refill()
+        self.rate = rate
+        self.capacity = capacity
+        self.level = min(self.level, capacity)
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1):
+        """Wait until `amount` units are available and take them"""
+        if not self.enabled:
+            return
+        amount = min(amount, self.capacity)
+        while True:
+            self._refill()
+            if self.level >= amount:
+                self.level -= amount
+                return
+            await asyncio.sleep((amount - self.level) / self.rate)
+
+    def refund(self, amount: float):
+        """Give back (or, when negative, charge) units after the real cost is known"""
+        if self.enabled:
+            self._refill()
+            self.level = min(self.capacity, self.level + amount)
+
+class RateLimitSlot:
+    """Handle for one admitted request, used to report the provider's response"""
+
+    def __init__(self, limiter: "AdaptiveRateLimiter", reserved_tokens: int):
+        self.limiter = limiter
+        self.reserved_tokens = reserved_tokens
+
+    def observe(self, status_code: int, headers: Mapping[str, str] = None, used_tokens: int = None):
+        self.limiter.observe(status_code, headers or {}, self.reserved_tokens, used_tokens)
+
+class AdaptiveRateLimiter:
+    """Process-wide limiter for one provider.
+
+    Requests and tokens are metered by token buckets, and the number of requests in flight is
+    bounded by an AIMD window: +1/window on every success, halved on a 429. Retry-After and
+    x-ratelimit-* response headers pause admission and re-tune the buckets to the real limits.
+    """
+
+    def __init__(self, name: str, requests_per_minute: float, tokens_per_minute: float = 0,
+                 max_concurrency: int = 4, min_concurrency: int = 1):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute / 60, max(1, requests_per_minute))
+        self.tokens = TokenBucket(tokens_per_minute / 60, max(1, tokens_per_minute))
+        self.max_concurrency = max(min_concurrency, max_concurrency)
+        self.min_concurrency = min_concurrency
+        self.window = float(self.max_concurrency)
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.last_decrease = 0.0
+        self.throttled = 0
+        self._condition: Optional[asyncio.Condition] = None
+
+    @property
+    def condition(self) -> asyncio.Condition:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    @asynccontextmanager
+    async def slot(self, tokens: int = 0):
+        """Wait for admission, then hold a concurrency slot for the duration of the request"""
+        await self._wait_until_unblocked()
+        await self.requests.acquire(1)
+        if tokens:
+            await self.tokens.acquire(tokens)
+
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.in_flight < int(self.window))
+            self.in_flight += 1
+        try:
+            yield RateLimitSlot(self, tokens)
+        finally:
+            async with self.condition:
+                self.in_flight -= 1
+                self.condition.notify_all()
+
+    async def _wait_until_unblocked(self):
+        while True:
+            delay = self.blocked_until - time.monotonic()
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+
+    def observe(self, status_code: int, headers: Mapping[str, str], reserved_tokens: int = 0,
+                used_tokens: int = None):
+        """Feed a provider response back into the limiter"""
+        headers = {k.lower(): v for k, v in headers.items()}
+        now = time.monotonic()
+
+        if status_code == 429:
+            self.throttled += 1
+            # Halve at most once per round trip so a burst of 429s is one congestion event
+            if now - self.last_decrease > 1.0:
+                self.window = max(self.min_concurrency, self.window / 2)
+                self.last_decrease = now
+            retry_after = _parse_retry_after(headers.get("retry-after"))
+            self._block_for(retry_after if retry_after is not None else 1.0)
+        elif 200 <= status_code < 300:
+            self.window = min(self.max_concurrency, self.window + 1 / self.window)
+
+        if used_tokens is not None and reserved_tokens:
+            self.tokens.refund(reserved_tokens - used_tokens)
+
+        self._apply_ratelimit_headers(headers)
+        self._wake_waiters()
+
+    def _apply_ratelimit_headers(self, headers: Dict[str, str]):
+        for kind, bucket in (("requests", self.requests), ("tokens", self.tokens)):
+            limit = _parse_number(headers.get(f"x-ratelimit-limit-{kind}"))
+            period = _parse_duration(headers.get(f"x-ratelimit-renewalperiod-{kind}")) or 60.0
+            if limit:
+                rate = limit / period
+                if abs(rate - bucket.rate) > 1e-9:
+                    bucket.set_rate(rate, limit)
+
+            remaining = _parse_number(headers.get(f"x-ratelimit-remaining-{kind}"))
+            if remaining is not None and remaining <= 0:
+                reset = _parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+                self._block_for(reset if reset is not None else period)
+
+    def _block_for(self, seconds: float):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def _wake_waiters(self):
+        # observe() is synchronous, so hand the notify off to the loop
+        async def notify():
+            async with self.condition:
+                self.condition.notify_all()
+        try:
+            asyncio.get_running_loop().create_task(notify())
+        except RuntimeError:
+            pass
+
+    def stats(self) -> dict:
+        return {
+            "provider": self.name,
+            "window": round(self.window, 2),
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "requests_per_minute": round(self.requests.rate * 60, 2),
+            "tokens_per_minute": round(self.tokens.rate * 60, 2),
+            "blocked_for_seconds": round(max(0.0, self.blocked_until - time.monotonic()), 2),
+            "throttled_responses": self.throttled
+        }
+
+def _parse_number(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+def _parse_duration(value: Optional[str]) -> Optional[float]:
+    """Parse '20', '1.5s', '250ms' or '6m0s' into seconds"""
+    if not value:
+        return None
+    number = _parse_number(value)
+    if number is not None:
+        return number
+    parts = re.findall(r'(\d+(?:\.\d+)?)(ms|h|m|s)', value)
+    if not parts:
+        return None
+    scale = {"h": 3600, "m": 60, "s": 1, "ms": 0.001}
+    return sum(float(amount) * scale[unit] for amount, unit in parts)
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After is either delay-seconds or an HTTP date"""
+    if not value:
+        return None
+    seconds = _parse_number(value)
+    if seconds is not None:
+        return max(0.0, seconds)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def estimate_tokens(*texts: str) -> int:
+    """Rough prompt size (about 4 characters per token) for pre-admission metering"""
+    return sum(len(text) for text in texts if text) // 4 + 1
+
+github_models_limiter = AdaptiveRateLimiter(
+    "github-models",
+    requests_per_minute=settings.GITHUB_MODELS_RPM,
+    tokens_per_minute=settings.GITHUB_MODELS_TPM,
+    max_concurrency=settings.GITHUB_MODELS_MAX_CONCURRENCY
+)
+
+elevenlabs_limiter = AdaptiveRateLimiter(
+    "elevenlabs",
+    requests_per_minute=settings.ELEVENLABS_RPM,
+    max_concurrency=settings.ELEVENLABS_MAX_CONCURRENCY
+)
+
+rate_limiters = {
+    limiter.name: limiter for limiter in (github_models_limiter, elevenlabs_limiter)
+}
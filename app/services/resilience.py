@@ -0,0 +1,257 @@
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Optional
+import httpx
+from app.config import settings
+from app.services.metrics import PROVIDER_RETRIES, PROVIDER_HEDGES
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class UpstreamError(Exception):
+    """Failure talking to an upstream API, with the HTTP status when there was one"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+class CircuitOpenError(UpstreamError):
+    """Raised without calling upstream while its circuit breaker is open"""
+
+    def __init__(self, message: str):
+        super().__init__(message, status_code=503)
+
+def is_retryable(exc: BaseException) -> bool:
+    """Timeouts, dropped connections, throttling and 5xx are worth another attempt"""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in RETRYABLE_STATUS_CODES
+    return isinstance(exc, httpx.TransportError)
+
+def counts_as_outage(exc: BaseException) -> bool:
+    """Errors that say the upstream is unhealthy, as opposed to throttling or a bad request"""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500
+    return isinstance(exc, httpx.TransportError)
+
+class CircuitBreaker:
+    """Closed -> open after consecutive outages -> half-open single probe after reset_timeout"""
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probe_in_flight = False
+
+    def before_call(self):
+        if self.state == "open":
+            remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+            if remaining > 0:
+                raise CircuitOpenError(f"{self.name} is unavailable, retry in {remaining:.1f}s")
+            self.state = "half_open"
+        if self.state == "half_open":
+            if self._probe_in_flight:
+                raise CircuitOpenError(f"{self.name} is recovering, retry shortly")
+            self._probe_in_flight = True
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def release_probe(self):
+        """Let another caller probe when the probing call was cancelled"""
+        self._probe_in_flight = False
+
+    def record_failure(self, outage: bool):
+        self._probe_in_flight = False
+        if not outage:
+            if self.state == "half_open":
+                self.state = "closed"
+            return
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.times_opened += 1
+                print(f"[{self.name}] circuit opened after {self.failures} consecutive failures")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+class LatencyWindow:
+    """Most recent latencies, for percentiles"""
+
+    def __init__(self, size: int = 500):
+        self._samples = deque(maxlen=size)
+
+    def add(self, seconds: float):
+        self._samples.append(seconds)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+    def summary_ms(self) -> dict:
+        return {
+            f"p{p}": round(value * 1000) if value is not None else None
+            for p in (50, 95, 99)
+            for value in [self.percentile(p)]
+        }
+
+class ResilientCaller:
+    """Circuit breaker, jittered exponential backoff and optional hedging around one upstream.
+
+    A hedge is a duplicate attempt started once the primary has run longer than the recent
+    latency percentile; whichever succeeds first is returned and the other is cancelled, so it
+    stops holding a rate-limiter slot and spending quota. Each won hedge is credited with the
+    hedge delay as its estimated saving.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_retries: int,
+        base_delay: float,
+        max_delay: float,
+        failure_threshold: int,
+        reset_timeout: float,
+        hedge_enabled: bool = False,
+        hedge_percentile: float = 95,
+        hedge_min_samples: int = 20
+    ):
+        self.name = name
+        self.max_retries = max(0, max_retries)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout)
+        self.hedge_enabled = hedge_enabled
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        # End-to-end attempt latency as callers saw it
+        self.latency = LatencyWindow()
+        # Latency of the primary attempt alone (a lower bound when a hedge beat it)
+        self.primary_latency = LatencyWindow()
+        self._stats = {
+            "calls": 0,
+            "successes": 0,
+            "failures": 0,
+            "retries": 0,
+            "rejected_open": 0,
+            "hedges_sent": 0,
+            "hedges_won": 0,
+            "hedge_saved_seconds": 0.0
+        }
+
+    async def call(self, attempt: Callable[[], Awaitable[Any]], hedge: bool = True) -> Any:
+        """Run attempt() with retries, raising the last error once they are used up"""
+        self._stats["calls"] += 1
+        retry = 0
+        while True:
+            try:
+                self.breaker.before_call()
+            except CircuitOpenError:
+                self._stats["rejected_open"] += 1
+                raise
+
+            try:
+                result = await self._attempt(attempt, hedge and self.hedge_enabled)
+            except asyncio.CancelledError:
+                self.breaker.release_probe()
+                raise
+            except Exception as e:
+                self.breaker.record_failure(counts_as_outage(e))
+                if retry >= self.max_retries or not is_retryable(e):
+                    self._stats["failures"] += 1
+                    raise
+                retry += 1
+                self._stats["retries"] += 1
+                PROVIDER_RETRIES.labels(self.name).inc()
+                # Full jitter keeps retries from a burst of failures from arriving together
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (retry - 1))))
+                print(f"[{self.name}] retry {retry}/{self.max_retries} in {delay:.1f}s: {e}")
+                await asyncio.sleep(delay)
+                continue
+
+            self.breaker.record_success()
+            self._stats["successes"] += 1
+            return result
+
+    def _hedge_delay(self) -> Optional[float]:
+        if len(self.latency) < self.hedge_min_samples:
+            return None
+        return self.latency.percentile(self.hedge_percentile)
+
+    async def _attempt(self, attempt: Callable[[], Awaitable[Any]], hedge: bool) -> Any:
+        start = time.perf_counter()
+        delay = self._hedge_delay() if hedge else None
+        if delay is None:
+            result = await attempt()
+            elapsed = time.perf_counter() - start
+            self.primary_latency.add(elapsed)
+            self.latency.add(elapsed)
+            return result
+
+        primary = asyncio.ensure_future(attempt())
+        pending = {primary}
+        winner = None
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                self._stats["hedges_sent"] += 1
+                PROVIDER_HEDGES.labels(self.name).inc()
+                pending.add(asyncio.ensure_future(attempt()))
+
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = primary if primary in done else next(iter(done))
+                if winner.exception() is None or not pending:
+                    break
+            return winner.result()
+        finally:
+            # Only successful attempts feed the percentiles, fast failures would drag them down
+            elapsed = time.perf_counter() - start
+            succeeded = winner is not None and winner.exception() is None
+            hedge_won = succeeded and winner is not primary
+            if succeeded:
+                self.latency.add(elapsed)
+                self.primary_latency.add(elapsed)
+            if hedge_won:
+                self._stats["hedges_won"] += 1
+                # The primary had this head start and still lost
+                self._stats["hedge_saved_seconds"] += delay
+            # The loser (and anything still running after a failure) is cancelled
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> dict:
+        hedge_delay = self._hedge_delay()
+        return {
+            **self._stats,
+            "hedge_saved_seconds": round(self._stats["hedge_saved_seconds"], 2),
+            "circuit": self.breaker.state,
+            "circuit_opened": self.breaker.times_opened,
+            "hedge_enabled": self.hedge_enabled,
+            "hedge_delay_ms": round(hedge_delay * 1000) if hedge_delay is not None else None,
+            "latency_ms": self.latency.summary_ms(),
+            "primary_latency_ms": self.primary_latency.summary_ms()
+        }
+
+github_models_resilience = ResilientCaller(
+    "github-models",
+    max_retries=settings.LLM_RETRIES,
+    base_delay=settings.LLM_RETRY_BASE_DELAY,
+    max_delay=settings.LLM_RETRY_MAX_DELAY,
+    failure_threshold=settings.LLM_BREAKER_FAILURES,
+    reset_timeout=settings.LLM_BREAKER_RESET_SECONDS,
+    hedge_enabled=settings.LLM_HEDGE_ENABLED,
+    hedge_percentile=settings.LLM_HEDGE_PERCENTILE,
+    hedge_min_samples=settings.LLM_HEDGE_MIN_SAMPLES
+)
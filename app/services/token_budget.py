@@ -0,0 +1,96 @@
+from functools import lru_cache
+from typing import List, Tuple
+from app.config import settings
+from app.utils.chunking import Span, chunk_spans
+
+# Try to import tiktoken, fallback to a characters-per-token estimate
+try:
+    import tiktoken
+    HAS_TIKTOKEN = True
+except ImportError:
+    HAS_TIKTOKEN = False
+
+CHARS_PER_TOKEN = 4
+# Role markers and separators the chat format adds around each message
+MESSAGE_OVERHEAD_TOKENS = 8
+
+class TokenBudget:
+    """Token counting and prompt budgeting for one model"""
+
+    def __init__(self, model: str):
+        self.model = model
+        self.encoding = self._load_encoding(model)
+
+    @staticmethod
+    def _load_encoding(model: str):
+        if not HAS_TIKTOKEN:
+            return None
+        name = model.split("/")[-1]
+        try:
+            return tiktoken.encoding_for_model(name)
+        except KeyError:
+            pass
+        except Exception as e:
+            print(f"Tokenizer unavailable for {model}, estimating tokens: {e}")
+            return None
+        # Unknown names (newer OpenAI chat models, other providers) get o200k_base,
+        # which needs its BPE file downloaded or cached
+        try:
+            return tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            print(f"Tokenizer unavailable for {model}, estimating tokens: {e}")
+            return None
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return -(-len(text) // CHARS_PER_TOKEN)
+
+    def input_budget(self, system_prompt: str = "", output_tokens: int = 0) -> int:
+        """Tokens left for user content once the system prompt and reserved output are paid for"""
+        fixed = self.count(system_prompt) + 2 * MESSAGE_OVERHEAD_TOKENS
+        by_input_cap = settings.LLM_MAX_INPUT_TOKENS - fixed
+        by_context = settings.LLM_CONTEXT_TOKENS - fixed - output_tokens
+        return max(0, min(by_input_cap, by_context))
+
+    def chunk_tokens(self, system_prompt: str = "", output_tokens: int = 0) -> int:
+        """Chunk size that fills the target budget without overflowing the prompt"""
+        return max(1, min(settings.LLM_CHUNK_TARGET_TOKENS, self.input_budget(system_prompt, output_tokens)))
+
+    def truncate(self, text: str, max_tokens: int, label: str = "text") -> Tuple[str, int]:
+        """Cut text to max_tokens, returning the kept text and how many tokens were dropped"""
+        total = self.count(text)
+        if total <= max_tokens:
+            return text, 0
+
+        kept = self._head(text, max_tokens)
+        dropped = total - max_tokens
+        print(f"Token budget: dropped {dropped} of {total} tokens from {label}")
+        return kept, dropped
+
+    def _head(self, text: str, max_tokens: int) -> str:
+        """Longest prefix of text that fits in max_tokens"""
+        if self.encoding is not None:
+            return self.encoding.decode(self.encoding.encode(text, disallowed_special=())[:max_tokens])
+        return text[:max_tokens * CHARS_PER_TOKEN]
+
+    def split_spans(self, text: str, max_tokens: int, overlap: int = None) -> List[Span]:
+        """(start, end) spans of text of at most max_tokens, on paragraph, then sentence, then word boundaries"""
+        if overlap is None:
+            overlap = settings.LLM_CHUNK_OVERLAP_TOKENS
+        return chunk_spans(text, max_tokens, self.count, overlap)
+
+    def split(self, text: str, max_tokens: int, overlap: int = None) -> List[str]:
+        """Split text into chunks of at most max_tokens"""
+        return [text[start:end] for start, end in self.split_spans(text, max_tokens, overlap)]
+
+def get_token_budget(model: str = None) -> TokenBudget:
+    """Shared TokenBudget per model, defaulting to the configured chat model"""
+    return _budget_for(model or settings.LLM_MODEL)
+
+@lru_cache(maxsize=None)
+def _budget_for(model: str) -> TokenBudget:
+    # Tokenizers are expensive to load, build one per model
+    return TokenBudget(model)
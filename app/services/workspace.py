@@ -0,0 +1,75 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import asynccontextmanager
+from app.config import settings
+
+class Workspace:
+    """A scratch directory owned by one request or job"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def file(self, name: str) -> str:
+        """Path of a scratch file; names cannot escape the workspace"""
+        return os.path.join(self.path, os.path.basename(name))
+
+class WorkspaceManager:
+    """Hands out a private scratch directory per request or job and removes it when the scope ends.
+
+    Fixed scratch paths make concurrent jobs overwrite, and clean up, each other's files. Every
+    scope gets its own directory under WORKSPACE_ROOT, removed however the scope exits; sweep()
+    clears directories left behind by a killed process.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._active = 0
+        self._created = 0
+        self._swept = 0
+        self._lock = threading.Lock()
+
+    @asynccontextmanager
+    async def scope(self, label: str = "job"):
+        os.makedirs(self.root, exist_ok=True)
+        workspace = Workspace(tempfile.mkdtemp(prefix=f"{label}-", dir=self.root))
+        with self._lock:
+            self._active += 1
+            self._created += 1
+        try:
+            yield workspace
+        finally:
+            with self._lock:
+                self._active -= 1
+            await asyncio.to_thread(shutil.rmtree, workspace.path, True)
+
+    def sweep(self, max_age_seconds: float = None) -> int:
+        """Remove workspaces older than max_age_seconds (WORKSPACE_MAX_AGE_HOURS by default)"""
+        if max_age_seconds is None:
+            max_age_seconds = settings.WORKSPACE_MAX_AGE_HOURS * 3600
+        if not os.path.isdir(self.root):
+            return 0
+
+        removed = 0
+        cutoff = time.time() - max_age_seconds
+        for entry in os.scandir(self.root):
+            try:
+                if entry.is_dir(follow_symlinks=False) and entry.stat().st_mtime < cutoff:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                    removed += 1
+            except OSError as e:
+                print(f"Workspace sweep error for {entry.path}: {str(e)}")
+        if removed:
+            print(f"Removed {removed} stale workspaces")
+        with self._lock:
+            self._swept += removed
+        return removed
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"active": self._active, "created": self._created, "swept": self._swept}
+
+workspaces = WorkspaceManager(settings.WORKSPACE_ROOT)
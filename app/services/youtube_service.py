@@ -1,12 +1,40 @@
 import yt_dlp
-import requests
+import asyncio
 import re
 from typing import List, Tuple, Optional
 import math
+from app.config import settings
+from app.services.http_client import http_client
+from app.services.token_budget import get_token_budget
+from app.services.metrics import track_call
+
+# watch?v=, youtu.be/, shorts/, embed/ and live/ URLs all carry the same 11 character ID
+VIDEO_ID_PATTERN = re.compile(r'(?:v=|youtu\.be/|/shorts/|/embed/|/live/)([A-Za-z0-9_-]{11})')
 
 class YouTubeService:
-    def get_transcript_with_timestamps(self, video_url: str) -> Optional[List[Tuple[str, str, str]]]:
+    def extract_video_id(self, video_url: str) -> Optional[str]:
+        """Video ID from any common YouTube URL form, None if it cannot be found"""
+        match = VIDEO_ID_PATTERN.search(video_url or "")
+        return match.group(1) if match else None
+
+    async def get_transcript_with_timestamps(self, video_url: str) -> Optional[List[Tuple[str, str, str]]]:
         """Extract English transcript from YouTube video with timestamps"""
+        try:
+            if settings.YOUTUBE_SUBTITLE_URL:
+                subtitle_url = settings.YOUTUBE_SUBTITLE_URL.format(video_id=self.extract_video_id(video_url))
+            else:
+                # yt_dlp is blocking, keep it off the event loop
+                with track_call("youtube", "subtitle_lookup"):
+                    subtitle_url = await asyncio.to_thread(self._find_subtitle_url, video_url)
+            if not subtitle_url:
+                return None
+            return await self._download_and_parse_subtitle(subtitle_url)
+
+        except Exception as e:
+            raise Exception(f"YouTube transcript error: {str(e)}")
+
+    def _find_subtitle_url(self, video_url: str) -> Optional[str]:
+        """Look up the best English subtitle track URL with yt_dlp"""
         ydl_opts = {
             'skip_download': True,
             'writesubtitles': True,
@@ -16,49 +44,43 @@ class YouTubeService:
             'quiet': True,
         }
 
-        try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(video_url, download=False)
-                
-                # Get video duration to handle long videos
-                duration = info.get('duration', 0)
-                if duration > 3600:  # Longer than 1 hour
-                    print(f"Long video detected: {duration} seconds")
-                
-                subtitles = info.get("subtitles", {})
-                auto_subs = info.get("automatic_captions", {})
-
-                english_variants = ['en', 'en-US', 'en-GB', 'en-CA', 'en-AU']
-
-                # Try manual subtitles first
-                for lang in english_variants:
-                    if lang in subtitles and subtitles[lang]:
-                        subtitle_url = subtitles[lang][-1]['url']
-                        return self._download_and_parse_subtitle(subtitle_url)
-
-                # Try auto-generated subtitles
-                for lang in english_variants:
-                    if lang in auto_subs and auto_subs[lang]:
-                        subtitle_url = auto_subs[lang][-1]['url']
-                        return self._download_and_parse_subtitle(subtitle_url)
-
-                # Try any English variant
-                for lang in list(subtitles.keys()) + list(auto_subs.keys()):
-                    if lang.startswith('en') or '-en' in lang:
-                        source = subtitles if lang in subtitles else auto_subs
-                        subtitle_url = source[lang][-1]['url']
-                        return self._download_and_parse_subtitle(subtitle_url)
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(video_url, download=False)
+            
+            # Get video duration to handle long videos
+            duration = info.get('duration', 0)
+            if duration > 3600:  # Longer than 1 hour
+                print(f"Long video detected: {duration} seconds")
+            
+            subtitles = info.get("subtitles", {})
+            auto_subs = info.get("automatic_captions", {})
 
-                return None
+            english_variants = ['en', 'en-US', 'en-GB', 'en-CA', 'en-AU']
 
-        except Exception as e:
-            raise Exception(f"YouTube transcript error: {str(e)}")
+            # Try manual subtitles first
+            for lang in english_variants:
+                if lang in subtitles and subtitles[lang]:
+                    return subtitles[lang][-1]['url']
+
+            # Try auto-generated subtitles
+            for lang in english_variants:
+                if lang in auto_subs and auto_subs[lang]:
+                    return auto_subs[lang][-1]['url']
 
-    def _download_and_parse_subtitle(self, url: str) -> List[Tuple[str, str, str]]:
+            # Try any English variant
+            for lang in list(subtitles.keys()) + list(auto_subs.keys()):
+                if lang.startswith('en') or '-en' in lang:
+                    source = subtitles if lang in subtitles else auto_subs
+                    return source[lang][-1]['url']
+
+            return None
+
+    async def _download_and_parse_subtitle(self, url: str) -> List[Tuple[str, str, str]]:
         """Download and parse subtitle content with timestamps"""
         try:
-            response = requests.get(url, timeout=30)
-            response.raise_for_status()
+            with track_call("youtube", "subtitle_download"):
+                response = await http_client.client.get(url, timeout=30)
+                response.raise_for_status()
             vtt_data = response.text
 
             lines = vtt_data.splitlines()
@@ -127,14 +149,8 @@ class YouTubeService:
             if cleaned_text:
                 text_parts.append(cleaned_text)
         
-        full_text = " ".join(text_parts)
-        
-        # For very long transcripts, truncate but keep important parts
-        if len(full_text) > 50000:
-            # Keep first 40k and last 10k characters
-            full_text = full_text[:40000] + " [...] " + full_text[-10000:]
-        
-        return full_text
+        # Long transcripts are cut down by extractive compression before summarizing
+        return " ".join(text_parts)
 
     def chunk_transcript_by_time(self, transcript_with_timestamps: List[Tuple[str, str, str]], chunk_minutes: int = 5) -> List[str]:
         """Split transcript into time-based chunks - improved for long videos"""
@@ -166,37 +182,9 @@ class YouTubeService:
         
         return chunks
 
-    def chunk_transcript_by_size(self, text: str, max_chars: int = 8000) -> List[str]:
-        """Split text into size-based chunks for API limits"""
-        if len(text) <= max_chars:
-            return [text]
-        
-        chunks = []
-        words = text.split()
-        current_chunk = []
-        current_size = 0
-        
-        for word in words:
-            word_size = len(word) + 1  # +1 for space
-            
-            if current_size + word_size > max_chars:
-                if current_chunk:
-                    chunks.append(' '.join(current_chunk))
-                    current_chunk = [word]
-                    current_size = word_size
-                else:
-                    # Single word longer than max_chars, split it
-                    chunks.append(word[:max_chars])
-                    current_chunk = [word[max_chars:]] if len(word) > max_chars else []
-                    current_size = len(word[max_chars:]) if len(word) > max_chars else 0
-            else:
-                current_chunk.append(word)
-                current_size += word_size
-        
-        if current_chunk:
-            chunks.append(' '.join(current_chunk))
-        
-        return chunks
+    def chunk_transcript_by_size(self, text: str, max_tokens: int = None, overlap: int = None) -> List[str]:
+        """Split text into chunks of at most max_tokens for API limits, overlapping by LLM_CHUNK_OVERLAP_TOKENS by default"""
+        return get_token_budget().split(text, max_tokens or settings.LLM_CHUNK_TARGET_TOKENS, overlap)
 
     def _timestamp_to_seconds(self, timestamp: str) -> float:
         """Convert timestamp string to seconds"""
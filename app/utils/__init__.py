@@ -1,8 +1,15 @@
 # Utils package
-from .file_handling import save_upload_file, cleanup_file, validate_file_type
+from .file_handling import SavedUpload, ingest_upload, save_upload_file, cleanup_file, validate_file_type, file_sha256
 from .helpers import generate_unique_id, hash_password, validate_email, format_timestamp, sanitize_filename, chunk_text, calculate_processing_time
+from .chunking import Span, chunk_spans
+from .map_reduce import MapReduceExecutor
+from .single_flight import SingleFlight, pipeline_flights
+from .question_merge import parse_qa_pairs, merge_questions, format_questions
 
 __all__ = [
-    "save_upload_file", "cleanup_file", "validate_file_type",
-    "generate_unique_id", "hash_password", "validate_email", "format_timestamp", "sanitize_filename", "chunk_text", "calculate_processing_time"
+    "SavedUpload", "ingest_upload", "save_upload_file", "cleanup_file", "validate_file_type", "file_sha256",
+    "generate_unique_id", "hash_password", "validate_email", "format_timestamp", "sanitize_filename", "chunk_text", "calculate_processing_time",
+    "Span", "chunk_spans",
+    "MapReduceExecutor", "SingleFlight", "pipeline_flights",
+    "parse_qa_pairs", "merge_questions", "format_questions"
 ]
\ No newline at end of file
@@ -0,0 +1,122 @@
+import re
+from collections import deque
+from typing import Callable, Iterator, List, Tuple
+
+Span = Tuple[int, int]
+
+PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+')
+WORD = re.compile(r'\S+')
+
+def _strip(text: str, start: int, end: int) -> Span:
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+def _between(pattern, text: str, start: int, end: int) -> Iterator[Span]:
+    """Stripped, non-empty spans of text[start:end] separated by pattern matches"""
+    position = start
+    for match in pattern.finditer(text, start, end):
+        span = _strip(text, position, match.start())
+        if span[0] < span[1]:
+            yield span
+        position = match.end()
+    span = _strip(text, position, end)
+    if span[0] < span[1]:
+        yield span
+
+def _fit(text: str, start: int, end: int, max_size: int, measure: Callable[[str], int]) -> int:
+    """End of the longest prefix of text[start:end] within max_size, at least one character"""
+    low, high = start + 1, end
+    while low < high:
+        middle = (low + high + 1) // 2
+        if measure(text[start:middle]) <= max_size:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+def _units(text: str, max_size: int, measure: Callable[[str], int]) -> Iterator[Tuple[int, int, int]]:
+    """(start, end, size) units no larger than max_size, preferring paragraph, then sentence, then word boundaries.
+
+    Every character is measured once per level it is split at, so the scan stays linear.
+    """
+    for paragraph in _between(PARAGRAPH_BREAK, text, 0, len(text)):
+        size = measure(text[paragraph[0]:paragraph[1]])
+        if size <= max_size:
+            yield paragraph[0], paragraph[1], size
+            continue
+        for sentence in _between(SENTENCE_BREAK, text, *paragraph):
+            size = measure(text[sentence[0]:sentence[1]])
+            if size <= max_size:
+                yield sentence[0], sentence[1], size
+                continue
+            for word in WORD.finditer(text, *sentence):
+                start, end = word.span()
+                size = measure(text[start:end])
+                while size > max_size:
+                    # A single word over the budget (URLs, base64, unspaced scripts) is cut where it fits
+                    cut = _fit(text, start, end, max_size, measure)
+                    yield start, cut, measure(text[start:cut])
+                    start = cut
+                    size = measure(text[start:end])
+                if start < end:
+                    yield start, end, size
+
+def _drop_first(window: deque, size: int) -> int:
+    """Remove the first unit of the window, returning the new window size"""
+    first = window.popleft()
+    # The new first unit no longer pays for the whitespace before it
+    return size - first[2] - window[0][3] if window else 0
+
+def chunk_spans(text: str, max_size: int, measure: Callable[[str], int] = len, overlap: int = 0) -> List[Span]:
+    """Split text into (start, end) spans of at most max_size, as measured by `measure`.
+
+    Spans break on paragraph, then sentence, then word boundaries and index into `text`, so no
+    chunk is copied until the caller slices it. With overlap, each chunk starts with the trailing
+    units of the previous one, up to `overlap` in size (capped at half of max_size).
+    """
+    if not text or max_size <= 0:
+        return []
+    overlap = max(0, min(overlap, max_size // 2))
+
+    spans: List[Span] = []
+    # (start, end, size, size of the whitespace before it) for each unit of the open chunk
+    window = deque()
+    size = 0
+    fresh = 0  # units added since the last chunk was closed
+    gaps = {}
+
+    for start, end, unit_size in _units(text, max_size, measure):
+        gap = 0
+        if window:
+            whitespace = text[window[-1][1]:start]
+            if whitespace not in gaps:
+                gaps[whitespace] = measure(whitespace)
+            gap = gaps[whitespace]
+
+        while window and size + gap + unit_size > max_size:
+            if fresh:
+                spans.append((window[0][0], window[-1][1]))
+                fresh = 0
+                if not overlap:
+                    window.clear()
+                    size = 0
+                # Carry the trailing units that fit in the overlap into the next chunk
+                while window and size > overlap:
+                    size = _drop_first(window, size)
+            else:
+                # The carried overlap leaves no room for this unit, give up its oldest part
+                size = _drop_first(window, size)
+            if not window:
+                gap = 0
+
+        window.append((start, end, unit_size, gap))
+        size += gap + unit_size
+        fresh += 1
+
+    if fresh:
+        spans.append((window[0][0], window[-1][1]))
+    return spans
@@ -1,7 +1,12 @@
+import hashlib
 import os
+import shutil
+import uuid
+import anyio
 from fastapi import UploadFile, HTTPException
-from typing import List
+from typing import List, Optional
 import mimetypes
+from app.config import settings
 
 # Try to import magic, fallback to mimetypes
 try:
@@ -20,54 +25,146 @@ ALLOWED_EXTENSIONS = {
 ALLOWED_MIME_TYPES = {
     'text/plain', 'application/pdf', 'image/jpeg', 'image/png', 'image/gif',
     'image/bmp', 'image/tiff', 'application/msword', 
-    'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'application/vnd.openxmlformats-officedocument.presentationml.presentation'
 }
 
+# Word and PowerPoint files count as text documents ('text/' in allowed_types)
+OFFICE_DOCUMENT_MIME_TYPES = (
+    'application/msword',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'application/vnd.openxmlformats-officedocument.presentationml.presentation',
+    'application/vnd.ms-powerpoint'
+)
+
+# Bytes read for MIME sniffing, as validate_file_type has always used
+SNIFF_BYTES = 2048
+
+class SavedUpload:
+    """An upload written to its own temporary path, with the hash and type computed while saving"""
+
+    def __init__(self, path: str, filename: str, content_type: str, size: int, sha256: str, mime_type: str):
+        self.path = path
+        self.filename = filename
+        self.content_type = content_type
+        self.size = size
+        self.sha256 = sha256
+        self.mime_type = mime_type
+
+def unique_upload_path(filename: str, upload_dir: str = "app/temp_uploads") -> str:
+    """A path no other request can collide with, keeping the extension extractors dispatch on"""
+    os.makedirs(upload_dir, exist_ok=True)
+    ext = os.path.splitext(filename or "")[1].lower()
+    if not ext[1:].isalnum():
+        ext = ""
+    return os.path.join(upload_dir, f"{uuid.uuid4().hex}{ext}")
+
+def _too_large(limit: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"File too large. The limit is {limit // (1024 * 1024)} MB.")
+
+async def ingest_upload(upload_file: UploadFile, allowed_types: List[str] = None, max_bytes: int = None,
+                        upload_dir: str = "app/temp_uploads") -> SavedUpload:
+    """Stream an upload to a unique temporary path in UPLOAD_CHUNK_KB blocks.
+
+    The SHA-256 is computed and the MIME type sniffed from the first block as it is written, so
+    memory stays constant and callers never re-read the file. Uploads over max_bytes (UPLOAD_MAX_MB
+    by default) get a 413 and uploads of a type outside allowed_types a 400, both before the body
+    is copied.
+    """
+    limit = max_bytes or settings.UPLOAD_MAX_MB * 1024 * 1024
+    if upload_file.size is not None and upload_file.size > limit:
+        raise _too_large(limit)
+
+    block_size = settings.UPLOAD_CHUNK_KB * 1024
+    digest = hashlib.sha256()
+    size = 0
+    mime_type = None
+    file_path = unique_upload_path(upload_file.filename, upload_dir)
+    try:
+        async with await anyio.open_file(file_path, "wb") as buffer:
+            while True:
+                block = await upload_file.read(block_size)
+                if not block:
+                    break
+                if mime_type is None:
+                    mime_type = sniff_mime_type(block[:SNIFF_BYTES], upload_file.filename)
+                    if allowed_types and not is_allowed_type(mime_type, upload_file.filename, allowed_types):
+                        raise HTTPException(status_code=400, detail="Invalid file type")
+                size += len(block)
+                if size > limit:
+                    raise _too_large(limit)
+                digest.update(block)
+                await buffer.write(block)
+    except HTTPException:
+        cleanup_file(file_path)
+        raise
+    except Exception as e:
+        cleanup_file(file_path)
+        raise HTTPException(status_code=500, detail=f"File upload error: {str(e)}")
+
+    if mime_type is None:
+        mime_type = sniff_mime_type(b"", upload_file.filename)
+    content_type = upload_file.content_type or mime_type or "application/octet-stream"
+    return SavedUpload(file_path, upload_file.filename, content_type, size, digest.hexdigest(), mime_type)
+
 def save_upload_file(upload_file: UploadFile, upload_dir: str = "app/temp_uploads") -> str:
-    """Save uploaded file to temporary storage"""
+    """Save uploaded file to a unique temporary path (blocking; routes use ingest_upload)"""
     try:
-        os.makedirs(upload_dir, exist_ok=True)
-        file_path = os.path.join(upload_dir, upload_file.filename)
+        file_path = unique_upload_path(upload_file.filename, upload_dir)
         
         with open(file_path, "wb") as buffer:
-            content = upload_file.file.read()
-            buffer.write(content)
+            shutil.copyfileobj(upload_file.file, buffer, settings.UPLOAD_CHUNK_KB * 1024)
         
         return file_path
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"File upload error: {str(e)}")
 
+def sniff_mime_type(content: bytes, filename: str) -> Optional[str]:
+    """MIME type from the leading bytes with python-magic, else from the filename"""
+    if HAS_MAGIC and content:
+        try:
+            return magic.from_buffer(content, mime=True)
+        except Exception:
+            pass
+    return mimetypes.guess_type(filename or "")[0]
+
+def is_allowed_type(file_type: Optional[str], filename: str, allowed_types: List[str]) -> bool:
+    """Whether a sniffed MIME type (or, without python-magic, the extension) is in allowed_types"""
+    filename = (filename or "").lower()
+    file_extension = os.path.splitext(filename)[1]
+    if HAS_MAGIC and file_type:
+        if 'text/' in allowed_types and file_type in OFFICE_DOCUMENT_MIME_TYPES:
+            return True
+        # Some libmagic versions only see the zip container of .docx/.pptx
+        if 'text/' in allowed_types and file_type == 'application/zip':
+            return file_extension in ['.docx', '.pptx']
+        return any(file_type.startswith(allowed) for allowed in allowed_types)
+    
+    # Use filename extension as fallback
+    valid_extensions = []
+    for category in allowed_types:
+        if category == 'text/':
+            valid_extensions.extend(['.txt', '.pdf', '.doc', '.docx', '.ppt', '.pptx'])
+        elif category == 'image/':
+            valid_extensions.extend(['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff'])
+        elif category == 'application/pdf':
+            valid_extensions.append('.pdf')
+    return file_extension in valid_extensions
+
 def validate_file_type(file: UploadFile, allowed_types: List[str]) -> bool:
     """Validate file type with fallback methods"""
     try:
         # Read first 2048 bytes for detection
-        content = file.file.read(2048)
+        content = file.file.read(SNIFF_BYTES)
         file.file.seek(0)  # Reset file pointer
         
-        # Method 1: Use python-magic if available
-        if HAS_MAGIC:
-            mime = magic.Magic(mime=True)
-            file_type = mime.from_buffer(content)
-            return any(file_type.startswith(allowed) for allowed in allowed_types)
-        
-        # Method 2: Use filename extension as fallback
-        filename = file.filename.lower()
-        valid_extensions = []
-        for category in allowed_types:
-            if category == 'text/':
-                valid_extensions.extend(['.txt', '.pdf', '.doc', '.docx'])
-            elif category == 'image/':
-                valid_extensions.extend(['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff'])
-            elif category == 'application/pdf':
-                valid_extensions.append('.pdf')
-        
-        file_extension = os.path.splitext(filename)[1]
-        return file_extension in valid_extensions
+        file_type = magic.from_buffer(content, mime=True) if HAS_MAGIC else None
+        return is_allowed_type(file_type, file.filename, allowed_types)
         
     except Exception:
         # Final fallback: check filename extension
         filename = file.filename.lower()
-        if any(filename.endswith(ext) for ext in ['.pdf', '.txt', '.doc', '.docx', '.jpg', '.jpeg', '.png']):
+        if any(filename.endswith(ext) for ext in ['.pdf', '.txt', '.doc', '.docx', '.pptx', '.jpg', '.jpeg', '.png']):
             return True
         return False
 
@@ -79,6 +176,14 @@ def cleanup_file(file_path: str):
     except Exception:
         pass  # Silent cleanup
 
+def file_sha256(file_path: str) -> str:
+    """SHA-256 of a saved file, read in blocks"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
 def get_file_extension(filename: str) -> str:
     """Get file extension from filename"""
     return os.path.splitext(filename)[1].lower()
@@ -2,6 +2,7 @@ import hashlib
 import uuid,os
 from datetime import datetime, timedelta
 from typing import Any, Dict
+from app.utils.chunking import chunk_spans
 
 def generate_unique_id() -> str:
     """Generate a unique ID"""
@@ -39,23 +40,9 @@ def sanitize_filename(filename: str) -> str:
         sanitized = name[:95] + ext
     return sanitized
 
-def chunk_text(text: str, max_length: int = 4000) -> list:
-    """Split text into chunks for processing"""
-    chunks = []
-    words = text.split()
-    current_chunk = []
-    
-    for word in words:
-        if len(' '.join(current_chunk + [word])) <= max_length:
-            current_chunk.append(word)
-        else:
-            chunks.append(' '.join(current_chunk))
-            current_chunk = [word]
-    
-    if current_chunk:
-        chunks.append(' '.join(current_chunk))
-    
-    return chunks
+def chunk_text(text: str, max_length: int = 4000, overlap: int = 0) -> list:
+    """Split text into chunks of at most max_length characters for processing"""
+    return [text[start:end] for start, end in chunk_spans(text, max_length, overlap=overlap)]
 
 def calculate_processing_time(start_time: datetime) -> float:
     """Calculate processing time in seconds"""
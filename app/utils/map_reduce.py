@@ -0,0 +1,75 @@
+import asyncio
+import inspect
+from typing import Any, Awaitable, Callable, List, Optional, Sequence
+from app.config import settings
+
+# on_progress(completed, total, index, result)
+ProgressCallback = Callable[[int, int, int, Any], Any]
+
+class MapReduceExecutor:
+    """Run an async map step over items with bounded concurrency, then reduce the ordered results"""
+
+    def __init__(self, concurrency: int = None, max_retries: int = None, retry_delay: float = 1.0):
+        self.concurrency = max(1, concurrency or settings.LLM_MAP_CONCURRENCY)
+        self.max_retries = settings.LLM_MAP_RETRIES if max_retries is None else max_retries
+        self.retry_delay = retry_delay
+
+    async def map(
+        self,
+        items: Sequence[Any],
+        map_fn: Callable[[int, Any], Awaitable[Any]],
+        on_progress: Optional[ProgressCallback] = None,
+        fallback: Optional[Callable[[int, Any, Exception], Any]] = None
+    ) -> List[Any]:
+        """Apply map_fn(index, item) to every item, returning results in input order.
+
+        Each item is retried on its own with exponential backoff. When retries run out the
+        fallback result is used, or the error is raised if no fallback is given.
+        """
+        total = len(items)
+        results: List[Any] = [None] * total
+        semaphore = asyncio.Semaphore(self.concurrency)
+        completed = 0
+
+        async def run_one(index: int, item: Any):
+            nonlocal completed
+            async with semaphore:
+                result = await self._map_with_retries(index, item, map_fn, fallback)
+            results[index] = result
+            completed += 1
+            if on_progress:
+                await _maybe_await(on_progress(completed, total, index, result))
+
+        await asyncio.gather(*(run_one(i, item) for i, item in enumerate(items)))
+        return results
+
+    async def run(
+        self,
+        items: Sequence[Any],
+        map_fn: Callable[[int, Any], Awaitable[Any]],
+        reduce_fn: Callable[[List[Any]], Awaitable[Any]],
+        on_progress: Optional[ProgressCallback] = None,
+        fallback: Optional[Callable[[int, Any, Exception], Any]] = None
+    ) -> Any:
+        """Map every item concurrently, then pass the ordered results to reduce_fn"""
+        mapped = await self.map(items, map_fn, on_progress=on_progress, fallback=fallback)
+        return await reduce_fn(mapped)
+
+    async def _map_with_retries(self, index, item, map_fn, fallback):
+        attempt = 0
+        while True:
+            try:
+                return await map_fn(index, item)
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    if fallback is None:
+                        raise
+                    print(f"Item {index + 1} failed after {attempt + 1} attempt(s): {e}")
+                    return fallback(index, item, e)
+                attempt += 1
+                print(f"Retrying item {index + 1} (attempt {attempt + 1}): {e}")
+                await asyncio.sleep(self.retry_delay * (2 ** (attempt - 1)))
+
+async def _maybe_await(value):
+    if inspect.isawaitable(value):
+        await value
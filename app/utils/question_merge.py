@@ -0,0 +1,115 @@
+import re
+from typing import Dict, List, Optional, Set, Tuple
+
+# Shingle overlap (Jaccard) at which two questions are treated as the same question
+DUPLICATE_THRESHOLD = 0.5
+SHINGLE_SIZE = 5
+
+ITEM_START = re.compile(r'^\s*(?:Q|A)?(\d+)\s*[.):]\s*(.*)$', re.IGNORECASE)
+
+class QuestionCandidate:
+    """One parsed question/answer pair and the chunks that asked it"""
+
+    def __init__(self, question: str, answer: str, chunk_index: int, position: int):
+        self.question = question
+        self.answer = answer
+        self.chunk_index = chunk_index
+        self.position = position
+        self.chunks: Set[int] = {chunk_index}
+        self.shingles = shingle(question)
+
+def parse_qa_pairs(text: str) -> List[Tuple[str, str]]:
+    """Parse a QUESTIONS:/ANSWERS: numbered block into (question, answer) pairs matched by number.
+
+    Lines that do not start a new numbered item (multiple choice options, wrapped answers)
+    are kept with the item above them.
+    """
+    sections: Dict[str, Dict[int, List[str]]] = {"questions": {}, "answers": {}}
+    section = None
+    current: Optional[List[str]] = None
+
+    for raw in (text or "").splitlines():
+        line = raw.strip()
+        if not line:
+            continue
+        upper = line.upper().strip("*# ")
+        if upper.startswith("QUESTIONS"):
+            section, current = "questions", None
+            continue
+        if upper.startswith("ANSWERS"):
+            section, current = "answers", None
+            continue
+        if section is None:
+            continue
+
+        match = ITEM_START.match(line)
+        if match:
+            current = sections[section].setdefault(int(match.group(1)), [])
+            if match.group(2).strip():
+                current.append(match.group(2).strip())
+        elif current is not None:
+            current.append(line)
+
+    pairs = []
+    for number in sorted(sections["questions"]):
+        question = "\n".join(sections["questions"][number]).strip()
+        answer = "\n".join(sections["answers"].get(number, [])).strip()
+        if question and answer:
+            pairs.append((question, answer))
+    return pairs
+
+def shingle(text: str, size: int = SHINGLE_SIZE) -> Set[str]:
+    """Character shingles of the normalized text, robust to word order and inflection"""
+    normalized = " ".join(re.sub(r'[^\w\s]', ' ', text.lower()).split())
+    if len(normalized) <= size:
+        return {normalized} if normalized else set()
+    return {normalized[i:i + size] for i in range(len(normalized) - size + 1)}
+
+def similarity(a: Set[str], b: Set[str]) -> float:
+    """Jaccard similarity of two shingle sets"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+def merge_questions(per_chunk: List[List[Tuple[str, str]]], num_questions: int, threshold: float = DUPLICATE_THRESHOLD) -> List[QuestionCandidate]:
+    """Collapse near-duplicate questions across chunks and pick a diverse top num_questions.
+
+    A question asked by several chunks keeps its first wording and counts every chunk that asked
+    it. Selection goes round-robin over chunks so each part of the document is covered before
+    any part gets a second question; within a chunk, questions asked more widely come first.
+    """
+    kept: List[QuestionCandidate] = []
+    for chunk_index, pairs in enumerate(per_chunk):
+        for position, (question, answer) in enumerate(pairs):
+            candidate = QuestionCandidate(question, answer, chunk_index, position)
+            duplicate = next((k for k in kept if similarity(k.shingles, candidate.shingles) >= threshold), None)
+            if duplicate is not None:
+                duplicate.chunks.add(chunk_index)
+            else:
+                kept.append(candidate)
+
+    by_chunk: Dict[int, List[QuestionCandidate]] = {}
+    for candidate in kept:
+        by_chunk.setdefault(candidate.chunk_index, []).append(candidate)
+    for candidates in by_chunk.values():
+        candidates.sort(key=lambda c: (-len(c.chunks), c.position))
+
+    selected: List[QuestionCandidate] = []
+    queues = [by_chunk[i] for i in sorted(by_chunk)]
+    while len(selected) < num_questions and any(queues):
+        for queue in queues:
+            if queue and len(selected) < num_questions:
+                selected.append(queue.pop(0))
+
+    # Present in document order
+    return sorted(selected, key=lambda c: (c.chunk_index, c.position))
+
+def format_questions(candidates: List[QuestionCandidate]) -> str:
+    """Render selected questions in the QUESTIONS:/ANSWERS: format the generators use"""
+    def numbered(items):
+        # Continuation lines (options, wrapped answers) stay indented under their item
+        return "\n".join(f"{i + 1}. " + item.replace("\n", "\n   ") for i, item in enumerate(items))
+
+    questions = numbered([c.question for c in candidates])
+    answers = numbered([c.answer for c in candidates])
+    return f"QUESTIONS:\n{questions}\n\nANSWERS:\n{answers}"
@@ -0,0 +1,112 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one in-flight computation.
+
+    The first caller for a key starts the work; callers arriving while it runs await the same
+    result (or exception). The shared task is shielded, so one caller disconnecting does not
+    cancel the work for the others.
+
+    Callers passing `emit` share a computation that reports stage events: fn is called with an
+    emit that fans each event out to every such caller still waiting, and callers joining late
+    get the earlier events replayed first. These are coalesced only with each other, since a
+    pipeline reporting events may run differently (streamed completions).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        # Flights are keyed by (key, reports events)
+        self._tasks: Dict[Tuple[str, bool], asyncio.Task] = {}
+        self._waiters: Dict[Tuple[str, bool], int] = {}
+        self._listeners: Dict[Tuple[str, bool], List[Callable]] = {}
+        self._events: Dict[Tuple[str, bool], list] = {}
+        self._stats = {
+            "executions": 0,
+            "coalesced": 0,
+            "saved_seconds": 0.0
+        }
+
+    async def do(self, key: str, fn: Callable[..., Awaitable[Any]], emit: Optional[Callable] = None) -> Any:
+        """Result of fn(), or with emit of fn(shared emit), shared with concurrent calls for key"""
+        flight = (key, emit is not None)
+        task = self._tasks.get(flight)
+        if task is None:
+            self._stats["executions"] += 1
+            self._waiters[flight] = 0
+            if emit is not None:
+                self._listeners[flight] = []
+                self._events[flight] = []
+                run = lambda: fn(lambda event, data=None: self._broadcast(flight, event, data))
+            else:
+                run = fn
+            task = asyncio.ensure_future(self._run(flight, run))
+            # Mark failures retrieved even if every caller has gone away
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._tasks[flight] = task
+        else:
+            self._waiters[flight] += 1
+            self._stats["coalesced"] += 1
+            print(f"[{self.name}] joined in-flight computation for {key} ({self._waiters[flight]} waiting)")
+
+        if emit is None:
+            return await asyncio.shield(task)
+
+        for event, data in self._events.get(flight, ()):
+            emit(event, data)
+        listeners = self._listeners.get(flight, [])
+        listeners.append(emit)
+        try:
+            return await asyncio.shield(task)
+        finally:
+            # A caller that went away stops receiving events
+            listeners.remove(emit)
+
+    def _broadcast(self, flight: Tuple[str, bool], event: str, data: Any = None):
+        self._events[flight].append((event, data))
+        for listener in list(self._listeners[flight]):
+            listener(event, data)
+
+    async def _run(self, flight: Tuple[str, bool], fn: Callable[[], Awaitable[Any]]) -> Any:
+        start = time.perf_counter()
+        try:
+            return await fn()
+        finally:
+            # Every coalesced waiter saved one full run of the computation
+            self._stats["saved_seconds"] += (time.perf_counter() - start) * self._waiters.pop(flight, 0)
+            self._tasks.pop(flight, None)
+            self._listeners.pop(flight, None)
+            self._events.pop(flight, None)
+
+    def when_idle(self, key: str, callback: Callable[[], Any]):
+        """Run callback now, or once the in-flight computation for key has finished.
+
+        Used for cleanup of inputs the shared computation may still be reading after the
+        request that started it has gone away.
+        """
+        tasks = [task for (flight_key, _), task in self._tasks.items() if flight_key == key]
+        if not tasks:
+            callback()
+            return
+
+        remaining = [len(tasks)]
+
+        def finished(_):
+            remaining[0] -= 1
+            if not remaining[0]:
+                callback()
+
+        for task in tasks:
+            task.add_done_callback(finished)
+
+    def stats(self) -> dict:
+        return {
+            **self._stats,
+            "saved_seconds": round(self._stats["saved_seconds"], 2),
+            "in_flight": len(self._tasks),
+            "waiting": sum(self._waiters.values())
+        }
+
+# Shared by the document, past paper and YouTube pipelines
+pipeline_flights = SingleFlight("pipelines")
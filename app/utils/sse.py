@@ -0,0 +1,73 @@
+import asyncio
+import json
+from typing import Any, Awaitable, Callable, Optional
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+# emit(event, data) callback handed to streaming pipelines
+Emit = Callable[..., None]
+
+def format_sse(event: str, data: Any) -> str:
+    """Encode one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+def no_events(event: str, data: Any = None):
+    """emit() used when the client did not ask for a stream"""
+    pass
+
+def stream_tokens(emit: Emit):
+    """on_token callback forwarding completion deltas as `token` events, None when not streaming"""
+    if emit is no_events:
+        return None
+    return lambda text: emit("token", {"text": text})
+
+def shared_events(emit: Emit) -> Optional[Emit]:
+    """emit to hand to SingleFlight.do, None when not streaming so plain requests coalesce with each other"""
+    if emit is no_events:
+        return None
+    return emit
+
+def chunk_progress(emit: Emit, event: str):
+    """on_progress callback reporting each finished chunk as `event`, None when not streaming"""
+    if emit is no_events:
+        return None
+    return lambda completed, total, index, result: emit(event, {"completed": completed, "total": total, "index": index})
+
+def event_stream_response(pipeline: Callable[[Emit], Awaitable[Any]]) -> StreamingResponse:
+    """Run pipeline(emit) in the background and stream its events as SSE.
+
+    A `started` event is sent straight away, then every emitted stage event, and finally a
+    `result` event with the pipeline's return value or an `error` event if it raised.
+    """
+    async def body():
+        queue: asyncio.Queue = asyncio.Queue()
+
+        def emit(event: str, data: Any = None):
+            queue.put_nowait((event, data if data is not None else {}))
+
+        yield format_sse("started", {})
+        task = asyncio.create_task(pipeline(emit))
+        task.add_done_callback(lambda _: queue.put_nowait(None))
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                yield format_sse(*item)
+
+            try:
+                yield format_sse("result", task.result())
+            except HTTPException as e:
+                yield format_sse("error", {"status_code": e.status_code, "detail": e.detail})
+            except Exception as e:
+                yield format_sse("error", {"status_code": 500, "detail": str(e)})
+        finally:
+            # Client went away mid-stream
+            if not task.done():
+                task.cancel()
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,112 @@
+"""
+Time of text chunking on long inputs: the previous chunkers vs the span-based chunker.
+
+Generates lecture-style text (paragraphs of sentences, plus one unpunctuated transcript-like
+block) and chunks it by characters and by tokens:
+
+    python -m benchmarks.chunking_benchmark --chars 1000000
+"""
+import argparse
+import random
+import re
+import time
+
+from app.services.token_budget import get_token_budget
+from app.utils.chunking import chunk_spans
+
+WORDS = ("the enzyme binds its substrate at the active site and lowers the activation energy "
+         "so the reaction reaches equilibrium faster without being consumed").split()
+
+def make_text(characters: int, seed: int = 7) -> str:
+    random.seed(seed)
+    paragraphs, size = [], 0
+    while size < characters:
+        if random.random() < 0.05:
+            # Auto captions: one long run of words with no sentence punctuation
+            paragraph = " ".join(random.choice(WORDS) for _ in range(3000))
+        else:
+            sentences = [
+                " ".join(random.choice(WORDS) for _ in range(random.randint(8, 30))).capitalize() + "."
+                for _ in range(random.randint(2, 8))
+            ]
+            paragraph = " ".join(sentences)
+        paragraphs.append(paragraph)
+        size += len(paragraph) + 2
+    return "\n\n".join(paragraphs)[:characters]
+
+def previous_chunk_text(text: str, max_length: int = 4000) -> list:
+    """The previous helpers.chunk_text"""
+    chunks = []
+    words = text.split()
+    current_chunk = []
+
+    for word in words:
+        if len(' '.join(current_chunk + [word])) <= max_length:
+            current_chunk.append(word)
+        else:
+            chunks.append(' '.join(current_chunk))
+            current_chunk = [word]
+
+    if current_chunk:
+        chunks.append(' '.join(current_chunk))
+
+    return chunks
+
+def previous_token_split(budget, text: str, max_tokens: int) -> list:
+    """The previous TokenBudget.split, used by document and transcript chunking"""
+    def pieces():
+        for paragraph in re.split(r'\n\s*\n', text):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            tokens = budget.count(paragraph)
+            if tokens <= max_tokens:
+                yield paragraph, tokens, "\n\n"
+                continue
+            for sentence in re.split(r'(?<=[.!?])\s+', paragraph):
+                tokens = budget.count(sentence)
+                if tokens <= max_tokens:
+                    yield sentence, tokens, " "
+                    continue
+                for word in sentence.split():
+                    yield word, budget.count(word), " "
+
+    chunks, current, current_tokens = [], [], 0
+    for piece, tokens, separator in pieces():
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append("".join(current).strip())
+            current, current_tokens = [], 0
+        if current:
+            current.append(separator)
+        current.append(piece)
+        current_tokens += tokens + 1
+    if current:
+        chunks.append("".join(current).strip())
+    return chunks
+
+def timed(name: str, run):
+    start = time.perf_counter()
+    chunks = run()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<28} time={elapsed * 1000:9.1f}ms chunks={len(chunks)}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chars", type=int, default=1_000_000)
+    parser.add_argument("--max-length", type=int, default=4000, help="characters per chunk_text chunk")
+    parser.add_argument("--max-tokens", type=int, default=4000, help="tokens per token-budget chunk")
+    parser.add_argument("--overlap", type=int, default=200, help="token overlap for the overlapping run")
+    args = parser.parse_args()
+
+    text = make_text(args.chars)
+    budget = get_token_budget()
+    print(f"{len(text)} characters, tokenizer={'tiktoken' if budget.encoding is not None else 'estimate'}")
+
+    timed("chunk_text (previous)", lambda: previous_chunk_text(text, args.max_length))
+    timed("chunk_text (spans)", lambda: chunk_spans(text, args.max_length))
+    timed("token split (previous)", lambda: previous_token_split(budget, text, args.max_tokens))
+    timed("token split (spans)", lambda: chunk_spans(text, args.max_tokens, budget.count))
+    timed(f"token split (overlap {args.overlap})", lambda: chunk_spans(text, args.max_tokens, budget.count, args.overlap))
+
+if __name__ == "__main__":
+    main()
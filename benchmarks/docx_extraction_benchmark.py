@@ -0,0 +1,99 @@
+"""
+Time and peak memory of DOCX extraction: the python-docx DOM path vs the streaming extractor.
+
+Generates a lab-manual style document (a header, then paragraphs and a table per page) and
+runs each extractor in a fresh process so peak RSS is measured independently:
+
+    python -m benchmarks.docx_extraction_benchmark --pages 200
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+import docx
+
+from app.services.docx_extractor import docx_extractor
+
+SENTENCE = ("The titration is repeated until three concordant readings within 0.1 cm3 are obtained, "
+            "and the mean titre is used to calculate the concentration of the unknown solution.")
+
+def make_document(path: str, pages: int):
+    document = docx.Document()
+    document.sections[0].header.paragraphs[0].text = "CH-101 Laboratory Manual"
+    for page in range(pages):
+        document.add_heading(f"Experiment {page + 1}", level=2)
+        for _ in range(6):
+            document.add_paragraph(SENTENCE)
+        table = document.add_table(rows=5, cols=3)
+        for row_index, row in enumerate(table.rows):
+            for col_index, cell in enumerate(row.cells):
+                cell.text = f"Reading {row_index}.{col_index}: {12.5 + row_index + col_index / 10:.2f} cm3"
+        document.add_page_break()
+    document.save(path)
+
+def python_docx_path(file_path: str) -> str:
+    """The previous DocumentService._extract_from_docx"""
+    doc = docx.Document(file_path)
+    text = ""
+    for paragraph in doc.paragraphs:
+        text += paragraph.text + "\n"
+    return text.strip()
+
+def streaming_path(file_path: str) -> str:
+    return docx_extractor.extract_text(file_path)
+
+def _rss_kib(field: str) -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field):
+                return int(line.split()[1])
+    return 0
+
+def _reset_peak_rss() -> bool:
+    """Reset VmHWM so the peak covers only the extraction (Linux); False where unsupported"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+def measure(name: str, file_path: str, queue):
+    extract = python_docx_path if name == "python-docx" else streaming_path
+    if _reset_peak_rss():
+        baseline, peak = _rss_kib("VmRSS:"), lambda: _rss_kib("VmHWM:")
+    else:
+        baseline, peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, \
+            lambda: resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    text = extract(file_path)
+    elapsed = time.perf_counter() - start
+    queue.put((elapsed, (peak() - baseline) / 1024, len(text), text.count(" | ")))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--file", help="benchmark an existing .docx instead of a generated one")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = args.file or os.path.join(directory, "manual.docx")
+        if not args.file:
+            make_document(file_path, args.pages)
+        print(f"{file_path}: {os.path.getsize(file_path) / 1024:.0f} KiB")
+
+        context = multiprocessing.get_context("spawn")
+        for name in ("python-docx", "streaming"):
+            queue = context.Queue()
+            process = context.Process(target=measure, args=(name, file_path, queue))
+            process.start()
+            elapsed, peak_mb, characters, table_cells = queue.get()
+            process.join()
+            print(f"{name:<12} time={elapsed * 1000:8.1f}ms peak_rss_growth={peak_mb:7.1f}MiB "
+                  f"chars={characters:>8} table_cell_separators={table_cells}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Per-chunk latency of the old connection-per-call path vs the shared pooled client.
+
+Runs a local OpenAI-compatible stub so no real quota is used. Both paths post the same body
+straight to the stub, so only connection handling differs; the provider rate limiter and
+the LLM response cache that ChatGPTService adds are left out:
+
+    python -m benchmarks.http_client_benchmark --chunks 50 --server-delay 0.02
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from app.services.http_client import http_client
+
+def make_stub_handler(server_delay: float):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            self.rfile.read(length)
+            time.sleep(server_delay)
+            body = json.dumps({"choices": [{"message": {"content": "stub summary"}}]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+def report(label: str, latencies: list):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{label:<28} mean={statistics.mean(latencies) * 1000:7.2f}ms "
+          f"p50={statistics.median(latencies) * 1000:7.2f}ms p95={p95 * 1000:7.2f}ms")
+
+def run_before(endpoint: str, chunks: int) -> list:
+    """Old path: a fresh requests.post (new TCP connection) for every chunk"""
+    latencies = []
+    for i in range(chunks):
+        start = time.perf_counter()
+        response = requests.post(
+            f"{endpoint}/chat/completions",
+            data=json.dumps({"messages": [{"role": "user", "content": f"chunk {i}"}]}),
+            headers={"Content-Type": "application/json"},
+            timeout=60
+        )
+        response.json()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+async def run_after(endpoint: str, chunks: int) -> list:
+    """New path: the shared keep-alive client"""
+    latencies = []
+    await http_client.start()
+    try:
+        for i in range(chunks):
+            start = time.perf_counter()
+            response = await http_client.client.post(
+                f"{endpoint}/chat/completions",
+                content=json.dumps({"messages": [{"role": "user", "content": f"chunk {i}"}]}),
+                headers={"Content-Type": "application/json"},
+                timeout=60
+            )
+            response.json()
+            latencies.append(time.perf_counter() - start)
+    finally:
+        await http_client.close()
+    return latencies
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=50)
+    parser.add_argument("--server-delay", type=float, default=0.02, help="simulated model time per call (seconds)")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_stub_handler(args.server_delay))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    endpoint = f"http://127.0.0.1:{server.server_address[1]}"
+
+    try:
+        report("before (connection per call)", run_before(endpoint, args.chunks))
+        report("after (shared pool)", asyncio.run(run_after(endpoint, args.chunks)))
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Concurrent end-to-end load against a running app, reporting throughput and p50/p95/p99 per route.
+
+Start the provider stubs and an app pointed at them, then drive it:
+
+    python -m benchmarks.stub_server --port 8900 &
+    GITHUB_MODELS_ENDPOINT=http://127.0.0.1:8900 ELEVENLABS_API_URL=http://127.0.0.1:8900 \\
+    YOUTUBE_SUBTITLE_URL='http://127.0.0.1:8900/subtitles/{video_id}.vtt' \\
+        uvicorn app.main:app --port 8000 &
+    python -m benchmarks.load_test --token $TOKEN --concurrency 16 --duration 120
+
+Routes authenticate through Supabase, so --token (or LOADTEST_TOKEN) must be a real access
+token. Inputs are unique per request unless --repeat is given, which sends identical inputs
+to exercise the response cache and request coalescing.
+
+Dubbing is left out of the default mix because its router is not mounted in app/main.py.
+Mount it, then opt in with e.g. --mix documents=4,youtube=3,past_papers=2,dubbing=1; jobs are
+timed until /dubbing/status reports them finished.
+"""
+import argparse
+import asyncio
+import os
+import random
+import string
+import time
+from typing import Dict, List, Tuple
+
+import httpx
+
+from benchmarks.stub_server import TOPICS, TEMPLATES
+
+SCENARIOS = ("documents", "youtube", "past_papers", "dubbing")
+
+def lecture_text(seed: str, kilobytes: int) -> str:
+    rng = random.Random(seed)
+    paragraphs, size = [], 0
+    while size < kilobytes * 1024:
+        topic = rng.choice(TOPICS)
+        paragraph = " ".join(rng.choice(TEMPLATES).format(*topic) for _ in range(rng.randint(4, 9)))
+        paragraphs.append(paragraph)
+        size += len(paragraph) + 2
+    return "\n\n".join(paragraphs)
+
+def video_id(seed: str) -> str:
+    rng = random.Random(seed)
+    return "".join(rng.choice(string.ascii_letters + string.digits) for _ in range(11))
+
+class LoadTest:
+    def __init__(self, client: httpx.AsyncClient, args):
+        self.client = client
+        self.args = args
+        self.headers = {"Authorization": f"Bearer {args.token}"}
+        self.results: Dict[str, List[Tuple[float, bool]]] = {scenario: [] for scenario in SCENARIOS}
+        self.errors: Dict[str, Dict[str, int]] = {scenario: {} for scenario in SCENARIOS}
+        self.sequence = 0
+
+    def seed(self) -> str:
+        self.sequence += 1
+        return "repeat" if self.args.repeat else f"{self.args.run_id}-{self.sequence}"
+
+    async def documents(self, seed: str) -> httpx.Response:
+        text = lecture_text(seed, self.args.doc_kb)
+        files = {"file": (f"notes-{seed}.txt", text.encode(), "text/plain")}
+        return await self.client.post("/documents/upload", files=files, headers=self.headers)
+
+    async def youtube(self, seed: str) -> httpx.Response:
+        url = f"https://www.youtube.com/watch?v={video_id(seed)}"
+        return await self.client.post("/youtube/summarize", json={"video_url": url}, headers=self.headers)
+
+    async def past_papers(self, seed: str) -> httpx.Response:
+        files = {
+            "study_material_file": (f"study-{seed}.txt", lecture_text(seed, self.args.doc_kb).encode(), "text/plain"),
+            "past_paper_file": (f"paper-{seed}.txt", lecture_text(f"paper-{seed}", 4).encode(), "text/plain"),
+        }
+        return await self.client.post(
+            "/past-papers/analyze", files=files, params={"num_questions": 10}, headers=self.headers
+        )
+
+    async def dubbing(self, seed: str) -> httpx.Response:
+        url = f"https://www.youtube.com/watch?v={video_id(seed)}"
+        response = await self.client.post("/dubbing/create", json={"video_url": url}, headers=self.headers)
+        if not response.is_success:
+            return response
+        job_id = response.json()["job_id"]
+        while True:
+            await asyncio.sleep(self.args.poll_interval)
+            response = await self.client.get(f"/dubbing/status/{job_id}", headers=self.headers)
+            if not response.is_success or response.json().get("status") != "processing":
+                return response
+
+    async def run_one(self, scenario: str):
+        start = time.perf_counter()
+        try:
+            response = await getattr(self, scenario)(self.seed())
+            ok = response.is_success and (scenario != "dubbing" or response.json().get("status") == "completed")
+            reason = str(response.status_code) if not response.is_success else "failed"
+        except httpx.HTTPError as e:
+            ok, reason = False, type(e).__name__
+        self.results[scenario].append((time.perf_counter() - start, ok))
+        if not ok:
+            self.errors[scenario][reason] = self.errors[scenario].get(reason, 0) + 1
+
+    async def worker(self, scenarios: List[str], weights: List[float], deadline: float, budget: List[int]):
+        while time.perf_counter() < deadline and budget[0] > 0:
+            budget[0] -= 1
+            await self.run_one(random.choices(scenarios, weights)[0])
+
+def percentile(values: List[float], p: float) -> float:
+    """Nearest-rank percentile of sorted values"""
+    rank = max(1, -(-len(values) * p // 100))
+    return values[int(rank) - 1]
+
+def report(results: Dict[str, List[Tuple[float, bool]]], errors: Dict[str, Dict[str, int]], elapsed: float):
+    print(f"\n{'route':<12} {'reqs':>6} {'errors':>6} {'req/s':>7} {'p50':>9} {'p95':>9} {'p99':>9}")
+    everything = []
+    for scenario, samples in results.items():
+        if not samples:
+            continue
+        everything.extend(samples)
+        _row(scenario, samples, elapsed)
+    if everything:
+        _row("all", everything, elapsed)
+    for scenario, reasons in errors.items():
+        if reasons:
+            print(f"{scenario} errors: " + ", ".join(f"{reason} x{count}" for reason, count in sorted(reasons.items())))
+
+def _row(label: str, samples: List[Tuple[float, bool]], elapsed: float):
+    # Percentiles are over successful requests; failures are counted separately
+    latencies = sorted(latency for latency, ok in samples if ok) or [float("nan")]
+    failed = sum(1 for _, ok in samples if not ok)
+    print(f"{label:<12} {len(samples):>6} {failed:>6} {len(samples) / elapsed:>7.2f} "
+          f"{percentile(latencies, 50):>8.2f}s {percentile(latencies, 95):>8.2f}s {percentile(latencies, 99):>8.2f}s")
+
+async def run(args):
+    mix = dict(item.split("=") for item in args.mix.split(","))
+    scenarios = [scenario for scenario in SCENARIOS if float(mix.get(scenario, 0)) > 0]
+    weights = [float(mix[scenario]) for scenario in scenarios]
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        test = LoadTest(client, args)
+        start = time.perf_counter()
+        deadline = start + args.duration
+        budget = [args.requests or float("inf")]
+        await asyncio.gather(*(
+            test.worker(scenarios, weights, deadline, budget) for _ in range(args.concurrency)
+        ))
+        report(test.results, test.errors, time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--token", default=os.getenv("LOADTEST_TOKEN", ""))
+    parser.add_argument("--concurrency", type=int, default=8, help="requests kept in flight")
+    parser.add_argument("--duration", type=float, default=60, help="seconds to keep starting requests")
+    parser.add_argument("--requests", type=int, default=0, help="stop after this many requests (0 = duration only)")
+    parser.add_argument("--mix", default="documents=4,youtube=3,past_papers=2",
+                        help="relative weight of each route (dubbing=N needs the dubbing router mounted)")
+    parser.add_argument("--doc-kb", type=int, default=200, help="size of generated study material")
+    parser.add_argument("--repeat", action="store_true", help="send identical inputs every time")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="seconds between dubbing status checks")
+    parser.add_argument("--timeout", type=float, default=600)
+    args = parser.parse_args()
+    args.run_id = f"{int(time.time())}"
+
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
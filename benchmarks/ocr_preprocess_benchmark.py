@@ -0,0 +1,137 @@
+"""
+Upload bytes and OCR latency per image, with and without vision preprocessing.
+
+Generates a phone photo of notes (12 MP JPEG, rotated by EXIF), a screenshot (PNG) and an
+A4 scan (TIFF), then OCRs each through OCRService twice: with OCR_PREPROCESS_ENABLED off
+(the raw file, as before) and on. A local stub answers the requests; --uplink-mbps makes it
+wait as long as the body would take on a client uplink of that speed. Use --endpoint to
+measure against benchmarks.stub_server or the real provider instead. The OCR result cache is
+switched off, so every run sends its image rather than answering from earlier runs:
+
+    python -m benchmarks.ocr_preprocess_benchmark --uplink-mbps 20 --repeat 3
+"""
+import argparse
+import asyncio
+import io
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from app.config import settings
+from app.services.http_client import http_client
+from app.services.image_preprocessor import image_preprocessor
+from app.services.ocr_cache import ocr_cache
+from app.services.ocr_service import OCRService
+
+LINE = "Kirchhoff's voltage law: the sum of potential differences around any closed loop is zero."
+
+def make_stub_handler(uplink_mbps: float):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            self.rfile.read(length)
+            if uplink_mbps:
+                time.sleep(length * 8 / (uplink_mbps * 1e6))
+            body = json.dumps({
+                "choices": [{"message": {"content": LINE}}],
+                "usage": {"prompt_tokens": 800, "completion_tokens": 40, "total_tokens": 840}
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+def _page(size, background, ink, font_size: int) -> Image.Image:
+    image = Image.new("RGB", size, background)
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default(size=font_size)
+    for y in range(font_size * 2, size[1] - font_size * 2, int(font_size * 1.6)):
+        draw.text((font_size * 2, y), LINE, fill=ink, font=font)
+    return image
+
+def make_images() -> list:
+    """(name, bytes, MIME type) of the generated test images"""
+    rng = np.random.default_rng(3)
+
+    # Lined paper under uneven light with sensor noise, stored sideways with an EXIF rotation
+    photo = _page((4032, 3024), (236, 230, 214), (30, 40, 120), 64)
+    pixels = np.asarray(photo, dtype=np.float32)
+    pixels *= np.linspace(0.8, 1.05, photo.width, dtype=np.float32)[None, :, None]
+    pixels += rng.normal(0, 6, pixels.shape).astype(np.float32)
+    photo = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).rotate(90, expand=True)
+    exif = Image.Exif()
+    exif[0x0112] = 8
+    photo_bytes = io.BytesIO()
+    photo.save(photo_bytes, "JPEG", quality=95, exif=exif)
+
+    screenshot_bytes = io.BytesIO()
+    _page((2560, 1440), (255, 255, 255), (20, 20, 20), 28).save(screenshot_bytes, "PNG")
+
+    scan_bytes = io.BytesIO()
+    _page((2480, 3508), (250, 250, 250), (10, 10, 10), 40).convert("L").save(scan_bytes, "TIFF")
+
+    return [
+        ("phone photo", photo_bytes.getvalue(), "image/jpeg"),
+        ("screenshot", screenshot_bytes.getvalue(), "image/png"),
+        ("A4 scan", scan_bytes.getvalue(), "image/tiff"),
+    ]
+
+async def measure(ocr: OCRService, image: bytes, mime_type: str, preprocess: bool, repeat: int):
+    settings.OCR_PREPROCESS_ENABLED = preprocess
+    # Repeats and the "after" run would otherwise be perceptual cache hits
+    ocr_cache.enabled = False
+    prepared = image_preprocessor.prepare(image, mime_type)
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await ocr.extract_text_from_image_bytes(image, mime_type)
+        latencies.append(time.perf_counter() - start)
+    # Base64 grows the image by 4/3; the rest of the body is under a kilobyte
+    return prepared, len(prepared.data) * 4 // 3, statistics.median(latencies)
+
+async def run(args):
+    server = None
+    endpoint = args.endpoint
+    if not endpoint:
+        server = ThreadingHTTPServer(("127.0.0.1", 0), make_stub_handler(args.uplink_mbps))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        endpoint = f"http://127.0.0.1:{server.server_port}"
+
+    await http_client.start()
+    ocr = OCRService()
+    ocr.endpoint = endpoint
+    try:
+        for name, image, mime_type in make_images():
+            print(f"{name}: {len(image) / 1e6:.2f} MB {mime_type}")
+            for label, preprocess in (("before", False), ("after", True)):
+                prepared, body, latency = await measure(ocr, image, mime_type, preprocess, args.repeat)
+                size = f"{prepared.width}x{prepared.height}" if prepared.width else "as uploaded"
+                print(f"  {label:<7} sent={len(prepared.data) / 1e6:6.2f} MB {prepared.mime_type:<10} "
+                      f"body~{body / 1e6:6.2f} MB size={size:<11} latency_p50={latency * 1000:8.1f}ms")
+    finally:
+        await http_client.close()
+        if server:
+            server.shutdown()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoint", help="OpenAI-compatible endpoint (default: an in-process stub)")
+    parser.add_argument("--uplink-mbps", type=float, default=20, help="simulated client uplink for the in-process stub")
+    parser.add_argument("--repeat", type=int, default=3)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+"""
+Local stand-ins for the upstream providers, so load tests use no real quota.
+
+Serves, on one port:
+
+    POST /chat/completions                 OpenAI-compatible (GitHub Models), incl. stream=true
+    POST /v1/text-to-speech/{voice_id}     ElevenLabs-compatible, silent MP3 (or PCM for ?output_format=pcm_*)
+    GET  /subtitles/{video_id}.vtt         WebVTT captions for a synthetic lecture
+    GET  /stub/stats                       request, error and fixture counters
+
+Point the app at it with:
+
+    GITHUB_MODELS_ENDPOINT=http://127.0.0.1:8900
+    ELEVENLABS_API_URL=http://127.0.0.1:8900
+    YOUTUBE_SUBTITLE_URL=http://127.0.0.1:8900/subtitles/{video_id}.vtt
+
+Latency is log-normal per service (median and sigma in seconds), with injected 5xx errors,
+random 429s and an optional requests-per-minute limit that answers 429 with Retry-After and
+x-ratelimit-* headers. Per-service settings come from a JSON file, e.g.
+
+    {"models": {"median": 1.5, "sigma": 0.6, "rpm": 15}, "tts": {"error_rate": 0.02}}
+
+Record/replay: --mode record forwards to the real providers and saves every response under
+--fixtures; --mode replay serves those fixtures (synthetic responses for unknown requests).
+
+    python -m benchmarks.stub_server --port 8900 --config stub.json
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import time
+from collections import deque
+from typing import Dict, Optional
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+SERVICES = ("models", "tts", "subtitles")
+
+DEFAULT_PROFILES = {
+    "models": {"median": 1.0, "sigma": 0.5, "error_rate": 0.0, "throttle_rate": 0.0, "rpm": 0},
+    "tts": {"median": 0.5, "sigma": 0.4, "error_rate": 0.0, "throttle_rate": 0.0, "rpm": 0},
+    "subtitles": {"median": 0.08, "sigma": 0.3, "error_rate": 0.0, "throttle_rate": 0.0, "rpm": 0},
+}
+
+# One silent MPEG-1 Layer III frame: 128 kbps, 44.1 kHz, no padding (417 bytes, 1152 samples)
+MP3_FRAME = bytes([0xFF, 0xFB, 0x90, 0x64]) + bytes(413)
+MP3_FRAME_SECONDS = 1152 / 44100
+
+TOPICS = [
+    ("photosynthesis", "chlorophyll", "light energy", "glucose", "carbon dioxide"),
+    ("supply and demand", "market price", "elasticity", "consumer surplus", "equilibrium"),
+    ("neural networks", "gradient descent", "activation functions", "overfitting", "backpropagation"),
+    ("the French Revolution", "the Estates General", "the Bastille", "Robespierre", "the Directory"),
+    ("plate tectonics", "subduction zones", "mid-ocean ridges", "earthquakes", "continental drift"),
+]
+TEMPLATES = [
+    "Today we look at {0} and why {1} matters so much.",
+    "The key idea is that {1} depends directly on {2}.",
+    "If you remember one thing, remember how {2} leads to {3}.",
+    "A common exam question asks you to explain {3} in terms of {4}.",
+    "Notice that {4} only makes sense once you understand {0}.",
+    "Let's work through an example where {1} and {3} interact.",
+    "So to summarise, {0} ties together {2} and {4}.",
+]
+
+class ServiceProfile:
+    """Latency distribution, failure injection and rate limit for one stubbed provider"""
+
+    def __init__(self, median: float, sigma: float, error_rate: float, throttle_rate: float, rpm: float):
+        self.median = median
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.rpm = rpm
+        self.recent = deque()
+
+    def latency(self) -> float:
+        if self.median <= 0:
+            return 0.0
+        return random.lognormvariate(math.log(self.median), self.sigma)
+
+    def admit(self) -> Optional[Response]:
+        """Error or 429 response to send instead of a result, None to serve the request"""
+        now = time.monotonic()
+        headers = {}
+        if self.rpm:
+            while self.recent and now - self.recent[0] >= 60:
+                self.recent.popleft()
+            reset = 60 - (now - self.recent[0]) if self.recent else 60
+            headers = {
+                "x-ratelimit-limit-requests": str(int(self.rpm)),
+                "x-ratelimit-remaining-requests": str(max(0, int(self.rpm) - len(self.recent) - 1)),
+                "x-ratelimit-reset-requests": f"{reset:.1f}s",
+            }
+            if len(self.recent) >= self.rpm:
+                return _error(429, "Rate limit exceeded", {**headers, "retry-after": str(math.ceil(reset))})
+            self.recent.append(now)
+
+        roll = random.random()
+        if roll < self.error_rate:
+            return _error(random.choice([500, 502, 503]), "Injected upstream failure", headers)
+        if roll < self.error_rate + self.throttle_rate:
+            return _error(429, "Injected throttle", {**headers, "retry-after": "1"})
+        return None
+
+def _error(status_code: int, message: str, headers: Dict[str, str]) -> Response:
+    return JSONResponse({"error": {"message": message, "code": status_code}}, status_code=status_code, headers=headers)
+
+class FixtureStore:
+    """Responses keyed by service and request, one JSON file each"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    @staticmethod
+    def key(service: str, path: str, body: bytes) -> str:
+        try:
+            body = json.dumps(json.loads(body), sort_keys=True).encode()
+        except ValueError:
+            pass
+        return hashlib.sha256(service.encode() + b"\0" + path.encode() + b"\0" + body).hexdigest()
+
+    def _path(self, service: str, key: str) -> str:
+        return os.path.join(self.directory, service, f"{key}.json")
+
+    def load(self, service: str, key: str) -> Optional[Response]:
+        try:
+            with open(self._path(service, key)) as f:
+                fixture = json.load(f)
+        except FileNotFoundError:
+            return None
+        return Response(
+            base64.b64decode(fixture["body"]), status_code=fixture["status"],
+            media_type=fixture.get("content_type")
+        )
+
+    def save(self, service: str, key: str, response: httpx.Response):
+        os.makedirs(os.path.join(self.directory, service), exist_ok=True)
+        with open(self._path(service, key), "w") as f:
+            json.dump({
+                "status": response.status_code,
+                "content_type": response.headers.get("content-type"),
+                "body": base64.b64encode(response.content).decode()
+            }, f)
+
+def synthetic_completion(data: dict) -> str:
+    """Deterministic answer in the shape the app's prompt asks for"""
+    messages = data.get("messages", [])
+    system = " ".join(m["content"] for m in messages if m.get("role") == "system" and isinstance(m.get("content"), str))
+    user = " ".join(m["content"] for m in messages if m.get("role") == "user" and isinstance(m.get("content"), str))
+    if not user:
+        # Vision (OCR) requests carry a list of content parts
+        return "Extracted text from the uploaded image.\nHeading\nA paragraph of printed text."
+
+    words = [w for w in re.findall(r"[A-Za-z]{5,}", user)][:400] or ["content"]
+    rng = random.Random(hashlib.sha256(user.encode()).digest())
+    phrase = lambda n: " ".join(rng.choice(words) for _ in range(n))
+
+    if "QUESTIONS:" in system or "QUESTIONS:" in user or "question" in system.lower():
+        count = int(next(iter(re.findall(r"(\d+)\s+(?:[\w-]+\s+){0,2}questions", system + " " + user)), 5))
+        questions = "\n".join(f"{i}. What is the role of {phrase(3)}?" for i in range(1, count + 1))
+        answers = "\n".join(f"{i}. It explains {phrase(8)}." for i in range(1, count + 1))
+        return f"QUESTIONS:\n{questions}\n\nANSWERS:\n{answers}"
+    if "ENGLISH SUMMARY" in system or "ENGLISH SUMMARY" in user:
+        points = "\n".join(f"- {phrase(6).capitalize()}." for _ in range(4))
+        return (f"ENGLISH SUMMARY: {phrase(40).capitalize()}.\n\nURDU SUMMARY: خلاصہ {phrase(10)}\n\n"
+                f"KEY POINTS:\n{points}")
+    if "translat" in system.lower():
+        return f"ترجمہ: {user}"
+    return " ".join(f"{phrase(12).capitalize()}." for _ in range(6))
+
+def silent_mp3(seconds: float) -> bytes:
+    return MP3_FRAME * max(1, math.ceil(seconds / MP3_FRAME_SECONDS))
+
+def synthetic_vtt(video_id: str, minutes: float) -> str:
+    rng = random.Random(video_id)
+    topics = rng.sample(TOPICS, 3)
+    cues, start, end_of_video = ["WEBVTT", "Kind: captions", "Language: en", ""], 0.0, minutes * 60
+    while start < end_of_video:
+        # Lectures move through their topics in order
+        topic = topics[min(len(topics) - 1, int(start / end_of_video * len(topics)))]
+        duration = rng.uniform(2.5, 5.0)
+        cues.append(f"{_vtt_time(start)} --> {_vtt_time(start + duration)}")
+        cues.append(rng.choice(TEMPLATES).format(*topic))
+        cues.append("")
+        start += duration
+    return "\n".join(cues)
+
+def _vtt_time(seconds: float) -> str:
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{int(hours):02d}:{int(minutes):02d}:{seconds:06.3f}"
+
+def create_app(profiles: Dict[str, ServiceProfile], mode: str = "synthetic", fixtures: Optional[FixtureStore] = None,
+               models_upstream: str = "", tts_upstream: str = "", subtitle_minutes: float = 20) -> FastAPI:
+    app = FastAPI(title="Provider stubs")
+    stats = {service: {"requests": 0, "errors": 0, "throttled": 0, "replayed": 0, "recorded": 0} for service in SERVICES}
+
+    async def serve(service: str, request: Request, body: bytes, synthetic, upstream: Optional[str] = None):
+        counters = stats[service]
+        counters["requests"] += 1
+
+        key = fixtures.key(service, f"{request.url.path}?{request.url.query}", body) if fixtures else None
+        if mode == "replay" and fixtures:
+            replayed = fixtures.load(service, key)
+            if replayed is not None:
+                counters["replayed"] += 1
+                await asyncio.sleep(profiles[service].latency())
+                return replayed
+
+        if mode == "record" and fixtures and upstream:
+            headers = {k: v for k, v in request.headers.items() if k.lower() not in ("host", "content-length")}
+            async with httpx.AsyncClient(timeout=300) as client:
+                response = await client.request(request.method, upstream, content=body, headers=headers)
+            fixtures.save(service, key, response)
+            counters["recorded"] += 1
+            return Response(response.content, status_code=response.status_code,
+                            media_type=response.headers.get("content-type"))
+
+        rejected = profiles[service].admit()
+        if rejected is not None:
+            counters["throttled" if rejected.status_code == 429 else "errors"] += 1
+            return rejected
+        return await synthetic(profiles[service].latency())
+
+    @app.post("/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.body()
+        data = json.loads(body or b"{}")
+
+        async def synthetic(latency: float):
+            content = synthetic_completion(data)
+            prompt_tokens = sum(len(str(m.get("content", ""))) for m in data.get("messages", [])) // 4
+            completion_tokens = len(content) // 4
+            if not data.get("stream"):
+                await asyncio.sleep(latency)
+                return JSONResponse({
+                    "id": "stub", "object": "chat.completion", "model": data.get("model"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                              "total_tokens": prompt_tokens + completion_tokens}
+                })
+
+            # A third of the latency before the first token, the rest spread over the deltas
+            deltas = re.findall(r"\S+\s*", content)
+            async def events():
+                await asyncio.sleep(latency * 0.3)
+                for delta in deltas:
+                    chunk = {"choices": [{"index": 0, "delta": {"content": delta}}]}
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                    await asyncio.sleep(latency * 0.7 / max(1, len(deltas)))
+                yield "data: [DONE]\n\n"
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        upstream = f"{models_upstream}/chat/completions" if models_upstream else None
+        return await serve("models", request, body, synthetic, upstream)
+
+    @app.post("/v1/text-to-speech/{voice_id}")
+    async def text_to_speech(voice_id: str, request: Request, output_format: str = "mp3_44100_128"):
+        body = await request.body()
+        text = json.loads(body or b"{}").get("text", "")
+
+        async def synthetic(latency: float):
+            await asyncio.sleep(latency)
+            # Roughly 15 characters of speech per second
+            seconds = max(0.5, len(text) / 15)
+            if output_format.startswith("pcm_"):
+                rate = int(output_format.split("_")[1])
+                return Response(bytes(2 * int(rate * seconds)), media_type="audio/pcm")
+            return Response(silent_mp3(seconds), media_type="audio/mpeg")
+
+        upstream = f"{tts_upstream}{request.url.path}?{request.url.query}" if tts_upstream else None
+        return await serve("tts", request, body, synthetic, upstream)
+
+    @app.get("/subtitles/{video_id}.vtt")
+    async def subtitles(video_id: str, request: Request, minutes: Optional[float] = None):
+        async def synthetic(latency: float):
+            await asyncio.sleep(latency)
+            return Response(synthetic_vtt(video_id, minutes or subtitle_minutes), media_type="text/vtt")
+
+        upstream = None
+        if mode == "record":
+            from app.services.youtube_service import YouTubeService
+            upstream = await asyncio.to_thread(
+                YouTubeService()._find_subtitle_url, f"https://www.youtube.com/watch?v={video_id}"
+            )
+        return await serve("subtitles", request, b"", synthetic, upstream)
+
+    @app.get("/stub/stats")
+    async def stub_stats():
+        return stats
+
+    return app
+
+def load_profiles(config_path: Optional[str], latency_scale: float, error_rate: Optional[float],
+                  throttle_rate: Optional[float]) -> Dict[str, ServiceProfile]:
+    config = {}
+    if config_path:
+        with open(config_path) as f:
+            config = json.load(f)
+    profiles = {}
+    for service, defaults in DEFAULT_PROFILES.items():
+        profile = {**defaults, **config.get(service, {})}
+        profile["median"] *= latency_scale
+        if error_rate is not None:
+            profile["error_rate"] = error_rate
+        if throttle_rate is not None:
+            profile["throttle_rate"] = throttle_rate
+        profiles[service] = ServiceProfile(**profile)
+    return profiles
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--config", help="JSON file of per-service profiles (median, sigma, error_rate, throttle_rate, rpm)")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="multiply every median latency")
+    parser.add_argument("--error-rate", type=float, help="5xx probability for every service")
+    parser.add_argument("--throttle-rate", type=float, help="random 429 probability for every service")
+    parser.add_argument("--subtitle-minutes", type=float, default=20, help="length of synthetic videos")
+    parser.add_argument("--mode", choices=["synthetic", "record", "replay"], default="synthetic")
+    parser.add_argument("--fixtures", default="benchmarks/fixtures")
+    parser.add_argument("--models-upstream", default="https://models.github.ai/inference")
+    parser.add_argument("--tts-upstream", default="https://api.elevenlabs.io")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    profiles = load_profiles(args.config, args.latency_scale, args.error_rate, args.throttle_rate)
+    fixtures = FixtureStore(args.fixtures) if args.mode != "synthetic" else None
+    app = create_app(profiles, args.mode, fixtures, args.models_upstream, args.tts_upstream, args.subtitle_minutes)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()